@@ -0,0 +1,117 @@
+"""Throughput of the content blocker's filter matching.
+
+Run from the repository root, optionally with real lists and a URL corpus
+(one URL per line, or "url first_party_url" pairs):
+
+    python benchmarks/bench_content_blocker.py
+    python benchmarks/bench_content_blocker.py --filters easylist.txt easyprivacy.txt --urls urls.txt
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+WORDS = ["ads", "banner", "track", "pixel", "analytics", "cdn", "static", "img", "js", "api", "media",
+         "promo", "sponsor", "beacon", "stats", "widget", "assets", "video", "social", "metrics"]
+
+
+def synthetic_filters(count, rng):
+    lines = []
+    for i in range(count):
+        word = WORDS[i % len(WORDS)]
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"||{word}{i}.example{i % 97}.com^")
+        elif kind == 1:
+            lines.append(f"||{word}-{i}.net^$third-party")
+        elif kind == 2:
+            lines.append(f"/{word}/{i}/*$script")
+        elif kind == 3:
+            lines.append(f"-{word}{i}-$image")
+        else:
+            lines.append(f"@@||{word}{i}.example{i % 97}.com/allowed^")
+    return lines
+
+
+def synthetic_urls(count, filter_count, rng):
+    urls = []
+    for i in range(count):
+        # Roughly one in five URLs is on a blocked host
+        n = rng.randrange(filter_count)
+        word = WORDS[n % len(WORDS)]
+        host = rng.choice([f"{word}{n}.example{n % 97}.com", f"www.site{n % 500}.org", f"{word}-{n}.net"])
+        path = "/".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        urls.append((f"https://{host}/{path}/{n}.js?v={i}", f"www.site{i % 500}.org"))
+    return urls
+
+
+def read_urls(path):
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                first_party = main.QUrl(parts[1]).host() if len(parts) > 1 else ""
+                urls.append((parts[0], first_party))
+    return urls
+
+
+def run(args):
+    rng = random.Random(1)
+    if args.filters:
+        lines = []
+        for path in args.filters:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines.extend(f)
+    else:
+        lines = synthetic_filters(args.filter_count, rng)
+    urls = read_urls(args.urls) if args.urls else synthetic_urls(args.url_count, args.filter_count, rng)
+
+    started = time.perf_counter()
+    filters = [f for f in map(main.NetworkFilter.parse, lines) if f]
+    parsed = time.perf_counter()
+    snapshot = main.FilterEngine.build(filters, bytes(32))
+    built = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.bin")
+        main.atomic_write(path, snapshot)
+        load_started = time.perf_counter()
+        engine = main.FilterEngine(path)
+        loaded = time.perf_counter()
+
+        print(f"filters: {len(filters)} of {len(lines)} lines, snapshot {len(snapshot) / 1024:.0f} KiB")
+        print(f"parse {(parsed - started) * 1000:.0f} ms, build {(built - parsed) * 1000:.0f} ms, "
+              f"snapshot load {(loaded - load_started) * 1000:.1f} ms")
+
+        script = main.FILTER_RESOURCE_TYPES["script"]
+        for label in ("cold", "warm"):
+            blocked = 0
+            timings = []
+            for url, first_party in urls:
+                host = main.QUrl(url).host() if args.urls else url.split("/")[2]
+                third_party = bool(first_party) and main.registrable_domain(host) != main.registrable_domain(first_party)
+                t = time.perf_counter()
+                decision = engine.match(url, first_party, third_party, script)
+                timings.append(time.perf_counter() - t)
+                if decision is not None and not decision.flags & main.FILTER_EXCEPTION:
+                    blocked += 1
+            timings.sort()
+            total = sum(timings)
+            print(f"{label}: {len(urls) / total:,.0f} matches/s, mean {total / len(urls) * 1e6:.1f} us, "
+                  f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us, blocked {blocked}/{len(urls)}")
+        engine.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filters", nargs="*", help="EasyList-style filter lists")
+    parser.add_argument("--urls", help="URL corpus file")
+    parser.add_argument("--filter-count", type=int, default=50000)
+    parser.add_argument("--url-count", type=int, default=100000)
+    run(parser.parse_args())
@@ -0,0 +1,47 @@
+"""Per-call cost of URL-versus-search classification in the address bar.
+
+Run from the repository root:
+
+    python benchmarks/bench_url_classifier.py
+"""
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+INPUTS = {
+    "domain": "github.com",
+    "multi-label suffix": "news.bbc.co.uk/sport",
+    "IDN": "bücher.de",
+    "localhost with port": "localhost:8080",
+    "IPv4 with port": "192.168.1.1:3000",
+    "IPv6": "[::1]:8080",
+    "scheme": "https://example.com/a?b=c",
+    "single word": "python",
+    "search phrase": "how to use qtwebengine",
+    "unknown TLD": "notes.txt",
+}
+
+
+def bench(func, text, number):
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=5)) / number
+
+
+def main_bench(number=20000):
+    started = time.perf_counter()
+    main.get_suffix_trie()
+    print(f"public suffix trie built once in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(f"{'input':<22} {'result':<7} {'is_url':>10} {'process_input':>14}")
+    for label, text in INPUTS.items():
+        result = "url" if main.is_url(text) else "search"
+        is_url_ns = bench(main.is_url, text, number) * 1e9
+        process_ns = bench(main.process_input, text, number) * 1e9
+        print(f"{label:<22} {result:<7} {is_url_ns:>8.0f}ns {process_ns:>12.0f}ns")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,368 @@
+"""Headless benchmarks for tab, navigation, cookie and download hot paths.
+
+Runs the real Browser under the offscreen Qt platform against a local HTTP
+fixture server, with a throwaway data directory. Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --output new.json --fail-on-regression
+
+Metrics ending in "_per_sec" are better when higher, every other metric is
+better when lower.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+DATA_HOME = tempfile.mkdtemp(prefix="qtcelestial-bench-")
+os.environ["XDG_DATA_HOME"] = DATA_HOME
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import main
+    from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineDownloadRequest
+except ImportError as e:
+    # QtWebEngine needs X11, NSS and ALSA client libraries even under the offscreen platform
+    sys.exit(f"Cannot load PyQt6 QtWebEngine, install it and its system libraries first: {e}")
+from PyQt6.QtCore import QUrl, QTimer, QEventLoop, QCoreApplication, QEvent, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtNetwork import QNetworkCookie
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves small HTML pages with subresources and fixed-size files"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = dict(p.partition("=")[::2] for p in query.split("&") if p)
+        delay = int(params.get("delay_ms", 0))
+        if delay:
+            time.sleep(delay / 1000)
+        if path.startswith("/page/"):
+            n = path.rsplit("/", 1)[1]
+            body = (
+                f"<html><head><title>Page {n}</title><link rel=stylesheet href=/style.css?{n}></head>"
+                f"<body><h1>Page {n}</h1>{'<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>' * 50}"
+                f"<img src=/image.svg?{n}><script src=/script.js?{n}></script></body></html>"
+            ).encode()
+            self.send_body(body, "text/html")
+        elif path == "/style.css":
+            self.send_body(b"body { font-family: sans-serif; } h1 { color: #333; }", "text/css")
+        elif path == "/script.js":
+            self.send_body(b"document.title += '';", "application/javascript")
+        elif path == "/image.svg":
+            self.send_body(b"<svg xmlns='http://www.w3.org/2000/svg' width='10' height='10'/>", "image/svg+xml")
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    def __init__(self):
+        # Bound to every local address so 127.0.0.N hosts get separate renderer processes
+        self.server = ThreadingHTTPServer(("0.0.0.0", 0), FixtureHandler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path, site=1):
+        return QUrl(f"http://127.0.0.{site}:{self.port}{path}")
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class FakeDownload:
+    """Stands in for QWebEngineDownloadRequest, progress is advanced by the benchmark"""
+    def __init__(self, n, directory):
+        self.n = n
+        self.directory = directory
+        self.received = 0
+        self.total = 100 * 1024 * 1024
+
+    def suggestedFileName(self):
+        return f"file{self.n}.bin"
+
+    def downloadFileName(self):
+        return self.suggestedFileName()
+
+    def downloadDirectory(self):
+        return self.directory
+
+    def url(self):
+        return QUrl(f"http://127.0.0.1/file{self.n}.bin")
+
+    def totalBytes(self):
+        return self.total
+
+    def receivedBytes(self):
+        return self.received
+
+    def isPaused(self):
+        return False
+
+    def state(self):
+        return QWebEngineDownloadRequest.DownloadState.DownloadInProgress
+
+    def interruptReasonString(self):
+        return ""
+
+
+def wait_for(predicate, timeout, step_ms=5):
+    """Run the event loop until predicate() is true"""
+    deadline = time.monotonic() + timeout
+    loop = QEventLoop()
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("benchmark condition not reached")
+        QTimer.singleShot(step_ms, loop.quit)
+        loop.exec()
+
+
+def flush_deletes():
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    return {"p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": ordered[-1]}
+
+
+def bench_tabs(window, server, count):
+    """Open count tabs on separate sites, wait until all loaded, then close them"""
+    loaded = set()
+    base_rss = main.read_process_memory(os.getpid())
+    base_renderers, _ = window.tab_lifecycle.renderer_memory()
+
+    started = time.perf_counter()
+    for i in range(count):
+        window.add_new_tab(server.url(f"/page/{i}", site=2 + i % 250), f"Bench {i}")
+        tab = window.tabs.widget(window.tabs.count() - 1)
+        tab.browser.loadFinished.connect(lambda ok, i=i: loaded.add(i))
+    wait_for(lambda: len(loaded) == count, 30 + count)
+    opened = time.perf_counter()
+
+    renderers, pid_users = window.tab_lifecycle.renderer_memory()
+    rss = main.read_process_memory(os.getpid())
+
+    closing = time.perf_counter()
+    while window.tabs.count() > 1:
+        window.close_tab(window.tabs.count() - 1)
+    flush_deletes()
+    closed = time.perf_counter()
+
+    return {
+        "tabs": count,
+        "open_per_sec": count / (opened - started),
+        "close_per_sec": count / max(closed - closing, 1e-9),
+        "renderer_mb_per_tab": (renderers - base_renderers) / count / 2 ** 20,
+        "browser_mb_per_tab": (rss - base_rss) / count / 2 ** 20,
+        "renderer_processes": len(pid_users),
+    }
+
+
+def bench_page_loads(window, server, count):
+    """Load fixture pages one after another in a single tab"""
+    tab = window.tabs.currentWidget()
+    samples = []
+    state = {}
+
+    def on_finished(ok):
+        if "started" in state:
+            samples.append((time.perf_counter() - state.pop("started")) * 1000)
+
+    tab.browser.loadFinished.connect(on_finished)
+    for i in range(count):
+        state["started"] = time.perf_counter()
+        tab.browser.setUrl(server.url(f"/page/load{i}"))
+        wait_for(lambda: "started" not in state, 30)
+    tab.browser.loadFinished.disconnect(on_finished)
+    return {"loads": count, **percentiles(samples)}
+
+
+def bench_cookies(sizes):
+    """Journal and restore n cookies through CookieJournal and CookieLoader"""
+    results = {}
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cookies.db")
+            journal = main.CookieJournal(db_path)
+            started = time.perf_counter()
+            for i in range(n):
+                cookie = QNetworkCookie(f"name{i}".encode(), f"value{i}".encode())
+                cookie.setDomain(f".site{i % 1000}.example")
+                cookie.setPath("/")
+                journal.record_added(cookie)
+            journal.flush(wait=True)
+            saved = time.perf_counter()
+            journal.close()
+
+            # A fresh off-the-record profile so restored cookies land in an empty store
+            profile = QWebEngineProfile()
+            journal = main.CookieJournal(db_path)
+            loader = main.CookieLoader(journal, profile.cookieStore())
+            load_started = time.perf_counter()
+            loader.start()
+            wait_for(lambda: loader.finished, 300, step_ms=1)
+            loaded = time.perf_counter()
+            journal.close()
+            profile.deleteLater()
+            flush_deletes()
+
+            results[f"{n}"] = {"save_ms": (saved - started) * 1000, "load_ms": (loaded - load_started) * 1000}
+    return results
+
+
+def bench_download_progress(window, counts, ticks=40):
+    """Cost of one progress sampling tick with many concurrent downloads, including repaint"""
+    window.ensure_downloads()
+    manager = window.download_manager
+    progress = window.download_progress
+    manager.show()
+    results = {}
+    for count in counts:
+        downloads = []
+        for n in range(count):
+            download = FakeDownload(n, DATA_HOME)
+            item = main.DownloadItem(download)
+            manager.add_download(item)
+            progress.add(item)
+            downloads.append((download, item))
+        # Ticks are driven by hand so only their cost is measured
+        progress.timer.stop()
+        samples = []
+        for _ in range(ticks):
+            for download, _ in downloads:
+                download.received += 64 * 1024
+            started = time.perf_counter()
+            progress.tick()
+            QCoreApplication.processEvents()
+            samples.append((time.perf_counter() - started) * 1000)
+        for download, item in downloads:
+            item.set_cancelled()
+        progress.tick()
+        QCoreApplication.processEvents()
+        tick = percentiles(samples)
+        results[f"{count}"] = {**tick, "us_per_download": tick["p50_ms"] * 1000 / count}
+    manager.hide()
+    return results
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """Print metric changes against the baseline, returns the regressed metrics"""
+    current = flatten(results)
+    previous = flatten(baseline.get("results", {}))
+    regressions = []
+    print(f"\n{'metric':<52} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(current):
+        if name not in previous or not previous[name]:
+            continue
+        old, new = previous[name], current[name]
+        change = (new - old) / abs(old) * 100
+        higher_is_better = name.endswith("_per_sec")
+        worse = -change if higher_is_better else change
+        flag = " REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<52} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%{flag}")
+    return regressions
+
+
+def run(args):
+    app = main.QApplication(sys.argv[:1])
+    app.setApplicationName("Evening")
+    data_dir = main.get_data_dir()
+    # Start on a local page instead of the default home page
+    os.makedirs(os.path.join(data_dir, "session"), exist_ok=True)
+    server = FixtureServer()
+    with open(os.path.join(data_dir, "session", "session.json"), "w") as f:
+        json.dump({"version": 1, "current": 0,
+                   "tabs": [{"url": server.url("/page/home").toString(), "title": "Home", "history": ""}]}, f)
+
+    window = main.Browser()
+    window.show()
+    window.finish_startup()
+    wait_for(lambda: window.first_load_seen, 60)
+
+    selected = set(args.only or ["tabs", "loads", "cookies", "downloads"])
+    results = {}
+    if "tabs" in selected:
+        results["tabs"] = bench_tabs(window, server, args.tabs)
+    if "loads" in selected:
+        results["page_load"] = bench_page_loads(window, server, args.loads)
+    if "cookies" in selected:
+        results["cookies"] = bench_cookies(args.cookie_sizes)
+    if "downloads" in selected:
+        results["download_progress"] = bench_download_progress(window, args.download_counts)
+
+    window.close()
+    server.stop()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results from an earlier run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--only", nargs="*", choices=["tabs", "loads", "cookies", "downloads"])
+    parser.add_argument("--tabs", type=int, default=20)
+    parser.add_argument("--loads", type=int, default=50)
+    parser.add_argument("--cookie-sizes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--download-counts", type=int, nargs="*", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
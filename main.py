@@ -1,179 +1,607 @@
+import time
+# Taken before the Qt imports so --profile-startup can show what they cost
+STARTUP_T0 = time.perf_counter()
 import sys
 import logging
-from datetime import datetime
-from PyQt6.QtCore import QUrl, QFileInfo, QDir, QStandardPaths, QDateTime, QTimer
-from PyQt6.QtGui import QIcon, QAction, QDesktopServices
+import logging.handlers
+import copy
+import queue
+import signal
+import tempfile
+import argparse
+import subprocess
+from PyQt6.QtCore import (
+    QUrl, QFileInfo, QDir, QStandardPaths, QDateTime, QTimer, QObject, pyqtSignal,
+    Qt, QAbstractListModel, QModelIndex, QSize, QRect, QStringListModel
+)
+from PyQt6.QtGui import QIcon, QAction, QDesktopServices, QFont, QFontMetrics
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, 
     QLineEdit, QHBoxLayout, QPushButton, QToolBar, QStatusBar, 
-    QLabel, QProgressBar, QListWidget, QListWidgetItem
+    QLabel, QListView, QMenu, QStyle, QStyledItemDelegate, QStyleOptionProgressBar,
+    QInputDialog, QMessageBox, QCompleter, QListWidget, QListWidgetItem,
+    QDockWidget, QTableWidget, QTableWidgetItem, QFileDialog, QHeaderView
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineDownloadRequest, QWebEngineSettings
-from PyQt6.QtCore import QByteArray, QSettings, QDateTime
+from PyQt6.QtWebEngineCore import (
+    QWebEngineProfile, QWebEngineDownloadRequest, QWebEngineSettings, QWebEnginePage,
+    QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+)
+from PyQt6.QtCore import QByteArray, QSettings, QDateTime, QDataStream, QIODevice
 import json
+import base64
 import os
 import pickle
-from PyQt6.QtNetwork import QNetworkCookie, QNetworkProxy
-import socket
-
-# Set up logging
-logging.basicConfig(
-    filename=f'browser_debug_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+import sqlite3
+import re
+import hashlib
+import hmac
+import mmap
+import collections
+import random
+import html
+import struct
+import zlib
+import ipaddress
+from urllib.parse import quote_plus
+import bisect
+import heapq
+from array import array
+from PyQt6.QtNetwork import QNetworkCookie, QNetworkProxy, QTcpSocket
+import math
+import threading
+import http.client
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from python_socks.sync import Proxy as SocksProxy
+except ImportError:
+    SocksProxy = None
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def get_data_dir():
+    """Get the application data directory"""
+    data_path = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    if not data_path:
+        data_path = QDir.currentPath()
+    os.makedirs(data_path, exist_ok=True)
+    return data_path
+
+def get_settings():
+    """Get the browser settings stored next to the profile data"""
+    return QSettings(os.path.join(get_data_dir(), "settings.ini"), QSettings.Format.IniFormat)
+
+def settings_list(value):
+    """Return a comma separated setting as stripped, non-empty strings.
+
+    QSettings returns an INI value containing commas as a list and a single value as a string.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+class StartupProfiler:
+    """Records how long each startup phase takes, from process start to first contentful paint"""
+    def __init__(self):
+        # (phase, seconds since process start)
+        self.marks = []
+
+    def mark(self, phase, at=None):
+        at = time.perf_counter() - STARTUP_T0 if at is None else at
+        self.marks.append((phase, at))
+        logging.debug("Startup phase %s done at %.1f ms", phase, at * 1000)
+
+    def report(self):
+        lines = [f"{'phase':<28} {'took ms':>9} {'at ms':>9}"]
+        previous = 0.0
+        for phase, at in sorted(self.marks, key=lambda mark: mark[1]):
+            lines.append(f"{phase:<28} {(at - previous) * 1000:>9.1f} {at * 1000:>9.1f}")
+            previous = at
+        return "\n".join(lines)
+
+STARTUP = StartupProfiler()
+
+class RateLimitFilter(logging.Filter):
+    """Drops repeats of high-frequency messages logged with extra={"throttle": seconds}"""
+    def __init__(self):
+        super().__init__()
+        self.last_emitted = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        interval = getattr(record, "throttle", None)
+        if not interval:
+            return True
+        key = (record.msg, getattr(record, "throttle_key", None))
+        now = time.monotonic()
+        last = self.last_emitted.get(key)
+        if last is not None and now - last < interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last_emitted[key] = now
+        count = self.suppressed.pop(key, 0)
+        if count and isinstance(record.args, tuple):
+            record.msg = f"{record.msg} (%d similar suppressed)"
+            record.args = record.args + (count,)
+        return True
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    Only the message text is rendered on the logging thread, so later changes to the arguments
+    cannot alter the record. Timestamps, layout and tracebacks are formatted by the listener.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def setup_logging(filename="browser_debug.log"):
+    """Log through a queue to a rotating file written on a background thread.
+
+    The level comes from QTCELESTIAL_LOG_LEVEL or logging/level in the settings.
+    Processes running at the same time need their own filename, rotation is not shared between them.
+    Returns the QueueListener, which must be stopped on exit to flush the queue.
+    """
+    settings = get_settings()
+    level_name = os.environ.get("QTCELESTIAL_LOG_LEVEL") or settings.value("logging/level", "INFO")
+    level = logging.getLevelName(str(level_name).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    log_dir = os.path.join(get_data_dir(), "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, filename),
+        maxBytes=settings.value("logging/max_bytes", 5 * 1024 * 1024, type=int),
+        backupCount=settings.value("logging/backup_count", 5, type=int),
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    # Only the message is rendered on the calling thread, formatting and writing happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+def atomic_write(path, data):
+    """Write bytes to a file so readers never see a partially written file"""
+    # A unique temporary name, so processes writing the same file never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def serialize_history(history):
+    """Serialize a QWebEngineHistory to bytes"""
+    data = QByteArray()
+    stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
+    stream << history
+    return bytes(data)
+
+def restore_history(history, data):
+    """Restore a QWebEngineHistory from bytes, returns False if nothing was restored"""
+    if not data:
+        return False
+    stream = QDataStream(QByteArray(data), QIODevice.OpenModeFlag.ReadOnly)
+    stream >> history
+    return stream.status() == QDataStream.Status.Ok and history.count() > 0
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def read_process_stat(pid):
+    """Return the fields of /proc/<pid>/stat after the command name, or None if the process is gone"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses, the fields after it never do
+    return stat[stat.rfind(")") + 2:].split()
+
+def read_process_stats(pid, pss=True):
+    """Return resident and proportional memory in bytes and total CPU time in seconds of a process.
+
+    Reading PSS makes the kernel walk the process's page tables, pass pss=False when RSS is enough.
+    """
+    fields = read_process_stat(pid)
+    if fields is None:
+        return None
+    try:
+        stats = {
+            "rss": int(fields[21]) * PAGE_SIZE,
+            "pss": None,
+            "cpu": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+        }
+    except (IndexError, ValueError):
+        return None
+    if not pss:
+        return stats
+    # PSS splits shared pages between the processes mapping them, which is fairer for renderers
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    stats["pss"] = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError):
+        pass
+    return stats
+
+def read_process_memory(pid):
+    """Return the resident memory of a process in bytes, or 0 if unavailable"""
+    stats = read_process_stats(pid, pss=False) if pid else None
+    return stats["rss"] if stats is not None else 0
+
+def describe_process(pid):
+    """Name a Chromium helper process by its --type switch"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            args = f.read().decode(errors="replace").split("\0")
+    except OSError:
+        return "Process"
+    switches = dict(arg[2:].partition("=")[::2] for arg in args if arg.startswith("--"))
+    kind = switches.get("type")
+    if kind is None:
+        return os.path.basename(args[0]) or "Process"
+    if kind == "utility":
+        return f"Utility: {switches.get('utility-sub-type', 'unknown')}"
+    return {"renderer": "Renderer", "gpu-process": "GPU", "zygote": "Zygote"}.get(kind, kind.capitalize())
+
+def list_child_processes(root_pid):
+    """Return the pids of all descendants of root_pid"""
+    children = collections.defaultdict(list)
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        fields = read_process_stat(entry)
+        if fields is not None:
+            children[int(fields[1])].append(int(entry))
+    found = []
+    stack = [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+PUBLIC_SUFFIX_PATHS = (
+    "/usr/share/publicsuffix/public_suffix_list.dat",
+    "/usr/share/publicsuffix/effective_tld_names.dat",
 )
 
+# Used when no public suffix list is installed
+BUILTIN_SUFFIXES = """
+com org net edu gov mil int info biz name pro mobi aero asia cat coop jobs museum tel travel arpa onion
+app blog club design dev guru tech xyz shop online site store cloud io ai me tv cc co page wiki news
+ac ad ae af ag al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br bs bt bw by bz
+ca cd cf cg ch ci ck cl cm cn cr cu cv cw cx cy cz de dj dk dm do dz ec ee eg er es et eu fi fj fk fm
+fo fr ga gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in iq ir is
+it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md mg mh mk ml
+mm mn mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl
+pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh si sk sl sm sn so sr ss st su sv sx sy sz
+tc td tf tg th tj tk tl tm tn to tr tt tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye yt za zm zw
+co.uk org.uk ac.uk gov.uk com.au net.au org.au co.jp co.nz com.br com.cn
+"""
+
+HOST_LABEL_RE = re.compile(r"^(?!-)[a-z0-9-]{1,63}(?<!-)$")
+SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+URL_PREFIXES = ("about:", "file:", "data:", "view-source:")
+LOCAL_HOSTS = ("localhost",)
+
+class PublicSuffixTrie:
+    """Public suffix rules compiled into a trie of reversed host labels"""
+    def __init__(self, rules):
+        self.root = {}
+        for rule in rules:
+            exception = rule.startswith("!")
+            labels = self.to_ascii(rule.lstrip("!")).split(".")
+            node = self.root
+            for label in reversed(labels):
+                node = node.setdefault(label, {})
+            # The empty key marks the end of a rule, "!" an exception to a wildcard
+            node[""] = "!" if exception else True
+
+    @staticmethod
+    def to_ascii(host):
+        if host.isascii():
+            return host.lower()
+        return ".".join(label if label == "*" else label.encode("idna").decode("ascii") for label in host.split("."))
+
+    @classmethod
+    def load(cls):
+        for path in PUBLIC_SUFFIX_PATHS:
+            try:
+                rules = []
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        # Private suffixes such as github.io are still valid sites to type
+                        if "===BEGIN PRIVATE DOMAINS===" in line:
+                            break
+                        if line.strip() and not line.startswith("//"):
+                            rules.append(line.split()[0])
+                logging.debug("Loaded %s public suffix rules from %s", len(rules), path)
+                return cls(rules)
+            except OSError:
+                continue
+            except Exception as e:
+                logging.error("Failed to parse public suffix list %s: %s", path, e)
+        return cls(BUILTIN_SUFFIXES.split())
+
+    def suffix_length(self, labels):
+        """Number of trailing labels forming the public suffix, 0 if the TLD is unknown"""
+        node = self.root
+        length = 0
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.get(label)
+            if child is None:
+                child = node.get("*")
+            if child is None:
+                break
+            node = child
+            mark = node.get("")
+            if mark == "!":
+                return depth - 1
+            if mark:
+                length = depth
+        return length
+
+_suffix_trie = None
+
+def get_suffix_trie():
+    """Compile the public suffix list on first use"""
+    global _suffix_trie
+    if _suffix_trie is None:
+        _suffix_trie = PublicSuffixTrie.load()
+    return _suffix_trie
+
+def split_host(text):
+    """Return the host of scheme-less input such as "host:port/path", or None"""
+    authority = re.split(r"[/?#]", text, 1)[0]
+    # "name@example.com" is far more likely an address to search for than userinfo
+    if "@" in authority:
+        return None
+    if authority.startswith("["):
+        host, bracket, rest = authority[1:].partition("]")
+        if not bracket or (rest and not re.fullmatch(r":\d{1,5}", rest)):
+            return None
+        return host
+    # A bare IPv6 address such as "::1", its colons are not a port separator
+    if authority.count(":") > 1:
+        try:
+            ipaddress.ip_address(authority)
+            return authority
+        except ValueError:
+            return None
+    host, colon, port = authority.partition(":")
+    if colon and not re.fullmatch(r"\d{1,5}", port):
+        return None
+    return host.rstrip(".")
+
+def classify_host(host):
+    """Return "local", "ip" or "domain" for hosts a URL can point at, None otherwise"""
+    if not host:
+        return None
+    # Parsing an address is comparatively slow, only try it when the host can be one
+    if ":" in host or host[0].isdigit():
+        try:
+            ipaddress.ip_address(host)
+            return "ip"
+        except ValueError:
+            pass
+    host = host.lower()
+    if host in LOCAL_HOSTS or host.endswith(".localhost"):
+        return "local"
+    try:
+        host = PublicSuffixTrie.to_ascii(host)
+    except UnicodeError:
+        return None
+    labels = host.split(".")
+    if len(labels) < 2 or not all(HOST_LABEL_RE.match(label) for label in labels):
+        return None
+    # A registrable name needs at least one label in front of its public suffix
+    suffix = get_suffix_trie().suffix_length(labels)
+    return "domain" if 0 < suffix < len(labels) else None
+
 def is_url(input_str):
     """Check if the input should be treated as a URL"""
-    domain_extensions = {
-        '.com', '.onion', '.org', '.net', '.info', '.biz', '.edu', '.gov',
-        '.mil', '.pro', '.name', '.aero', '.asia', '.cat', '.coop',
-        '.jobs', '.mobi', '.museum', '.tel', '.travel', '.us', '.uk',
-        '.ca', '.au', '.de', '.fr', '.cn', '.in', '.jp', '.app',
-        '.blog', '.club', '.design', '.dev', '.guru', '.tech', '.xyz',
-        '.shop', '.online'
-    }
-    
-    input_lower = input_str.lower()
-    
-    # Check if it starts with http/https or www
-    if input_lower.startswith(('http://', 'https://', 'www.')):
+    text = input_str.strip()
+    if not text or any(c.isspace() for c in text):
+        return False
+    if SCHEME_RE.match(text) or text.lower().startswith(URL_PREFIXES):
         return True
-    
-    # Check if it ends with any known domain extension
-    return any(input_lower.endswith(ext) for ext in domain_extensions)
+    return classify_host(split_host(text)) is not None
 
 def process_input(input_str):
     """Process input and return either URL or search URL"""
-    if is_url(input_str):
-        if not input_str.startswith(('http://', 'https://')):
-            return f'https://{input_str}'
-        return input_str
-    else:
-        return f'https://www.google.com/search?q={input_str.replace(" ", "+")}'
-class DownloadItem(QWidget):
-    def __init__(self, download, parent=None):
-        super().__init__(parent)
-        logging.debug(f"Initializing download for: {download.suggestedFileName()}")
-        self.download = download
-        self.is_finished = False
+    text = input_str.strip()
+    if not is_url(text):
+        return f'https://www.google.com/search?q={quote_plus(text)}'
+    if SCHEME_RE.match(text) or text.lower().startswith(URL_PREFIXES):
+        return text
+    host = split_host(text)
+    kind = classify_host(host)
+    if kind == "ip" and ":" in host and not text.startswith("["):
+        # IPv6 addresses need brackets in a URL
+        text = f"[{host}]{text[len(host):]}"
+    # Local development servers rarely speak TLS
+    if kind in ("local", "ip"):
+        return f'http://{text}'
+    return f'https://{text}'
 
-        # Initialize last_update and last_bytes
-        self.last_update = QDateTime.currentDateTime()
-        self.last_bytes = 0
+class RateEstimator:
+    """Exponentially weighted moving average of a transfer rate in bytes per second"""
+    def __init__(self, time_constant=3.0):
+        self.time_constant = time_constant
+        self.reset()
 
-        # Layout
-        layout = QVBoxLayout()
-        layout.setContentsMargins(5, 5, 5, 5)
-
-        # Top row (filename and buttons)
-        top_layout = QHBoxLayout()
-        self.filename_label = QLabel(download.suggestedFileName())
-        self.filename_label.setStyleSheet("font-weight: bold;")
-        self.pause_btn = QPushButton("Pause")
-        self.cancel_btn = QPushButton("Cancel")
-        top_layout.addWidget(self.filename_label)
-        top_layout.addStretch()
-        top_layout.addWidget(self.pause_btn)
-        top_layout.addWidget(self.cancel_btn)
+    def reset(self):
+        self.rate = 0.0
+        self.last_time = None
+        self.last_bytes = 0
 
-        # Progress bar
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 100)
+    def update(self, now, total_bytes):
+        """Add a sample of the cumulative byte count at time now and return the smoothed rate"""
+        if self.last_time is None:
+            self.last_time = now
+            self.last_bytes = total_bytes
+            return self.rate
+        elapsed = now - self.last_time
+        if elapsed <= 0:
+            return self.rate
+        sample = max(total_bytes - self.last_bytes, 0) / elapsed
+        # Weight depends on the sample interval so irregular ticks stay consistent
+        alpha = 1 - math.exp(-elapsed / self.time_constant)
+        self.rate += alpha * (sample - self.rate)
+        if self.rate < 1:
+            self.rate = 0.0
+        self.last_time = now
+        self.last_bytes = total_bytes
+        return self.rate
 
-        # Bottom row (status, speed, and time left)
-        bottom_layout = QHBoxLayout()
-        self.status_label = QLabel("Starting download...")
-        self.speed_label = QLabel()
-        self.time_left_label = QLabel()
-        bottom_layout.addWidget(self.status_label)
-        bottom_layout.addStretch()
-        bottom_layout.addWidget(self.speed_label)
-        bottom_layout.addWidget(self.time_left_label)
-
-        # Add to main layout
-        layout.addLayout(top_layout)
-        layout.addWidget(self.progress_bar)
-        layout.addLayout(bottom_layout)
-        self.setLayout(layout)
+class DownloadItem(QObject):
+    """Tracks one live download and mirrors its progress into its history record"""
+    changed = pyqtSignal(object)
+    state_changed = pyqtSignal(object)
 
-        # Connections
-        self.pause_btn.clicked.connect(self.toggle_pause)
-        self.cancel_btn.clicked.connect(self.cancel_download)
+    def __init__(self, download, parent=None):
+        super().__init__(parent)
+        logging.debug("Initializing download for: %s", download.suggestedFileName())
+        self.download = download
+        self.is_finished = False
+        self.record = {
+            "id": None,
+            "filename": download.downloadFileName() or download.suggestedFileName(),
+            "url": download.url().toString(),
+            "path": os.path.join(download.downloadDirectory(), download.downloadFileName()),
+            "received": 0,
+            "total": download.totalBytes(),
+            "state": "downloading",
+            "started_at": time.time(),
+            "finished_at": None,
+            "status": "Starting download...",
+            "speed": "",
+            "time_left": "",
+        }
 
-        # Connect download progress signals
-        self.download.receivedBytesChanged.connect(self.update_progress)
-        self.download.totalBytesChanged.connect(self.update_progress)
-        logging.debug(f"Connected download progress signals for {download.suggestedFileName()}")
+        # Progress is sampled by DownloadProgressEngine, not per signal
+        self.rate = RateEstimator()
+        self.last_received = -1
+        self.last_total = -1
 
-    def update_progress(self):
+    def update_progress(self, now):
+        """Refresh the record from a progress sample, returns False if nothing changed"""
         bytes_received = self.download.receivedBytes()
         bytes_total = self.download.totalBytes()
         try:
-            logging.debug(f"update_progress called: bytes_received={bytes_received}, bytes_total={bytes_total}")
+            # Downloads paused briefly by the bandwidth cap keep their smoothed rate
+            if self.download.isPaused() and self.record["state"] != "downloading":
+                self.rate.reset()
+                return False
+            speed = self.rate.update(now, bytes_received)
+            if bytes_received == self.last_received and bytes_total == self.last_total and speed == 0:
+                return False
+            self.last_received = bytes_received
+            self.last_total = bytes_total
+
+            record = self.record
+            record["received"] = bytes_received
+            record["total"] = bytes_total
+            record["speed"] = self.format_speed(speed)
             if bytes_total > 0:
                 percent = int((bytes_received / bytes_total) * 100)
-                self.progress_bar.setValue(percent)
-
-                # Calculate speed and time left
-                elapsed = self.last_update.msecsTo(QDateTime.currentDateTime())
-                if elapsed > 0:
-                    speed = (bytes_received - self.last_bytes) / (elapsed / 1000)
-                    self.speed_label.setText(f"{self.format_speed(speed)}")
-
-                    # Calculate time left
-                    remaining_bytes = bytes_total - bytes_received
-                    if speed > 0:
-                        time_left = remaining_bytes / speed
-                        self.time_left_label.setText(f"Time left: {self.format_time(time_left)}")
-                    else:
-                        self.time_left_label.setText("Time left: Calculating...")
 
-                self.last_update = QDateTime.currentDateTime()
-                self.last_bytes = bytes_received
-                self.status_label.setText(
-                    f"Downloading... {self.format_size(bytes_received)} of {self.format_size(bytes_total)}"
-                )
-                logging.debug(f"Download progress: {percent}% - Speed: {self.speed_label.text()} - Time left: {self.time_left_label.text()}")
+                # Time left from the smoothed rate
+                remaining_bytes = bytes_total - bytes_received
+                if speed > 0:
+                    record["time_left"] = f"Time left: {self.format_time(remaining_bytes / speed)}"
+                else:
+                    record["time_left"] = "Time left: Calculating..."
+
+                record["status"] = f"Downloading... {self.format_size(bytes_received)} of {self.format_size(bytes_total)}"
+                logging.debug("Download progress: %s%% - Speed: %s - %s", percent, record["speed"],
+                              record["time_left"], extra={"throttle": 1.0, "throttle_key": id(self)})
             else:
-                self.status_label.setText("Downloading... size unknown")
+                record["status"] = f"Downloading... {self.format_size(bytes_received)}, size unknown"
+            self.changed.emit(record)
+            return True
         except Exception as e:
-            logging.error(f"Error updating progress: {str(e)}")
+            logging.error("Error updating progress: %s", e)
+            return False
 
     def toggle_pause(self):
+        if self.is_finished:
+            return
         try:
-            if self.download.isPaused():
-                logging.info(f"Resuming download: {self.download.suggestedFileName()}")
+            if self.record["state"] == "paused":
+                # The scheduler decides whether it runs now or waits in the queue
+                logging.info("Resuming download: %s", self.download.suggestedFileName())
                 self.download.resume()
-                self.pause_btn.setText("Pause")
-                self.status_label.setText("Resuming download...")
+                self.record["state"] = "downloading"
+                self.record["status"] = "Resuming download..."
             else:
-                logging.info(f"Pausing download: {self.download.suggestedFileName()}")
+                logging.info("Pausing download: %s", self.download.suggestedFileName())
                 self.download.pause()
-                self.pause_btn.setText("Resume")
-                self.status_label.setText("Download paused")
+                self.record["state"] = "paused"
+                self.record["status"] = "Download paused"
+                self.record["speed"] = ""
+                self.record["time_left"] = ""
+            self.state_changed.emit(self.record)
+            self.changed.emit(self.record)
         except Exception as e:
-            logging.error(f"Error toggling pause: {str(e)}")
+            logging.error("Error toggling pause: %s", e)
 
     def cancel_download(self):
-        logging.info(f"Cancelling download: {self.download.suggestedFileName()}")
+        if self.is_finished:
+            return
+        logging.info("Cancelling download: %s", self.download.suggestedFileName())
         self.download.cancel()
-        self.status_label.setText("Download cancelled")
-        self.is_finished = True
+        self.set_cancelled()
+
+    def set_cancelled(self):
+        self.finish("cancelled", "Download cancelled")
 
     def set_finished(self, finished):
-        self.is_finished = finished
         if finished:
-            self.pause_btn.setEnabled(False)
-            self.cancel_btn.setEnabled(False)
-            self.status_label.setText("Download complete")
-            self.speed_label.clear()
-            self.time_left_label.clear()
+            self.record["received"] = self.record["total"] = self.download.totalBytes()
+            self.finish("completed", "Download complete")
 
     def set_interrupted(self, reason):
-        self.status_label.setText(f"Download failed: {reason}")
+        self.finish("interrupted", f"Download failed: {reason}")
+
+    def finish(self, state, status):
         self.is_finished = True
+        self.record.update(state=state, status=status, speed="", time_left="", finished_at=time.time())
+        self.state_changed.emit(self.record)
+        self.changed.emit(self.record)
 
     @staticmethod
     def format_size(bytes_num):
@@ -206,14 +634,992 @@ class DownloadItem(QWidget):
             minutes = int((seconds % 3600) // 60)
             return f"{hours}h {minutes}m"
 
-class DownloadManager(QMainWindow):
+class DownloadProgressEngine(QObject):
+    """Samples every active download on one shared timer and refreshes only changed rows"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(get_settings().value("downloads/progress_interval_ms", 250, type=int))
+        self.timer.timeout.connect(self.tick)
+
+    def add(self, item):
+        self.items.append(item)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def tick(self):
+        now = time.monotonic()
+        for item in list(self.items):
+            try:
+                state = item.download.state()
+                if state == QWebEngineDownloadRequest.DownloadState.DownloadCompleted:
+                    item.set_finished(True)
+                elif state == QWebEngineDownloadRequest.DownloadState.DownloadInterrupted:
+                    item.set_interrupted(item.download.interruptReasonString())
+                elif state == QWebEngineDownloadRequest.DownloadState.DownloadCancelled:
+                    item.set_cancelled()
+                else:
+                    item.update_progress(now)
+            except Exception as e:
+                logging.error("Error sampling download: %s", e)
+                item.is_finished = True
+            if item.is_finished:
+                self.items.remove(item)
+        if not self.items:
+            self.timer.stop()
+
+class DownloadHistoryStore:
+    """On-disk download history with keyset paging and a filename/URL search index"""
+    COLUMNS = ("id", "filename", "url", "path", "received", "total", "state", "started_at", "finished_at")
+
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                id INTEGER PRIMARY KEY,
+                filename TEXT NOT NULL,
+                url TEXT NOT NULL,
+                path TEXT NOT NULL,
+                received INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self.has_fts = self.create_search_index()
+        # Downloads that were running when the browser exited cannot be resumed
+        self.db.execute(
+            "UPDATE downloads SET state = 'interrupted' WHERE state IN ('downloading', 'paused', 'queued')"
+        )
+        self.db.commit()
+
+    def create_search_index(self):
+        """Create the FTS5 index over filename and URL, returns False if FTS5 is unavailable"""
+        try:
+            self.db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts
+                    USING fts5(filename, url, content='downloads', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS downloads_ai AFTER INSERT ON downloads BEGIN
+                    INSERT INTO downloads_fts(rowid, filename, url) VALUES (new.id, new.filename, new.url);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_ad AFTER DELETE ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, filename, url)
+                        VALUES ('delete', old.id, old.filename, old.url);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_au AFTER UPDATE OF filename, url ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, filename, url)
+                        VALUES ('delete', old.id, old.filename, old.url);
+                    INSERT INTO downloads_fts(rowid, filename, url) VALUES (new.id, new.filename, new.url);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError as e:
+            logging.warning("FTS5 unavailable, download search falls back to LIKE: %s", e)
+            return False
+
+    def add(self, record):
+        """Insert a record and assign its id"""
+        values = [record[column] for column in self.COLUMNS[1:]]
+        with self.db:
+            cursor = self.db.execute(
+                f"INSERT INTO downloads ({', '.join(self.COLUMNS[1:])}) VALUES ({', '.join('?' * len(values))})",
+                values,
+            )
+        record["id"] = cursor.lastrowid
+        return record["id"]
+
+    def update(self, record):
+        assignments = ", ".join(f"{column} = ?" for column in self.COLUMNS[1:])
+        values = [record[column] for column in self.COLUMNS[1:]]
+        with self.db:
+            self.db.execute(f"UPDATE downloads SET {assignments} WHERE id = ?", (*values, record["id"]))
+
+    def delete(self, record_id):
+        with self.db:
+            self.db.execute("DELETE FROM downloads WHERE id = ?", (record_id,))
+
+    def page(self, before_id=None, limit=100, query=""):
+        """Return up to limit records older than before_id, newest first"""
+        columns = ", ".join(f"d.{column}" for column in self.COLUMNS)
+        conditions = []
+        params = []
+        join = ""
+        tokens = re.findall(r"\w+", query)
+        if tokens and self.has_fts:
+            join = "JOIN downloads_fts f ON f.rowid = d.id"
+            conditions.append("downloads_fts MATCH ?")
+            params.append(" ".join(f'"{token}"*' for token in tokens))
+        elif query:
+            conditions.append("(d.filename LIKE ? OR d.url LIKE ?)")
+            params += [f"%{query}%", f"%{query}%"]
+        if before_id is not None:
+            conditions.append("d.id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.db.execute(
+            f"SELECT {columns} FROM downloads d {join} {where} ORDER BY d.id DESC LIMIT ?", (*params, limit)
+        )
+        records = []
+        for row in cursor:
+            record = dict(zip(self.COLUMNS, row))
+            record.update(status=self.describe(record), speed="", time_left="")
+            records.append(record)
+        return records
+
+    @staticmethod
+    def describe(record):
+        """Status line for a record that is not downloading"""
+        size = DownloadItem.format_size(record["total"] or record["received"])
+        return {
+            "completed": f"Download complete - {size}",
+            "cancelled": "Download cancelled",
+            "interrupted": "Download failed",
+        }.get(record["state"], record["state"].capitalize())
+
+    def close(self):
+        self.db.close()
+
+class DownloadListModel(QAbstractListModel):
+    """Pages download records in from the history store as the view scrolls"""
+    RecordRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.rows = []
+        self.live = {}
+        self.query = ""
+        self.exhausted = False
+        self.page_size = 100
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return record["filename"]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return record["url"]
+        if role == self.RecordRole:
+            return record
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        before_id = self.rows[-1]["id"] if self.rows else None
+        records = self.store.page(before_id, self.page_size, self.query)
+        # Live downloads keep their own record so progress updates reach the view
+        records = [self.live[r["id"]].record if r["id"] in self.live else r for r in records]
+        self.exhausted = len(records) < self.page_size
+        if not records:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(records) - 1)
+        self.rows.extend(records)
+        self.endInsertRows()
+
+    def set_query(self, query):
+        self.beginResetModel()
+        self.query = query.strip()
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+
+    def matches(self, record):
+        query = self.query.lower()
+        return not query or query in record["filename"].lower() or query in record["url"].lower()
+
+    def add_live(self, item):
+        self.live[item.record["id"]] = item
+        if not self.matches(item.record):
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.rows.insert(0, item.record)
+        self.endInsertRows()
+
+    def row_of(self, record):
+        # Live downloads are the newest records, so they sit near the top
+        for row, candidate in enumerate(self.rows):
+            if candidate is record:
+                return row
+        return -1
+
+    def refresh(self, record):
+        row = self.row_of(record)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def remove(self, record):
+        row = self.row_of(record)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+
+class DownloadItemDelegate(QStyledItemDelegate):
+    """Paints a download row: filename, progress bar, status, speed and time left"""
+    ROW_HEIGHT = 62
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        record = index.data(DownloadListModel.RecordRole)
+        if record is None:
+            return
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        painter.save()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, widget)
+        rect = option.rect.adjusted(6, 4, -6, -4)
+        metrics = option.fontMetrics
+
+        # Top row (filename)
+        bold = QFont(option.font)
+        bold.setBold(True)
+        painter.setFont(bold)
+        top = QRect(rect.left(), rect.top(), rect.width(), metrics.height())
+        painter.drawText(top, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         QFontMetrics(bold).elidedText(record["filename"], Qt.TextElideMode.ElideMiddle, top.width()))
+
+        # Progress bar
+        bar = QStyleOptionProgressBar()
+        bar.rect = QRect(rect.left(), top.bottom() + 4, rect.width(), 12)
+        bar.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Horizontal
+        bar.minimum = 0
+        bar.maximum = 100
+        if record["state"] == "completed":
+            bar.progress = 100
+        elif record["total"] > 0:
+            bar.progress = int(record["received"] / record["total"] * 100)
+        else:
+            bar.progress = 0
+        style.drawControl(QStyle.ControlElement.CE_ProgressBar, bar, painter, widget)
+
+        # Bottom row (status, speed, and time left)
+        painter.setFont(option.font)
+        bottom = QRect(rect.left(), bar.rect.bottom() + 4, rect.width(), metrics.height())
+        right = " ".join(part for part in (record["speed"], record["time_left"]) if part)
+        status = record["status"]
+        if record.get("verification"):
+            status = f"{status} - {record['verification']}"
+        painter.drawText(bottom, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, status)
+        painter.drawText(bottom, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, right)
+        painter.restore()
+
+class DownloadScheduler(QObject):
+    """Limits concurrent downloads and bandwidth by pausing and resuming accepted downloads"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.max_concurrent = settings.value("downloads/max_concurrent", 3, type=int)
+        self.max_concurrent_tor = settings.value("downloads/max_concurrent_tor", 1, type=int)
+        # Caps in bytes per second, 0 means unlimited
+        self.global_cap = settings.value("downloads/bandwidth_cap_kbps", 0, type=int) * 1024
+        self.per_download_cap = settings.value("downloads/per_download_cap_kbps", 0, type=int) * 1024
+        self.tor_enabled = False
+
+        # Items in priority order, highest first
+        self.queue = []
+        self.throttled = {}
+        self.last_bytes = {}
+        self.last_tick = None
+        self.scheduling = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.tick)
+
+    @property
+    def limit(self):
+        return max(self.max_concurrent_tor if self.tor_enabled else self.max_concurrent, 1)
+
+    def submit(self, item):
+        """Accept a new download and queue it behind the running ones"""
+        self.queue.append(item)
+        item.state_changed.connect(lambda _: self.schedule())
+        item.download.accept()
+        self.schedule()
+        if not self.timer.isActive():
+            self.last_tick = time.monotonic()
+            self.timer.start()
+
+    def set_tor_enabled(self, enabled):
+        self.tor_enabled = enabled
+        self.schedule()
+
+    def move(self, item, delta):
+        if item not in self.queue:
+            return
+        index = self.queue.index(item)
+        new_index = min(max(index + delta, 0), len(self.queue) - 1)
+        self.queue.insert(new_index, self.queue.pop(index))
+        self.schedule()
+
+    def move_to_front(self, item):
+        self.move(item, -len(self.queue))
+
+    def set_state(self, item, state, status):
+        if item.record["state"] == state and item.record["status"] == status:
+            return
+        item.record["state"] = state
+        item.record["status"] = status
+        if state != "downloading":
+            item.record["speed"] = item.record["time_left"] = ""
+        item.state_changed.emit(item.record)
+        item.changed.emit(item.record)
+
+    def schedule(self):
+        """Run the highest priority downloads up to the limit and hold the rest"""
+        if self.scheduling:
+            return
+        self.scheduling = True
+        try:
+            self.queue = [item for item in self.queue if not item.is_finished]
+            running = 0
+            position = 0
+            for item in self.queue:
+                state = item.record["state"]
+                if state == "paused":
+                    continue
+                if running < self.limit:
+                    running += 1
+                    if state == "queued":
+                        logging.info("Starting queued download: %s", item.record["filename"])
+                        item.download.resume()
+                        self.set_state(item, "downloading", "Starting download...")
+                    elif item not in self.throttled and item.download.isPaused():
+                        item.download.resume()
+                else:
+                    position += 1
+                    if state != "queued":
+                        item.download.pause()
+                        self.throttled.pop(item, None)
+                    self.set_state(item, "queued", f"Queued (#{position})")
+        except Exception as e:
+            logging.error("Error scheduling downloads: %s", e)
+        finally:
+            self.scheduling = False
+
+    def tick(self):
+        """Keep running downloads within the bandwidth caps by pausing them briefly"""
+        now = time.monotonic()
+        elapsed = max(now - self.last_tick, 0.001)
+        self.last_tick = now
+
+        # Release downloads whose throttle interval is over
+        for item, until in list(self.throttled.items()):
+            if until <= now or item.is_finished:
+                del self.throttled[item]
+                if not item.is_finished and item.record["state"] == "downloading":
+                    item.download.resume()
+
+        self.queue = [item for item in self.queue if not item.is_finished]
+        if not self.queue:
+            self.timer.stop()
+            self.last_bytes.clear()
+            return
+
+        rates = {}
+        for item in self.queue:
+            received = item.download.receivedBytes()
+            rates[item] = max(received - self.last_bytes.get(item, received), 0) / elapsed
+            self.last_bytes[item] = received
+        running = [item for item in self.queue
+                   if item.record["state"] == "downloading" and item not in self.throttled]
+
+        # Per-download cap: pause for as long as the overshoot would take at the cap
+        if self.per_download_cap:
+            for item in running:
+                excess = rates[item] * elapsed / self.per_download_cap - elapsed
+                if excess > 0:
+                    self.throttle(item, now + excess)
+
+        # Global cap: pause the lowest priority downloads until the total fits
+        if self.global_cap:
+            excess = sum(rates[item] for item in running) - self.global_cap
+            for item in reversed(running):
+                if excess <= 0:
+                    break
+                if item not in self.throttled:
+                    self.throttle(item, now + self.timer.interval() / 1000)
+                excess -= rates[item]
+
+    def throttle(self, item, until):
+        self.throttled[item] = until
+        item.download.pause()
+
+class SocksHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that always tunnels through a SOCKS proxy, it never connects directly"""
+    def __init__(self, host, port=None, proxy_url=None, timeout=30):
+        super().__init__(host, port, timeout=timeout)
+        self.proxy_url = proxy_url
+
+    def connect(self):
+        proxy = SocksProxy.from_url(self.proxy_url, rdns=True)
+        self.sock = proxy.connect(dest_host=self.host, dest_port=self.port, timeout=self.timeout)
+
+class SocksHTTPSConnection(SocksHTTPConnection):
+    default_port = 443
+
+    def connect(self):
+        super().connect()
+        context = ssl.create_default_context()
+        self.sock = context.wrap_socket(self.sock, server_hostname=self.host)
+
+class ConnectionPool:
+    """Keeps idle keep-alive connections to one origin for reuse across segments"""
+    def __init__(self, scheme, host, port, proxy_url=None, max_idle=8, timeout=30):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy_url = proxy_url
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        if self.proxy_url:
+            cls = SocksHTTPSConnection if self.scheme == "https" else SocksHTTPConnection
+            return cls(self.host, self.port, proxy_url=self.proxy_url, timeout=self.timeout)
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout,
+                                               context=ssl.create_default_context())
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def put(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+class Segment:
+    """Byte range [start, end] of a segmented download, pos is the next byte to fetch"""
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.pos = start
+
+    @property
+    def done(self):
+        return self.pos > self.end
+
+class SegmentedDownload(QObject):
+    """Downloads a file over parallel HTTP range requests into a preallocated file.
+
+    Exposes the parts of the QWebEngineDownloadRequest API that DownloadItem,
+    DownloadProgressEngine and DownloadScheduler use, so it can replace one.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, url, path, total, headers, pool, executor, segments=4, max_retries=5, parent=None):
+        super().__init__(parent)
+        self.source_url = QUrl(url)
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.total = total
+        self.headers = headers
+        self.pool = pool
+        self.executor = executor
+        self.max_retries = max_retries
+        self.request_path = self.source_url.toString(
+            QUrl.UrlFormattingOption.RemoveScheme | QUrl.UrlFormattingOption.RemoveAuthority
+            | QUrl.UrlFormattingOption.RemoveFragment
+        ) or "/"
+
+        size = -(-total // max(segments, 1))
+        self.segments = [Segment(start, min(start + size, total) - 1) for start in range(0, total, size)]
+        self.received = 0
+        self.status = "requested"
+        self.reason = ""
+        self.fd = None
+        self.active = 0
+        # Set when the server ignores ranges, the rest is fetched as one stream from the first byte
+        self.single_stream = False
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    # QWebEngineDownloadRequest compatible accessors
+    def url(self):
+        return self.source_url
+
+    def suggestedFileName(self):
+        return os.path.basename(self.path)
+
+    def downloadFileName(self):
+        return os.path.basename(self.path)
+
+    def downloadDirectory(self):
+        return os.path.dirname(self.path)
+
+    def totalBytes(self):
+        return self.total
+
+    def receivedBytes(self):
+        return self.received
+
+    def isPaused(self):
+        return self.status == "paused"
+
+    def isFinished(self):
+        return self.status in ("completed", "interrupted", "cancelled")
+
+    def interruptReasonString(self):
+        return self.reason
+
+    def state(self):
+        return {
+            "completed": QWebEngineDownloadRequest.DownloadState.DownloadCompleted,
+            "interrupted": QWebEngineDownloadRequest.DownloadState.DownloadInterrupted,
+            "cancelled": QWebEngineDownloadRequest.DownloadState.DownloadCancelled,
+            "requested": QWebEngineDownloadRequest.DownloadState.DownloadRequested,
+        }.get(self.status, QWebEngineDownloadRequest.DownloadState.DownloadInProgress)
+
+    def accept(self):
+        """Preallocate the file and start fetching all segments"""
+        if self.status != "requested":
+            return
+        try:
+            self.fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(self.fd, 0, self.total)
+            else:
+                os.ftruncate(self.fd, self.total)
+        except OSError as e:
+            self.fail(f"Cannot create file: {e}")
+            return
+        self.status = "in_progress"
+        self.start_segments()
+
+    def pause(self):
+        if self.status == "in_progress":
+            self.status = "paused"
+            self.stop_event.set()
+
+    def resume(self):
+        if self.status != "paused":
+            return
+        self.status = "in_progress"
+        self.start_segments()
+
+    def cancel(self):
+        if self.isFinished():
+            return
+        self.status = "cancelled"
+        self.stop_event.set()
+        with self.lock:
+            if self.active == 0:
+                self.cleanup(remove=True)
+
+    def start_segments(self):
+        with self.lock:
+            # Wait until workers from a previous pause have exited
+            if self.active:
+                return
+            self.stop_event.clear()
+            if self.single_stream and len(self.segments) > 1:
+                self.segments = [Segment(0, self.total - 1)]
+                self.received = 0
+            pending = [segment for segment in self.segments if not segment.done]
+            self.active = len(pending)
+        for segment in pending:
+            future = self.executor.submit(self.run_segment, segment)
+            future.add_done_callback(self.on_segment_done)
+
+    def run_segment(self, segment):
+        """Fetch one byte range, resuming from the last written byte after failures"""
+        attempts = 0
+        while not segment.done and not self.stop_event.is_set():
+            conn = self.pool.get()
+            try:
+                headers = dict(self.headers)
+                headers["Range"] = f"bytes={segment.pos}-{segment.end}"
+                conn.request("GET", self.request_path, headers=headers)
+                response = conn.getresponse()
+                if response.status == 200 and self.single_stream:
+                    # The whole body again, restart the stream at the first byte
+                    with self.lock:
+                        self.received -= segment.pos
+                        segment.pos = 0
+                elif response.status == 200:
+                    # Reading would fetch the whole file once per segment, stop them all and
+                    # continue as one stream once every worker has exited
+                    conn.close()
+                    with self.lock:
+                        if not self.single_stream:
+                            logging.info("Server ignored the range request for %s, using a single stream",
+                                         self.suggestedFileName())
+                        self.single_stream = True
+                    self.stop_event.set()
+                    return
+                elif response.status != 206:
+                    raise IOError(f"Server answered {response.status} to a range request")
+                while not segment.done and not self.stop_event.is_set():
+                    chunk = response.read(min(self.CHUNK_SIZE, segment.end - segment.pos + 1))
+                    if not chunk:
+                        break
+                    os.pwrite(self.fd, chunk, segment.pos)
+                    with self.lock:
+                        segment.pos += len(chunk)
+                        self.received += len(chunk)
+                if segment.done:
+                    response.read()
+                    self.pool.put(conn)
+                    return
+                conn.close()
+                if not self.stop_event.is_set():
+                    raise IOError("Connection closed before the segment was complete")
+            except Exception as e:
+                conn.close()
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise
+                logging.warning("Segment %s-%s of %s failed (%s), retrying", segment.pos, segment.end,
+                                self.suggestedFileName(), e)
+                self.stop_event.wait(min(0.5 * 2 ** attempts, 30))
+
+    def on_segment_done(self, future):
+        error = future.exception()
+        with self.lock:
+            self.active -= 1
+            if error and not self.reason:
+                self.reason = str(error)
+                self.stop_event.set()
+            if self.active:
+                return
+        if self.status == "cancelled":
+            self.cleanup(remove=True)
+        elif all(segment.done for segment in self.segments):
+            self.complete()
+        elif self.reason:
+            self.fail(self.reason)
+        elif self.status == "in_progress":
+            # Resumed while the last workers were still stopping
+            self.start_segments()
+
+    def complete(self):
+        try:
+            os.fsync(self.fd)
+            self.cleanup()
+            os.replace(self.part_path, self.path)
+            self.status = "completed"
+            logging.info("Segmented download complete: %s", self.path)
+        except OSError as e:
+            self.fail(f"Cannot finish file: {e}")
+
+    def fail(self, reason):
+        logging.error("Segmented download failed: %s: %s", self.suggestedFileName(), reason)
+        self.reason = reason
+        self.status = "interrupted"
+        self.cleanup()
+
+    def cleanup(self, remove=False):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if remove:
+            try:
+                os.remove(self.part_path)
+            except OSError:
+                pass
+
+class SegmentedDownloadEngine(QObject):
+    """Moves large downloads from servers that support range requests onto SegmentedDownload"""
+    probe_finished = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.enabled = settings.value("downloads/segmented", True, type=bool)
+        self.min_size = settings.value("downloads/segmented_min_mb", 8, type=int) * 1024 * 1024
+        self.segments = settings.value("downloads/segments", 4, type=int)
+        self.max_retries = settings.value("downloads/segment_retries", 5, type=int)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.value("downloads/max_connections", 8, type=int),
+            thread_name_prefix="segmented-download",
+        )
+        self.pools = {}
+        self.downloads = []
+
+    def pool_for(self, url, proxy_url):
+        qurl = QUrl(url)
+        scheme = qurl.scheme()
+        port = qurl.port(443 if scheme == "https" else 80)
+        key = (scheme, qurl.host(), port, proxy_url)
+        if key not in self.pools:
+            self.pools[key] = ConnectionPool(scheme, qurl.host(), port, proxy_url)
+        return self.pools[key]
+
+    def probe(self, item, url, headers, proxy_url=None):
+        """Check range support in the background, emits probe_finished(item, (url, total) or None)"""
+        if proxy_url and SocksProxy is None:
+            logging.debug("python-socks is not installed, not segmenting proxied download")
+            return
+        future = self.executor.submit(self.probe_url, url, headers, proxy_url)
+        future.add_done_callback(lambda f: self.probe_finished.emit(item, None if f.exception() else f.result()))
+
+    def probe_url(self, url, headers, proxy_url, redirects=5):
+        """Return (final_url, total_size) if the server honours byte ranges, otherwise None"""
+        for _ in range(redirects + 1):
+            qurl = QUrl(url)
+            if qurl.scheme() not in ("http", "https"):
+                return None
+            pool = self.pool_for(url, proxy_url)
+            conn = pool.get()
+            try:
+                path = qurl.toString(
+                    QUrl.UrlFormattingOption.RemoveScheme | QUrl.UrlFormattingOption.RemoveAuthority
+                    | QUrl.UrlFormattingOption.RemoveFragment
+                ) or "/"
+                conn.request("GET", path, headers={**headers, "Range": "bytes=0-0"})
+                response = conn.getresponse()
+                location = response.getheader("Location")
+                content_range = response.getheader("Content-Range", "")
+                match = re.match(r"bytes 0-0/(\d+)", content_range)
+                # Only the one byte answer of a honoured range is read, a server ignoring the range
+                # would otherwise send the whole file here while the built-in download fetches it again
+                if response.status == 206 and match and response.length is not None and response.length <= 1:
+                    response.read()
+                    pool.put(conn)
+                else:
+                    conn.close()
+                if response.status in (301, 302, 303, 307, 308) and location:
+                    url = qurl.resolved(QUrl(location)).toString()
+                    continue
+                if response.status == 206 and match:
+                    return url, int(match.group(1))
+                return None
+            except Exception as e:
+                conn.close()
+                logging.debug("Range probe failed for %s: %s", url, e)
+                return None
+        return None
+
+    def create(self, url, path, total, headers, proxy_url=None):
+        download = SegmentedDownload(url, path, total, headers, self.pool_for(url, proxy_url), self.executor,
+                                     self.segments, self.max_retries, self)
+        self.downloads.append(download)
+        return download
+
+    def shutdown(self):
+        """Stop all workers so the process can exit, unfinished .part files are left behind"""
+        for download in self.downloads:
+            download.pause()
+        self.executor.shutdown(wait=False)
+        for pool in self.pools.values():
+            pool.close()
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+HASH_NAMES = {"md5": "MD5", "sha1": "SHA-1", "sha256": "SHA-256", "sha512": "SHA-512"}
+DIGEST_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+def hash_file(path, algorithms):
+    """Hash a file with several algorithms in one pass over a memory map"""
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, HASH_CHUNK_SIZE):
+                        chunk = view[offset:offset + HASH_CHUNK_SIZE]
+                        for hasher in hashers.values():
+                            hasher.update(chunk)
+                        chunk.release()
+                finally:
+                    view.release()
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+def find_sidecar_checksum(path):
+    """Look for a checksum next to a file, returns (algorithm, hexdigest) or None"""
+    directory, filename = os.path.split(path)
+    for algorithm in ("sha512", "sha256", "sha1", "md5"):
+        candidates = [f"{path}.{algorithm}", f"{path}.{algorithm}sum",
+                      os.path.join(directory, f"{algorithm.upper()}SUMS"),
+                      os.path.join(directory, f"{algorithm}sums.txt")]
+        for candidate in candidates:
+            if not os.path.isfile(candidate) or os.path.getsize(candidate) > 1024 * 1024:
+                continue
+            try:
+                with open(candidate, encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        digest = parse_checksum_line(line, filename, candidate.startswith(f"{path}."))
+                        if digest and DIGEST_LENGTHS.get(len(digest)) == algorithm:
+                            return algorithm, digest.lower()
+            except OSError:
+                continue
+    return None
+
+def parse_checksum_line(line, filename, single_file=False):
+    """Parse "<hex>  <name>", "<hex> *<name>" or BSD "ALG (<name>) = <hex>" lines"""
+    line = line.strip()
+    match = re.match(r"^\w+ \((.+)\) = ([0-9a-fA-F]+)$", line)
+    if match:
+        return match.group(2) if match.group(1) == filename else None
+    match = re.match(r"^([0-9a-fA-F]+)(?:\s+\*?(.+))?$", line)
+    if not match:
+        return None
+    name = match.group(2)
+    if (name is None and single_file) or (name and os.path.basename(name) == filename):
+        return match.group(1)
+    return None
+
+class DownloadVerifier(QObject):
+    """Hashes finished downloads on a worker pool and checks them against known checksums"""
+    verified = pyqtSignal(object, object)
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        settings = get_settings()
+        self.algorithms = self.supported_algorithms(settings_list(settings.value("downloads/verify_algorithms", "sha256")))
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="verify")
+        self.cache_file = os.path.join(get_data_dir(), "hash_cache.json")
+        self.cache_limit = 2000
+        self.cache_lock = threading.Lock()
+        try:
+            with open(self.cache_file) as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    @staticmethod
+    def supported_algorithms(names):
+        """Drop hash names hashlib does not know, once here instead of failing every verification"""
+        algorithms = []
+        for name in names:
+            name = name.lower()
+            try:
+                hashlib.new(name)
+            except ValueError:
+                logging.warning("Ignoring unknown hash algorithm in downloads/verify_algorithms: %s", name)
+                continue
+            if name not in algorithms:
+                algorithms.append(name)
+        return algorithms
+
+    def verify(self, record, expected=None):
+        """Hash record["path"] in the background, expected is an (algorithm, hexdigest) pair"""
+        record["verification"] = "Verifying..."
+        future = self.executor.submit(self.run, record["path"], expected)
+        future.add_done_callback(lambda f: self.verified.emit(record, self.result_of(f)))
+
+    @staticmethod
+    def result_of(future):
+        try:
+            return future.result()
+        except Exception as e:
+            logging.error("Verification failed: %s", e)
+            return {"error": str(e)}
+
+    def run(self, path, expected):
+        if expected is None:
+            expected = find_sidecar_checksum(path)
+        algorithms = set(self.algorithms)
+        if expected:
+            algorithms.add(expected[0])
+
+        stat = os.stat(path)
+        key = f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        with self.cache_lock:
+            digests = dict(self.cache.get(key, {}))
+        missing = algorithms - digests.keys()
+        if missing:
+            started = time.monotonic()
+            digests.update(hash_file(path, missing))
+            logging.info("Hashed %s (%s bytes) in %.2fs", path, stat.st_size, time.monotonic() - started)
+            self.store(key, digests)
+
+        result = {"digests": digests}
+        if expected:
+            algorithm, digest = expected
+            result["expected"] = expected
+            result["match"] = digests[algorithm] == digest.lower()
+        return result
+
+    def store(self, key, digests):
+        with self.cache_lock:
+            self.cache.pop(key, None)
+            self.cache[key] = digests
+            # Oldest entries go first, dicts keep insertion order
+            while len(self.cache) > self.cache_limit:
+                del self.cache[next(iter(self.cache))]
+            data = json.dumps(self.cache).encode()
+        try:
+            atomic_write(self.cache_file, data)
+        except OSError as e:
+            logging.error("Failed to save hash cache: %s", e)
+
+    @staticmethod
+    def describe(result):
+        if "error" in result:
+            return "Verification failed"
+        if "expected" in result:
+            name = HASH_NAMES.get(result["expected"][0], result["expected"][0])
+            return f"{name} verified" if result["match"] else f"{name} MISMATCH"
+        if "sha256" in result["digests"]:
+            return f"SHA-256 {result['digests']['sha256'][:12]}..."
+        return ""
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+class DownloadManager(QMainWindow):
+    def __init__(self, parent=None, scheduler=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
         self.setWindowTitle("Download Manager")
         self.setGeometry(100, 100, 600, 400)
         
-        self.download_list = QListWidget()
+        self.history = DownloadHistoryStore(os.path.join(get_data_dir(), "downloads.db"))
+        self.model = DownloadListModel(self.history, self)
+        
+        # Finished files are hashed off the GUI thread
+        self.verifier = DownloadVerifier(self)
+        self.verifier.verified.connect(self.on_verified)
+        
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search downloads")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(lambda: self.model.set_query(self.search_bar.text()))
+        self.search_bar.textChanged.connect(self.search_timer.start)
+        
+        # Only visible rows are painted, history pages in as the list scrolls
+        self.download_list = QListView()
+        self.download_list.setModel(self.model)
+        self.download_list.setItemDelegate(DownloadItemDelegate(self.download_list))
+        self.download_list.setUniformItemSizes(True)
+        self.download_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.download_list.customContextMenuRequested.connect(self.show_context_menu)
+        self.download_list.doubleClicked.connect(lambda index: self.open_file(index.data(DownloadListModel.RecordRole)))
+        
         layout = QVBoxLayout()
+        layout.addWidget(self.search_bar)
         layout.addWidget(self.download_list)
         
         container = QWidget()
@@ -221,38 +1627,886 @@ class DownloadManager(QMainWindow):
         self.setCentralWidget(container)
     
     def add_download(self, download_item):
-        item = QListWidgetItem()
-        item.setSizeHint(download_item.sizeHint())
-        self.download_list.addItem(item)
-        self.download_list.setItemWidget(item, download_item)
-
-class BrowserTab(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.browser = QWebEngineView()
-        self.load_timeout = 30000  # 30 seconds
-        self.retry_count = 0
-        self.max_retries = 3
-        self.loading_timer = QTimer(self)
-        self.loading_timer.setSingleShot(True)
-        self.loading_timer.timeout.connect(self.on_load_timeout)
+        self.history.add(download_item.record)
+        download_item.changed.connect(self.model.refresh)
+        download_item.state_changed.connect(self.save_record)
+        self.model.add_live(download_item)
+    
+    def save_record(self, record):
+        try:
+            self.history.update(record)
+        except Exception as e:
+            logging.error("Failed to save download record: %s", e)
+        if record["state"] == "completed" and "verification" not in record:
+            self.verifier.verify(record)
+    
+    def on_verified(self, record, result):
+        record["verification"] = DownloadVerifier.describe(result)
+        record["digests"] = result.get("digests", {})
+        if result.get("match") is False:
+            logging.warning("Checksum mismatch for %s", record["path"])
+        self.model.refresh(record)
+    
+    def verify_with_checksum(self, record):
+        """Ask for an expected checksum and verify the file against it"""
+        text, ok = QInputDialog.getText(self, "Verify Checksum", "Expected checksum (MD5, SHA-1, SHA-256 or SHA-512):")
+        digest = text.strip().lower()
+        if not ok or not digest:
+            return
+        algorithm = DIGEST_LENGTHS.get(len(digest))
+        if algorithm is None or not re.fullmatch(r"[0-9a-f]+", digest):
+            QMessageBox.warning(self, "Verify Checksum", "That does not look like a supported checksum.")
+            return
+        self.verifier.verify(record, (algorithm, digest))
+        self.model.refresh(record)
+    
+    def show_context_menu(self, pos):
+        index = self.download_list.indexAt(pos)
+        record = index.data(DownloadListModel.RecordRole) if index.isValid() else None
+        if record is None:
+            return
+        item = self.model.live.get(record["id"])
+        menu = QMenu(self)
+        if item and not item.is_finished:
+            menu.addAction("Resume" if record["state"] == "paused" else "Pause", item.toggle_pause)
+            menu.addAction("Cancel", item.cancel_download)
+            if self.scheduler:
+                menu.addSeparator()
+                menu.addAction("Download Next", lambda: self.scheduler.move_to_front(item))
+                menu.addAction("Move Up in Queue", lambda: self.scheduler.move(item, -1))
+                menu.addAction("Move Down in Queue", lambda: self.scheduler.move(item, 1))
+        if record["state"] == "completed":
+            menu.addAction("Open", lambda: self.open_file(record))
+            menu.addAction("Show in Folder", lambda: self.open_folder(record))
+            menu.addAction("Verify Checksum...", lambda: self.verify_with_checksum(record))
+            if record.get("digests", {}).get("sha256"):
+                menu.addAction("Copy SHA-256",
+                               lambda: QApplication.clipboard().setText(record["digests"]["sha256"]))
+        if not item or item.is_finished:
+            menu.addAction("Remove from History", lambda: self.remove_record(record))
+        menu.exec(self.download_list.viewport().mapToGlobal(pos))
+    
+    def open_file(self, record):
+        if record and record["state"] == "completed":
+            QDesktopServices.openUrl(QUrl.fromLocalFile(record["path"]))
+    
+    def open_folder(self, record):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(record["path"])))
+    
+    def remove_record(self, record):
+        self.history.delete(record["id"])
+        self.model.live.pop(record["id"], None)
+        self.model.remove(record)
+
+def omnibox_key(url):
+    """Lowercase a URL without scheme and www. so typed text matches it by prefix"""
+    key = url.lower()
+    for prefix in ("https://", "http://"):
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+            break
+    if key.startswith("www."):
+        key = key[4:]
+    return key
+
+def frecency(visit_count, last_visit, now):
+    """Score a URL by visit count weighted by how recently it was visited"""
+    age_days = (now - last_visit) / 86400
+    if age_days < 4:
+        weight = 100
+    elif age_days < 14:
+        weight = 70
+    elif age_days < 31:
+        weight = 50
+    elif age_days < 90:
+        weight = 30
+    else:
+        weight = 10
+    return visit_count * weight
+
+class OmniboxIndex:
+    """In-memory prefix and trigram index over visited URLs ranked by frecency"""
+    # Queries up to this length use precomputed top lists instead of scanning
+    SHORT_PREFIX = 3
+    TOP_KEEP = 32
+    # Upper bound on candidates ranked per keystroke
+    MAX_SCAN = 4000
+    # Substring queries check at most this many recent entries of their rarest trigram,
+    # plus the best-scored entries kept for trigrams with longer posting lists
+    TRIGRAM_SCAN = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.urls = []
+        self.titles = []
+        self.haystacks = []
+        self.scores = []
+        self.ids = {}
+        # Sorted (key, id) pairs for prefix lookups
+        self.keys = []
+        # Trigram -> ids in ascending order
+        self.trigrams = {}
+        # Short prefix -> best ids, highest score first
+        self.top_prefix = {}
+        # Common trigram -> best ids, highest score first
+        self.top_trigram = {}
+
+    def load(self, rows):
+        """Build the index from (url, title, score) rows in one pass.
+
+        The index is built aside and swapped in, so queries are not blocked while it is built.
+        Runs on the indexing thread before any add(), which would otherwise be lost in the swap.
+        """
+        built = OmniboxIndex()
+        for url, title, score in rows:
+            if url not in built.ids:
+                built.insert(url, title, score, sort_keys=False)
+        built.keys.sort()
+        top = collections.defaultdict(list)
+        for key, i in built.keys:
+            for n in range(1, min(len(key), self.SHORT_PREFIX) + 1):
+                top[key[:n]].append(i)
+        for prefix, ids in top.items():
+            built.top_prefix[prefix] = heapq.nlargest(self.TOP_KEEP, ids, key=built.scores.__getitem__)
+        for gram, ids in built.trigrams.items():
+            if len(ids) > self.TRIGRAM_SCAN:
+                built.top_trigram[gram] = heapq.nlargest(self.TOP_KEEP, ids, key=built.scores.__getitem__)
+        with self.lock:
+            self.urls, self.titles, self.haystacks, self.scores = built.urls, built.titles, built.haystacks, built.scores
+            self.ids, self.keys, self.trigrams = built.ids, built.keys, built.trigrams
+            self.top_prefix, self.top_trigram = built.top_prefix, built.top_trigram
+
+    def insert(self, url, title, score, sort_keys=True):
+        i = len(self.urls)
+        key = omnibox_key(url)
+        self.ids[url] = i
+        self.urls.append(url)
+        self.titles.append(title)
+        self.scores.append(score)
+        self.haystacks.append(f"{key} {title.lower()}")
+        if sort_keys:
+            bisect.insort(self.keys, (key, i))
+        else:
+            self.keys.append((key, i))
+        for gram in self.grams(self.haystacks[i]):
+            self.trigrams.setdefault(gram, array("I")).append(i)
+        return i, key
+
+    def add(self, url, title, score):
+        """Insert a URL or update its title and score, called from the indexing thread"""
+        with self.lock:
+            i = self.ids.get(url)
+            if i is None:
+                i, key = self.insert(url, title, score)
+            else:
+                key = omnibox_key(url)
+                self.scores[i] = score
+                if title and title != self.titles[i]:
+                    # The title is only searched by the final substring check
+                    self.titles[i] = title
+                    self.haystacks[i] = f"{key} {title.lower()}"
+            for n in range(1, min(len(key), self.SHORT_PREFIX) + 1):
+                self.keep_top(self.top_prefix.setdefault(key[:n], []), i)
+            for gram in self.grams(self.haystacks[i]):
+                ids = self.trigrams.get(gram)
+                if ids is None or len(ids) <= self.TRIGRAM_SCAN:
+                    continue
+                top = self.top_trigram.get(gram)
+                if top is None:
+                    # The posting list just outgrew the scan, rank it once
+                    self.top_trigram[gram] = heapq.nlargest(self.TOP_KEEP, ids, key=self.scores.__getitem__)
+                else:
+                    self.keep_top(top, i)
+
+    def keep_top(self, top, i):
+        if i in top:
+            top.remove(i)
+        top.append(i)
+        top.sort(key=self.scores.__getitem__, reverse=True)
+        del top[self.TOP_KEEP:]
+
+    @staticmethod
+    def grams(text):
+        return {text[j:j + 3] for j in range(len(text) - 2)}
+
+    def prefix_candidates(self, text):
+        if len(text) <= self.SHORT_PREFIX:
+            return list(self.top_prefix.get(text, ()))
+        lo = bisect.bisect_left(self.keys, (text,))
+        hi = min(len(self.keys), lo + self.MAX_SCAN)
+        candidates = []
+        for key, i in self.keys[lo:hi]:
+            if not key.startswith(text):
+                break
+            candidates.append(i)
+        return candidates
+
+    def trigram_candidates(self, text):
+        rarest = None
+        for gram in self.grams(text):
+            ids = self.trigrams.get(gram)
+            if ids is None:
+                return []
+            if rarest is None or len(ids) < len(rarest):
+                rarest, rarest_gram = ids, gram
+        # Newest entries last, so recent visits are always considered, and the best-scored
+        # entries come from the precomputed top list; the substring check implies the other trigrams
+        pool = set(rarest[-self.TRIGRAM_SCAN:])
+        pool.update(self.top_trigram.get(rarest_gram, ()))
+        haystacks = self.haystacks
+        return [i for i in pool if text in haystacks[i]]
+
+    def query(self, text, limit=8):
+        """Return up to limit (url, title) pairs for the typed text, best first"""
+        text = omnibox_key(text.strip())
+        if not text:
+            return []
+        with self.lock:
+            candidates = set(self.prefix_candidates(text))
+            if len(text) >= 3 and len(candidates) < limit:
+                candidates.update(self.trigram_candidates(text))
+            # Prefix matches outrank substring matches with the same score
+            prefix_bonus = lambda i: (self.scores[i], self.haystacks[i].startswith(text))
+            best = heapq.nlargest(limit, candidates, key=prefix_bonus)
+            return [(self.urls[i], self.titles[i]) for i in best]
+
+    def top_prefix_match(self, text):
+        """Return (url, score) of the best URL starting with the typed text, or None"""
+        text = omnibox_key(text.strip())
+        if not text:
+            return None
+        with self.lock:
+            candidates = self.prefix_candidates(text)
+            if not candidates:
+                return None
+            best = max(candidates, key=self.scores.__getitem__)
+            return self.urls[best], self.scores[best]
+
+    def __len__(self):
+        return len(self.urls)
+
+class Omnibox(QObject):
+    """Visit history for URL bar autocompletion, persisted in SQLite and indexed off the GUI thread"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.db_path = os.path.join(get_data_dir(), "history.db")
+        self.max_suggestions = settings.value("omnibox/max_suggestions", 8, type=int)
+        self.index = OmniboxIndex()
+        self.db = None
+        # Database access and index updates happen on this thread
+        self.indexer = ThreadPoolExecutor(max_workers=1)
+        self.indexer.submit(self.load)
+
+    def load(self):
+        try:
+            self.db = sqlite3.connect(self.db_path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS visits (
+                    url TEXT PRIMARY KEY,
+                    title TEXT NOT NULL DEFAULT '',
+                    visit_count INTEGER NOT NULL DEFAULT 0,
+                    last_visit REAL NOT NULL
+                )
+            """)
+            self.db.commit()
+            now = time.time()
+            started = time.perf_counter()
+            rows = self.db.execute("SELECT url, title, visit_count, last_visit FROM visits")
+            self.index.load((url, title, frecency(count, last_visit, now)) for url, title, count, last_visit in rows)
+            logging.info("Indexed %s visited URLs in %.0f ms", len(self.index), (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logging.error("Failed to load visit history: %s", e)
+
+    def record_visit(self, url, title):
+        """Count a visit, the database write and reindexing run in the background"""
+        if not url.startswith(("http://", "https://")):
+            return
+        self.indexer.submit(self.write_visit, url, title, time.time())
+
+    def write_visit(self, url, title, now):
+        try:
+            with self.db:
+                self.db.execute("""
+                    INSERT INTO visits (url, title, visit_count, last_visit) VALUES (?, ?, 1, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END,
+                        visit_count = visit_count + 1,
+                        last_visit = excluded.last_visit
+                """, (url, title, now))
+                count, = self.db.execute("SELECT visit_count FROM visits WHERE url = ?", (url,)).fetchone()
+            self.index.add(url, title, frecency(count, now, now))
+        except Exception as e:
+            logging.error("Failed to record visit: %s", e)
+
+    def attach(self, line_edit, navigate):
+        """Give a URL bar a suggestion popup, navigate is called with the chosen URL"""
+        model = QStringListModel(line_edit)
+        completer = QCompleter(model, line_edit)
+        # Suggestions are already filtered and ranked by the index
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.setMaxVisibleItems(self.max_suggestions)
+        line_edit.setCompleter(completer)
+
+        def on_text_edited(text):
+            suggestions = self.index.query(text, self.max_suggestions)
+            model.setStringList([url for url, title in suggestions])
+            if suggestions:
+                completer.complete()
+            else:
+                completer.popup().hide()
+
+        line_edit.textEdited.connect(on_text_edited)
+        # Return in the popup reaches the line edit, a mouse click does not
+        completer.popup().clicked.connect(lambda index: navigate())
+
+    def shutdown(self):
+        self.indexer.shutdown(wait=True)
+        if self.db is not None:
+            self.db.close()
+
+class PageTextIndex(QObject):
+    """Full-text index of visited pages, written in batches on a background thread"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.db_path = os.path.join(get_data_dir(), "pages.db")
+        self.enabled = settings.value("page_index/enabled", True, type=bool)
+        self.disable_with_tor = settings.value("page_index/disable_with_tor", True, type=bool)
+        self.max_pages = settings.value("page_index/max_pages", 20000, type=int)
+        self.max_bytes = settings.value("page_index/max_mb", 256, type=int) * 1024 * 1024
+        self.max_chars = settings.value("page_index/max_chars_per_page", 65536, type=int)
+        self.batch_size = 20
+        self.pending = []
+        self.db = None
+        self.reader = None
+
+        # All writes happen on this thread, searches use their own read connection
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        if self.enabled:
+            self.enabled = self.writer.submit(self.open_db).result()
+        if self.enabled:
+            self.reader = sqlite3.connect(self.db_path)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(settings.value("page_index/flush_interval_secs", 10, type=int) * 1000)
+        self.flush_timer.timeout.connect(self.flush)
+        if self.enabled:
+            self.flush_timer.start()
+
+    def open_db(self):
+        """Create the schema, returns False if FTS5 is unavailable"""
+        try:
+            self.db = sqlite3.connect(self.db_path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    visited_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_visited ON pages(visited_at);
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(title, body);
+            """)
+            self.db.commit()
+            return True
+        except sqlite3.OperationalError as e:
+            logging.warning("FTS5 unavailable, page text indexing disabled: %s", e)
+            return False
+
+    def add_page(self, page):
+        """Queue the visible text of a loaded page for indexing"""
+        if not self.enabled:
+            return
+        url = page.url().toString()
+        if not url.startswith(("http://", "https://")):
+            return
+        title = page.title()
+        visited_at = time.time()
+
+        def on_text(text):
+            if text:
+                self.pending.append((url, title, text[:self.max_chars], visited_at))
+                if len(self.pending) >= self.batch_size:
+                    self.flush()
+        page.toPlainText(on_text)
+
+    def flush(self, wait=False):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        future = self.writer.submit(self.write_batch, batch)
+        if wait:
+            future.result()
+
+    def write_batch(self, batch):
+        try:
+            started = time.perf_counter()
+            with self.db:
+                for url, title, text, visited_at in batch:
+                    body = " ".join(text.split())
+                    row = self.db.execute("SELECT id FROM pages WHERE url = ?", (url,)).fetchone()
+                    if row is not None:
+                        self.db.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+                        self.db.execute("UPDATE pages SET visited_at = ?, size = ? WHERE id = ?",
+                                        (visited_at, len(body), row[0]))
+                        page_id = row[0]
+                    else:
+                        page_id = self.db.execute("INSERT INTO pages (url, visited_at, size) VALUES (?, ?, ?)",
+                                                  (url, visited_at, len(body))).lastrowid
+                    self.db.execute("INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)", (page_id, title, body))
+                evicted = self.evict()
+            logging.debug("Indexed %s pages in %.0f ms, evicted %s", len(batch), (time.perf_counter() - started) * 1000, evicted)
+        except Exception as e:
+            logging.error("Failed to index pages: %s", e)
+
+    def evict(self):
+        """Drop the least recently visited pages until the index fits its page and size limits"""
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if count <= self.max_pages and total <= self.max_bytes:
+            return 0
+        evicted = []
+        for page_id, size in self.db.execute("SELECT id, size FROM pages ORDER BY visited_at"):
+            if count <= self.max_pages and total <= self.max_bytes:
+                break
+            evicted.append((page_id,))
+            count -= 1
+            total -= size
+        self.db.executemany("DELETE FROM pages WHERE id = ?", evicted)
+        self.db.executemany("DELETE FROM pages_fts WHERE rowid = ?", evicted)
+        return len(evicted)
+
+    def search(self, query, limit=50):
+        """Return (url, title, snippet) for the best matching pages"""
+        tokens = re.findall(r"\w+", query)
+        if not tokens or self.reader is None:
+            return []
+        match = " ".join(f'"{token}"*' for token in tokens)
+        try:
+            return self.reader.execute("""
+                SELECT p.url, f.title, snippet(pages_fts, 1, '', '', '…', 16)
+                FROM pages_fts f JOIN pages p ON p.id = f.rowid
+                WHERE pages_fts MATCH ?
+                ORDER BY bm25(pages_fts, 5.0, 1.0)
+                LIMIT ?
+            """, (match, limit)).fetchall()
+        except sqlite3.Error as e:
+            logging.error("Page search failed: %s", e)
+            return []
+
+    def clear(self):
+        self.pending = []
+        if self.enabled:
+            self.writer.submit(self.clear_db).result()
+
+    def clear_db(self):
+        with self.db:
+            self.db.execute("DELETE FROM pages")
+            self.db.execute("DELETE FROM pages_fts")
+        logging.info("Cleared page text index")
+
+    def shutdown(self):
+        self.flush_timer.stop()
+        if self.enabled:
+            self.flush(wait=True)
+        self.writer.shutdown(wait=True)
+        for db in (self.db, self.reader):
+            if db is not None:
+                db.close()
+
+class PageSearchWindow(QMainWindow):
+    """Searches the text of visited pages"""
+    def __init__(self, page_index, open_url, parent=None):
+        super().__init__(parent)
+        self.page_index = page_index
+        self.open_url = open_url
+        self.setWindowTitle("Search Visited Pages")
+        self.setGeometry(150, 150, 700, 450)
         
-        # Enable Widevine DRM
-        settings = self.browser.settings()
-        settings.setAttribute(settings.WebAttribute.PlaybackRequiresUserGesture, False)
-        settings.setAttribute(settings.WebAttribute.FullScreenSupportEnabled, True)
-        self.browser.page().fullScreenRequested.connect(lambda request: request.accept())
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search page text")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_bar.textChanged.connect(self.search_timer.start)
         
-        # Enable JavaScript and Local Storage
-        settings = self.browser.settings()
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(lambda item: self.open_url(QUrl(item.data(Qt.ItemDataRole.UserRole))))
+        self.summary = QLabel()
         
-        # Accept all cookies
-        profile = self.browser.page().profile()
-        profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.AllowPersistentCookies)
+        layout = QVBoxLayout()
+        layout.addWidget(self.search_bar)
+        layout.addWidget(self.results)
+        layout.addWidget(self.summary)
         
-        self.browser.setUrl(QUrl("https://www.google.com"))
+        container = QWidget()
+        container.setLayout(layout)
+        self.setCentralWidget(container)
+    
+    def run_search(self):
+        started = time.perf_counter()
+        rows = self.page_index.search(self.search_bar.text())
+        elapsed = (time.perf_counter() - started) * 1000
+        self.results.clear()
+        for url, title, snippet in rows:
+            item = QListWidgetItem(f"{title or url}\n{url}\n{snippet}")
+            item.setData(Qt.ItemDataRole.UserRole, url)
+            item.setToolTip(url)
+            self.results.addItem(item)
+        self.summary.setText(f"{len(rows)} results in {elapsed:.1f} ms" if self.search_bar.text() else "")
+
+class NavigationSupervisor(QObject):
+    """Per-host load latency statistics for clearnet and Tor, used to pick load timeouts and retry delays"""
+    MODES = ("clearnet", "tor")
+    # Limits on how much latency history is kept
+    SAMPLES_PER_HOST = 50
+    MAX_HOSTS = 2000
+    MIN_SAMPLES = 5
+
+    def __init__(self, parent=None, persist=True):
+        super().__init__(parent)
+        settings = get_settings()
+        self.stats_path = os.path.join(get_data_dir(), "navigation_stats.json")
+        self.max_retries = settings.value("navigation/max_retries", 3, type=int)
+        self.timeout_multiplier = settings.value("navigation/timeout_multiplier", 3.0, type=float)
+        self.timeout_bounds = {
+            "clearnet": (settings.value("navigation/min_timeout_secs", 10, type=int) * 1000,
+                         settings.value("navigation/max_timeout_secs", 60, type=int) * 1000),
+            "tor": (settings.value("navigation/min_timeout_secs_tor", 20, type=int) * 1000,
+                    settings.value("navigation/max_timeout_secs_tor", 120, type=int) * 1000),
+        }
+        self.default_timeouts = {"clearnet": 30000, "tor": 60000}
+        self.backoff_base = {"clearnet": 1000, "tor": 2000}
+        self.backoff_max = 30000
+        self.tor_enabled = False
+        # mode -> host -> recent load times in ms, least recently updated host first
+        self.hosts = {mode: collections.OrderedDict() for mode in self.MODES}
+        # mode -> recent load times of all hosts, for hosts without enough samples
+        self.overall = {mode: collections.deque(maxlen=500) for mode in self.MODES}
+        self.dirty = False
+        # Without persistence the saved statistics are still used, but never overwritten
+        self.persist = persist
+        self.load()
+        
+        self.save_timer = QTimer(self)
+        self.save_timer.setInterval(30000)
+        self.save_timer.timeout.connect(self.save)
+        if persist:
+            self.save_timer.start()
+
+    def load(self):
+        try:
+            with open(self.stats_path) as f:
+                data = json.load(f)
+            for mode in self.MODES:
+                for host, samples in data.get(mode, {}).items():
+                    self.hosts[mode][host] = collections.deque(samples, maxlen=self.SAMPLES_PER_HOST)
+                self.overall[mode].extend(data.get(f"{mode}_overall", []))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error("Failed to load navigation statistics: %s", e)
+
+    def save(self):
+        if not self.dirty or not self.persist:
+            return
+        try:
+            data = {}
+            for mode in self.MODES:
+                data[mode] = {host: list(samples) for host, samples in self.hosts[mode].items()}
+                data[f"{mode}_overall"] = list(self.overall[mode])
+            atomic_write(self.stats_path, json.dumps(data, separators=(",", ":")).encode())
+            self.dirty = False
+        except Exception as e:
+            logging.error("Failed to save navigation statistics: %s", e)
+
+    def mode(self, is_tor=False):
+        return "tor" if is_tor or self.tor_enabled else "clearnet"
+
+    def record(self, host, mode, elapsed_ms):
+        """Add the load time of a successful navigation"""
+        hosts = self.hosts[mode]
+        samples = hosts.pop(host, None)
+        if samples is None:
+            samples = collections.deque(maxlen=self.SAMPLES_PER_HOST)
+            if len(hosts) >= self.MAX_HOSTS:
+                hosts.popitem(last=False)
+        samples.append(round(elapsed_ms))
+        hosts[host] = samples
+        self.overall[mode].append(round(elapsed_ms))
+        self.dirty = True
+
+    @staticmethod
+    def percentile(samples, fraction):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def timeout_for(self, host, mode):
+        """Load timeout in ms: a multiple of the p95 load time of the host, or of all hosts in this mode"""
+        samples = self.hosts[mode].get(host)
+        if samples is None or len(samples) < self.MIN_SAMPLES:
+            samples = self.overall[mode]
+        if len(samples) < self.MIN_SAMPLES:
+            return self.default_timeouts[mode]
+        low, high = self.timeout_bounds[mode]
+        return int(min(high, max(low, self.percentile(samples, 0.95) * self.timeout_multiplier)))
+
+    def backoff_delay(self, attempt, mode):
+        """Delay in ms before retry number attempt (1-based), exponential with jitter"""
+        delay = min(self.backoff_max, self.backoff_base[mode] * 2 ** (attempt - 1))
+        # Equal jitter keeps some spacing between retries while spreading them out
+        return int(delay / 2 + random.uniform(0, delay / 2))
+
+    def describe(self, host, mode):
+        samples = self.hosts[mode].get(host)
+        if not samples:
+            return f"{host} ({mode}): no data"
+        return (f"{host} ({mode}): p50 {self.percentile(samples, 0.5)} ms, p95 {self.percentile(samples, 0.95)} ms, "
+                f"timeout {self.timeout_for(host, mode)} ms")
+
+    def shutdown(self):
+        self.save_timer.stop()
+        self.save()
+
+# Navigation and Resource Timing of the current document, times in ms relative to navigation start
+NAVIGATION_TIMING_JS = """
+(() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) return null;
+    const resources = performance.getEntriesByType('resource');
+    let resourceTransfer = 0, cached = 0;
+    for (const r of resources) {
+        resourceTransfer += r.transferSize;
+        if (r.transferSize === 0 && r.decodedBodySize > 0) cached++;
+    }
+    return {
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        tls: nav.secureConnectionStart > 0 ? nav.connectEnd - nav.secureConnectionStart : 0,
+        ttfb: nav.responseStart - nav.startTime,
+        response: nav.responseEnd - nav.responseStart,
+        dom_content_loaded: nav.domContentLoadedEventEnd - nav.startTime,
+        load: (nav.loadEventEnd || nav.loadEventStart || performance.now()) - nav.startTime,
+        transfer_size: nav.transferSize,
+        resources: resources.length,
+        resource_transfer_size: resourceTransfer,
+        cached_resources: cached,
+    };
+})()
+"""
+
+class PerformanceMonitor(QObject):
+    """Keeps recent navigation timings in bounded buffers per tab and per origin"""
+    sample_added = pyqtSignal(object)
+    TIMING_FIELDS = ("dns", "connect", "tls", "ttfb", "response", "dom_content_loaded", "load")
+    SIZE_FIELDS = ("transfer_size", "resources", "resource_transfer_size", "cached_resources")
+    SAMPLES_PER_TAB = 50
+    SAMPLES_PER_ORIGIN = 100
+    MAX_ORIGINS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tabs = {}
+        # Least recently updated origin first
+        self.origins = collections.OrderedDict()
+
+    def collect(self, tab, mode):
+        """Read the timing of the page that just loaded in tab"""
+        page = tab.browser.page()
+        url = page.url()
+        if url.scheme() not in ("http", "https"):
+            return
+
+        def on_result(timing):
+            if not isinstance(timing, dict):
+                return
+            sample = {"url": url.toString(), "origin": f"{url.scheme()}://{url.authority()}", "mode": mode,
+                      "time": time.time()}
+            for field in self.TIMING_FIELDS + self.SIZE_FIELDS:
+                value = timing.get(field)
+                sample[field] = round(value, 1) if isinstance(value, (int, float)) and value >= 0 else None
+            self.add(tab, sample)
+        try:
+            page.runJavaScript(NAVIGATION_TIMING_JS, on_result)
+        except Exception as e:
+            logging.error("Failed to collect navigation timing: %s", e)
+
+    def add(self, tab, sample):
+        self.tabs.setdefault(tab, collections.deque(maxlen=self.SAMPLES_PER_TAB)).append(sample)
+        samples = self.origins.pop(sample["origin"], None)
+        if samples is None:
+            samples = collections.deque(maxlen=self.SAMPLES_PER_ORIGIN)
+            if len(self.origins) >= self.MAX_ORIGINS:
+                self.origins.popitem(last=False)
+        samples.append(sample)
+        self.origins[sample["origin"]] = samples
+        self.sample_added.emit(sample)
+
+    def forget(self, tab):
+        self.tabs.pop(tab, None)
+
+    def samples(self):
+        for samples in self.origins.values():
+            yield from samples
+
+    def summary(self):
+        """Return {mode: {field: (p50, p90, p99, count)}} over every buffered sample"""
+        values = {mode: collections.defaultdict(list) for mode in NavigationSupervisor.MODES}
+        for sample in self.samples():
+            for field in self.TIMING_FIELDS:
+                if sample[field] is not None:
+                    values[sample["mode"]][field].append(sample[field])
+        summary = {}
+        for mode, fields in values.items():
+            summary[mode] = {}
+            for field, data in fields.items():
+                summary[mode][field] = tuple(NavigationSupervisor.percentile(data, f) for f in (0.5, 0.9, 0.99)) + (len(data),)
+        return summary
+
+    def origin_summary(self):
+        """Return (origin, mode, loads, p50 ttfb, p50 load) rows, slowest first"""
+        rows = []
+        for origin, samples in self.origins.items():
+            for mode in NavigationSupervisor.MODES:
+                loads = [s["load"] for s in samples if s["mode"] == mode and s["load"] is not None]
+                ttfbs = [s["ttfb"] for s in samples if s["mode"] == mode and s["ttfb"] is not None]
+                if loads:
+                    ttfb = NavigationSupervisor.percentile(ttfbs, 0.5) if ttfbs else None
+                    rows.append((origin, mode, len(loads), ttfb, NavigationSupervisor.percentile(loads, 0.5)))
+        rows.sort(key=lambda row: row[4], reverse=True)
+        return rows
+
+    def export(self, path):
+        data = {
+            "exported_at": time.time(),
+            "summary": {mode: {field: dict(zip(("p50", "p90", "p99", "count"), values))
+                               for field, values in fields.items()}
+                        for mode, fields in self.summary().items()},
+            "origins": {origin: list(samples) for origin, samples in self.origins.items()},
+        }
+        atomic_write(path, json.dumps(data, indent=2).encode())
+
+    def clear(self):
+        self.tabs.clear()
+        self.origins.clear()
+
+class PerformancePanel(QDockWidget):
+    """Dockable view of navigation timing percentiles for clearnet and Tor"""
+    def __init__(self, monitor, parent=None):
+        super().__init__("Performance", parent)
+        self.monitor = monitor
+        self.setObjectName("performance_panel")
+        
+        self.summary_table = QTableWidget(0, 7)
+        self.summary_table.setHorizontalHeaderLabels(
+            ["Metric", "Clearnet p50", "p90", "p99", "Tor p50", "p90", "p99"])
+        self.summary_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.summary_table.verticalHeader().setVisible(False)
+        
+        self.origin_table = QTableWidget(0, 5)
+        self.origin_table.setHorizontalHeaderLabels(["Origin", "Mode", "Loads", "TTFB p50", "Load p50"])
+        self.origin_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.origin_table.verticalHeader().setVisible(False)
+        
+        export_btn = QPushButton("Export JSON...")
+        export_btn.clicked.connect(self.export)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear)
+        buttons = QHBoxLayout()
+        buttons.addWidget(export_btn)
+        buttons.addWidget(clear_btn)
+        buttons.addStretch()
+        
+        layout = QVBoxLayout()
+        layout.addWidget(self.summary_table)
+        layout.addWidget(QLabel("Slowest origins"))
+        layout.addWidget(self.origin_table)
+        layout.addLayout(buttons)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+        
+        # Refreshing is cheap but there is no point doing it per sample during busy loads
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.refresh)
+        monitor.sample_added.connect(lambda sample: self.isVisible() and self.refresh_timer.start())
+        self.visibilityChanged.connect(lambda visible: visible and self.refresh())
+    
+    @staticmethod
+    def cell(value):
+        return QTableWidgetItem("" if value is None else f"{value:.0f}")
+    
+    def refresh(self):
+        summary = self.monitor.summary()
+        self.summary_table.setRowCount(len(PerformanceMonitor.TIMING_FIELDS))
+        for row, field in enumerate(PerformanceMonitor.TIMING_FIELDS):
+            self.summary_table.setItem(row, 0, QTableWidgetItem(field.replace("_", " ")))
+            for m, mode in enumerate(NavigationSupervisor.MODES):
+                values = summary[mode].get(field, (None, None, None, 0))
+                for p in range(3):
+                    self.summary_table.setItem(row, 1 + m * 3 + p, self.cell(values[p]))
+        
+        rows = self.monitor.origin_summary()[:100]
+        self.origin_table.setRowCount(len(rows))
+        for row, (origin, mode, loads, ttfb, load) in enumerate(rows):
+            self.origin_table.setItem(row, 0, QTableWidgetItem(origin))
+            self.origin_table.setItem(row, 1, QTableWidgetItem(mode))
+            self.origin_table.setItem(row, 2, QTableWidgetItem(str(loads)))
+            self.origin_table.setItem(row, 3, self.cell(ttfb))
+            self.origin_table.setItem(row, 4, self.cell(load))
+    
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Performance Data", "performance.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.monitor.export(path)
+        except Exception as e:
+            logging.error("Failed to export performance data: %s", e)
+            QMessageBox.warning(self, "Export Failed", str(e))
+    
+    def clear(self):
+        self.monitor.clear()
+        self.refresh()
+
+class BrowserTab(QWidget):
+    def __init__(self, parent=None, page=None, is_tor=False):
+        super().__init__(parent)
+        self.browser = QWebEngineView()
+        if page is not None:
+            # The page decides the profile, so it must be set before first use
+            page.setParent(self.browser)
+            self.browser.setPage(page)
+        self.is_tor = is_tor
+        # Set by the browser when content blocking is on
+        self.blocker = None
+        # Set by the browser for tabs that may use prerendered pages, returns True if it swapped one in
+        self.take_prerender = None
+        # Set by the browser, picks timeouts and retry delays from past load times
+        self.supervisor = None
+        self.load_timeout = 30000  # 30 seconds, used without a supervisor
+        self.retry_count = 0
+        self.max_retries = 3
+        self.is_loading = False
+        self.load_started_at = None
+        self.retry_started = False
+        self.timed_out = False
+        self.retry_url = QUrl()
+        self.loading_timer = QTimer(self)
+        self.loading_timer.setSingleShot(True)
+        self.loading_timer.timeout.connect(self.on_load_timeout)
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.retry_load)
+        self.setup_page(self.browser.page())
         
         # Navigation toolbar
         self.navbar = QToolBar()
@@ -266,140 +2520,2049 @@ class BrowserTab(QWidget):
         self.zoom_in_btn = QPushButton("Zoom In")
         self.zoom_out_btn = QPushButton("Zoom Out")
         
-        # Add buttons to toolbar
-        self.navbar.addWidget(self.back_btn)
-        self.navbar.addWidget(self.forward_btn)
-        self.navbar.addWidget(self.reload_btn)
-        self.navbar.addWidget(self.home_btn)
-        self.navbar.addWidget(self.url_bar)
-        self.navbar.addWidget(self.go_btn)
-        self.navbar.addWidget(self.search_btn)
-        self.navbar.addWidget(self.zoom_in_btn)
-        self.navbar.addWidget(self.zoom_out_btn)
+        # Add buttons to toolbar
+        self.navbar.addWidget(self.back_btn)
+        self.navbar.addWidget(self.forward_btn)
+        self.navbar.addWidget(self.reload_btn)
+        self.navbar.addWidget(self.home_btn)
+        self.navbar.addWidget(self.url_bar)
+        self.navbar.addWidget(self.go_btn)
+        self.navbar.addWidget(self.search_btn)
+        self.navbar.addWidget(self.zoom_in_btn)
+        self.navbar.addWidget(self.zoom_out_btn)
+        
+        # Connect signals
+        self.back_btn.clicked.connect(self.browser.back)
+        self.forward_btn.clicked.connect(self.browser.forward)
+        self.reload_btn.clicked.connect(self.browser.reload)
+        self.home_btn.clicked.connect(self.navigate_home)
+        self.go_btn.clicked.connect(self.navigate_to_url)
+        self.search_btn.clicked.connect(self.search_in_address_bar)
+        self.zoom_in_btn.clicked.connect(lambda: self.browser.setZoomFactor(self.browser.zoomFactor() + 0.1))
+        self.zoom_out_btn.clicked.connect(lambda: self.browser.setZoomFactor(self.browser.zoomFactor() - 0.1))
+        self.url_bar.returnPressed.connect(self.search_in_address_bar)
+        self.browser.urlChanged.connect(self.update_url)
+        # Connect loadFinished signal to handle failures
+        self.browser.loadFinished.connect(self.handle_load_finished)
+        self.browser.loadStarted.connect(self.on_load_started)
+        
+        # Layout
+        layout = QVBoxLayout()
+        layout.addWidget(self.navbar)
+        layout.addWidget(self.browser)
+        self.setLayout(layout)
+    
+    def setup_page(self, page):
+        """Apply per-page settings and connect page signals"""
+        # Enable Widevine DRM
+        settings = page.settings()
+        settings.setAttribute(settings.WebAttribute.PlaybackRequiresUserGesture, False)
+        settings.setAttribute(settings.WebAttribute.FullScreenSupportEnabled, True)
+        page.fullScreenRequested.connect(lambda request: request.accept())
+        
+        # Enable JavaScript and Local Storage
+        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
+        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
+        
+        # Handle SSL errors
+        page.certificateError.connect(self.handle_certificate_error)
+    
+    def attach_page(self, page):
+        """Show an already loaded page in place of the current one"""
+        old_page = self.browser.page()
+        page.setParent(self.browser)
+        # Prerenders load muted, the tab keeps whatever mute state it had
+        page.setAudioMuted(old_page.isAudioMuted())
+        self.setup_page(page)
+        self.browser.setPage(page)
+        old_page.deleteLater()
+        self.update_url(page.url())
+    
+    def load_url(self, url):
+        if self.take_prerender is None or not self.take_prerender(url):
+            self.browser.setUrl(url)
+    
+    def navigate_home(self):
+        self.browser.setUrl(QUrl("https://www.google.com"))
+    
+    def navigate_to_url(self):
+        input_text = self.url_bar.text().strip()
+        url = QUrl(process_input(input_text))
+        self.load_url(url)
+        self.retry_count = 0
+    
+    def search_in_address_bar(self):
+        input_text = self.url_bar.text().strip()
+        url = QUrl(process_input(input_text))
+        self.load_url(url)
+    
+    def update_url(self, q):
+        # The error page is shown from a data: URL
+        if q.scheme() == "data":
+            return
+        self.url_bar.setText(q.toString())
+    
+    def network_mode(self):
+        return self.supervisor.mode(self.is_tor) if self.supervisor is not None else "clearnet"
+    
+    def on_load_started(self):
+        self.is_loading = True
+        if self.retry_started:
+            self.retry_started = False
+        else:
+            # A new navigation, not one of our retries
+            self.retry_timer.stop()
+            self.retry_count = 0
+        self.load_started_at = time.monotonic()
+        self.timed_out = False
+        if self.supervisor is not None:
+            timeout = self.supervisor.timeout_for(self.browser.page().requestedUrl().host(), self.network_mode())
+        else:
+            timeout = self.load_timeout
+        self.loading_timer.start(timeout)
+    
+    def adopt_load(self, started, loaded):
+        """Take over load tracking of a swapped in page whose load began at started (monotonic seconds)"""
+        self.retry_timer.stop()
+        self.retry_count = 0
+        self.timed_out = False
+        self.is_loading = not loaded
+        if loaded:
+            # Its load time was never seen by this tab, so there is nothing to record
+            self.loading_timer.stop()
+            self.load_started_at = None
+            return
+        self.load_started_at = started
+        if self.supervisor is not None:
+            timeout = self.supervisor.timeout_for(self.browser.page().requestedUrl().host(), self.network_mode())
+        else:
+            timeout = self.load_timeout
+        elapsed = (time.monotonic() - started) * 1000
+        self.loading_timer.start(max(0, int(timeout - elapsed)))
+    
+    def on_load_timeout(self):
+        logging.warning("Load timeout (%s ms) reached for %s", self.loading_timer.interval(), self.browser.url().toString())
+        # The failed load reported by stop() is this same failure
+        self.timed_out = True
+        self.browser.stop()
+        self.try_reload()
+    
+    def handle_load_finished(self, ok):
+        self.is_loading = False
+        self.loading_timer.stop()
+        url = self.browser.page().requestedUrl()
+        if ok:
+            if self.supervisor is not None and self.load_started_at is not None and url.scheme() in ("http", "https"):
+                elapsed = (time.monotonic() - self.load_started_at) * 1000
+                self.supervisor.record(url.host(), self.network_mode(), elapsed)
+            self.retry_count = 0
+            return
+        if self.timed_out:
+            return
+        logging.error("Failed to load %s", url.toString())
+        self.try_reload()
+    
+    def show_error_page(self, url):
+        tor_hint = "<p>Tor connections can be slow or blocked. Please try again or use a different search engine.</p>" \
+            if self.network_mode() == "tor" else ""
+        error_html = f"""
+        <html>
+            <head>
+                <style>
+                    body {{ font-family: Arial, sans-serif; text-align: center; padding-top: 50px; background-color: #f2f2f2; }}
+                    h1 {{ color: #d32f2f; }}
+                    p {{ color: #555; }}
+                </style>
+                <title>Page Not Available</title>
+            </head>
+            <body>
+                <h1>Page Not Available</h1>
+                <p>The webpage could not be loaded. Please check the URL or your connection.</p>
+                {tor_hint}
+                <p><a href="{html.escape(url.toString())}">Try again</a></p>
+            </body>
+        </html>
+        """
+        self.browser.setHtml(error_html)
+        # Keep the failed address in the URL bar instead of the error page's
+        self.url_bar.setText(url.toString())
+            
+    def teardown(self):
+        """Stop timers, disconnect signals and delete the page and view now rather than when Qt gets to it"""
+        self.loading_timer.stop()
+        self.retry_timer.stop()
+        self.take_prerender = None
+        self.supervisor = None
+        page = self.browser.page()
+        self.browser.stop()
+        # The browser connects lambdas holding this tab, they would keep it alive
+        for bound in (self.browser.urlChanged, self.browser.titleChanged, self.browser.loadStarted,
+                      self.browser.loadFinished, page.certificateError, page.fullScreenRequested):
+            try:
+                bound.disconnect()
+            except TypeError:
+                pass
+        # Deleting the page shuts down its renderer, it has to go before the view showing it
+        page.deleteLater()
+        self.deleteLater()
+
+    def handle_certificate_error(self, certificate, error):
+        logging.warning("SSL Certificate Error: %s", error)
+        self.browser.page().certificateError.disconnect(self.handle_certificate_error)
+        self.browser.page().profile().setHttpsAcceptAnyCertificate(True)
+        self.browser.reload()
+    
+    def try_reload(self):
+        """Schedule a retry with backoff, or show the error page once retries are used up"""
+        max_retries = self.supervisor.max_retries if self.supervisor is not None else self.max_retries
+        if self.retry_count < max_retries:
+            self.retry_count += 1
+            if self.supervisor is not None:
+                delay = self.supervisor.backoff_delay(self.retry_count, self.network_mode())
+            else:
+                delay = 1000
+            logging.info("Retrying to load page in %s ms (%s/%s)", delay, self.retry_count, max_retries)
+            self.retry_url = self.browser.page().requestedUrl()
+            self.retry_timer.start(delay)
+        else:
+            logging.error("Max retries reached for %s", self.browser.page().requestedUrl().toString())
+            self.show_error_page(self.browser.page().requestedUrl())
+    
+    def retry_load(self):
+        self.retry_started = True
+        self.browser.setUrl(self.retry_url)
+
+class TabPlaceholder(QWidget):
+    """Lightweight stand-in for a restored tab until it is first activated"""
+    def __init__(self, url, title, history=b"", parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.title = title
+        self.history = history
+
+    def session_entry(self):
+        return {
+            "url": self.url,
+            "title": self.title,
+            "history": base64.b64encode(self.history).decode(),
+        }
+
+class ClosedTabStack:
+    """Most recently closed tabs as URL, title and serialized history, bounded by count and bytes"""
+    def __init__(self):
+        settings = get_settings()
+        self.max_count = settings.value("tabs/closed_max_count", 25, type=int)
+        self.max_bytes = settings.value("tabs/closed_max_kb", 2048, type=int) * 1024
+        self.entries = collections.deque()
+        self.size = 0
+
+    @staticmethod
+    def entry_size(entry):
+        return len(entry["url"]) + len(entry["title"]) + len(entry["history"])
+
+    def push(self, url, title, history, index):
+        entry = {"url": url, "title": title, "history": history, "index": index}
+        # A history too large for the whole budget is dropped, the URL alone still reopens the page
+        if self.entry_size(entry) > self.max_bytes:
+            entry["history"] = b""
+        self.entries.append(entry)
+        self.size += self.entry_size(entry)
+        while self.entries and (len(self.entries) > self.max_count or self.size > self.max_bytes):
+            self.size -= self.entry_size(self.entries.popleft())
+
+    def pop(self):
+        """Return the most recently closed tab, or None"""
+        if not self.entries:
+            return None
+        entry = self.entries.pop()
+        self.size -= self.entry_size(entry)
+        return entry
+
+    def __len__(self):
+        return len(self.entries)
+
+class SessionManager(QObject):
+    """Periodically snapshots open tabs and restores them on the next launch"""
+    def __init__(self, tabs, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        session_dir = os.path.join(get_data_dir(), "session")
+        os.makedirs(session_dir, exist_ok=True)
+        self.session_file = os.path.join(session_dir, "session.json")
+        self.lock_file = os.path.join(session_dir, "session.lock")
+
+        # Cached per-tab entries, only dirty tabs are serialized again
+        self.entries = {}
+        self.dirty = set()
+        self.last_signature = None
+        self.writer = ThreadPoolExecutor(max_workers=1)
+
+        # A leftover lock file means the previous run did not shut down cleanly
+        self.crashed = os.path.exists(self.lock_file)
+        try:
+            with open(self.lock_file, 'w') as f:
+                f.write(str(os.getpid()))
+        except Exception as e:
+            logging.error("Failed to create session lock: %s", e)
+
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.setInterval(get_settings().value("session/snapshot_interval_secs", 15, type=int) * 1000)
+        self.snapshot_timer.timeout.connect(self.snapshot)
+        self.snapshot_timer.start()
+
+    def load(self):
+        """Return the saved tab entries and current index, or ([], 0)"""
+        restore = get_settings().value("session/restore_on_startup", True, type=bool)
+        if not (restore or self.crashed):
+            return [], 0
+        try:
+            if not os.path.exists(self.session_file):
+                return [], 0
+            with open(self.session_file, 'rb') as f:
+                session = json.load(f)
+            entries = []
+            for entry in session.get("tabs", []):
+                entries.append({
+                    "url": entry.get("url", ""),
+                    "title": entry.get("title", ""),
+                    "history": base64.b64decode(entry.get("history", "")),
+                })
+            current = min(max(session.get("current", 0), 0), max(len(entries) - 1, 0))
+            logging.info("Loaded session with %s tabs (crashed=%s)", len(entries), self.crashed)
+            return entries, current
+        except Exception as e:
+            logging.error("Failed to load session: %s", e)
+            return [], 0
+
+    def track(self, tab):
+        """Mark a tab dirty whenever its navigation state changes"""
+        self.dirty.add(tab)
+        tab.browser.urlChanged.connect(lambda _, tab=tab: self.dirty.add(tab))
+        tab.browser.titleChanged.connect(lambda _, tab=tab: self.dirty.add(tab))
+
+    def forget(self, tab):
+        self.entries.pop(tab, None)
+        self.dirty.discard(tab)
+
+    def tab_entry(self, tab):
+        """Return the cached session entry for a tab, rebuilding it if dirty"""
+        if isinstance(tab, TabPlaceholder):
+            return tab.session_entry()
+        if tab in self.dirty or tab not in self.entries:
+            self.entries[tab] = {
+                "url": tab.browser.url().toString(),
+                "title": tab.browser.title(),
+                "history": base64.b64encode(serialize_history(tab.browser.history())).decode(),
+            }
+            self.dirty.discard(tab)
+        return self.entries[tab]
+
+    def snapshot(self, wait=False):
+        """Write the session in the background if anything changed since the last snapshot"""
+        try:
+            # Tor tabs are never written to disk
+            widgets = [self.tabs.widget(i) for i in range(self.tabs.count())]
+            widgets = [w for w in widgets if isinstance(w, (BrowserTab, TabPlaceholder)) and not getattr(w, "is_tor", False)]
+            current = self.tabs.currentWidget()
+            current = widgets.index(current) if current in widgets else 0
+            signature = (tuple(id(w) for w in widgets), current)
+            if signature == self.last_signature and not self.dirty:
+                return
+
+            session = {
+                "version": 1,
+                "current": current,
+                "tabs": [self.tab_entry(w) for w in widgets],
+            }
+            data = json.dumps(session).encode()
+            self.last_signature = signature
+            future = self.writer.submit(self.write_session, data)
+            if wait:
+                future.result()
+        except Exception as e:
+            logging.error("Failed to snapshot session: %s", e)
+
+    def write_session(self, data):
+        try:
+            atomic_write(self.session_file, data)
+            logging.debug("Session snapshot written (%s bytes)", len(data))
+        except Exception as e:
+            logging.error("Failed to write session: %s", e)
+
+    def shutdown(self):
+        """Write a final snapshot and mark the session as cleanly closed"""
+        self.snapshot_timer.stop()
+        self.snapshot(wait=True)
+        self.writer.shutdown(wait=True)
+        try:
+            os.remove(self.lock_file)
+        except OSError:
+            pass
+
+class TabLifecycleManager(QObject):
+    """Freezes idle background tabs and discards the least recently used ones over a memory budget"""
+    def __init__(self, tabs, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        settings = get_settings()
+        self.freeze_after = settings.value("tabs/freeze_after_secs", 300, type=int)
+        self.memory_budget = settings.value("tabs/memory_budget_mb", 2048, type=int) * 1024 * 1024
+        self.last_active = {}
+        self.current_tab = None
+
+        self.tabs.currentChanged.connect(self.on_current_changed)
+
+        # Periodic idle/memory check
+        self.check_timer = QTimer(self)
+        self.check_timer.setInterval(settings.value("tabs/check_interval_secs", 15, type=int) * 1000)
+        self.check_timer.timeout.connect(self.check_tabs)
+        self.check_timer.start()
+
+    def on_current_changed(self, index):
+        """Wake the newly selected tab and start the idle clock for the previous one"""
+        now = time.monotonic()
+        if self.current_tab is not None:
+            self.last_active[self.current_tab] = now
+
+        tab = self.tabs.widget(index)
+        self.current_tab = tab if isinstance(tab, BrowserTab) else None
+        if self.current_tab is None:
+            return
+
+        self.last_active[tab] = now
+        page = tab.browser.page()
+        if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            logging.debug("Reactivating tab: %s", tab.browser.url().toString())
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+
+    def forget(self, tab):
+        """Stop tracking a closed tab"""
+        self.last_active.pop(tab, None)
+        if self.current_tab is tab:
+            self.current_tab = None
+
+    def background_tabs(self):
+        """Return background tabs that may be suspended, least recently used first"""
+        candidates = []
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if not isinstance(tab, BrowserTab) or tab is self.current_tab:
+                continue
+            page = tab.browser.page()
+            # Never suspend pages that are loading or playing audio
+            if tab.is_loading or page.recentlyAudible():
+                continue
+            candidates.append(tab)
+        candidates.sort(key=lambda tab: self.last_active.get(tab, 0))
+        return candidates
+
+    def check_tabs(self):
+        """Freeze idle tabs, then discard tabs until renderer memory fits the budget"""
+        try:
+            now = time.monotonic()
+            candidates = self.background_tabs()
+
+            for tab in candidates:
+                page = tab.browser.page()
+                idle = now - self.last_active.get(tab, now)
+                if page.lifecycleState() == QWebEnginePage.LifecycleState.Active and idle >= self.freeze_after:
+                    logging.debug("Freezing idle tab: %s", tab.browser.url().toString())
+                    page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+
+            total, pid_users = self.renderer_memory()
+            if total <= self.memory_budget:
+                return
+            logging.info("Renderer memory %s bytes over budget %s bytes", total, self.memory_budget)
+
+            for tab in candidates:
+                if total <= self.memory_budget:
+                    break
+                page = tab.browser.page()
+                if page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+                    continue
+
+                pid = page.renderProcessPid()
+                if page.lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                    page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+                page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+                logging.info("Discarded tab: %s", tab.browser.url().toString())
+
+                # A renderer shared with other live tabs only goes away with the last of them
+                pid_users[pid] = pid_users.get(pid, 1) - 1
+                if pid_users[pid] <= 0:
+                    total -= read_process_memory(pid)
+        except Exception as e:
+            logging.error("Error checking tab lifecycle: %s", e)
+
+    def renderer_memory(self):
+        """Return total renderer memory and the number of live tabs per renderer process"""
+        pid_users = {}
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if not isinstance(tab, BrowserTab):
+                continue
+            page = tab.browser.page()
+            if page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+                continue
+            pid = page.renderProcessPid()
+            if pid:
+                pid_users[pid] = pid_users.get(pid, 0) + 1
+        total = sum(read_process_memory(pid) for pid in pid_users)
+        return total, pid_users
+
+class TaskManager(QObject):
+    """Samples memory and CPU time of the browser and its helper processes off the GUI thread"""
+    sampled = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sampler = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        # pid -> (cpu seconds, monotonic time) of the previous sample, only touched by the sampler thread
+        self.last_cpu = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(get_settings().value("task_manager/interval_secs", 2, type=int) * 1000)
+        self.timer.timeout.connect(self.request_sample)
+
+    def start(self):
+        self.request_sample()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def request_sample(self):
+        # Skip a tick rather than queue samples behind a slow one
+        if self.pending is not None and not self.pending.done():
+            return
+        self.pending = self.sampler.submit(self.sample)
+        self.pending.add_done_callback(lambda f: f.exception() is None and self.sampled.emit(f.result()))
+
+    def sample(self):
+        """Return {pid: stats} for this process and every descendant"""
+        root = os.getpid()
+        now = time.monotonic()
+        processes = {}
+        for pid in [root] + list_child_processes(root):
+            stats = read_process_stats(pid)
+            if stats is None:
+                continue
+            stats["name"] = "Browser" if pid == root else describe_process(pid)
+            previous = self.last_cpu.get(pid)
+            stats["cpu_percent"] = None
+            if previous is not None and now > previous[1]:
+                stats["cpu_percent"] = max(0.0, (stats["cpu"] - previous[0]) / (now - previous[1]) * 100)
+            self.last_cpu[pid] = (stats["cpu"], now)
+            processes[pid] = stats
+        for pid in set(self.last_cpu) - set(processes):
+            del self.last_cpu[pid]
+        return processes
+
+    def shutdown(self):
+        self.timer.stop()
+        self.sampler.shutdown(wait=False, cancel_futures=True)
+
+class TaskManagerWindow(QMainWindow):
+    """Shows which tab, renderer or helper process is using memory and CPU"""
+    COLUMNS = ["Task", "PID", "Process", "Memory", "PSS", "CPU %"]
+
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.browser = browser
+        self.task_manager = TaskManager(self)
+        self.task_manager.sampled.connect(self.update_table)
+        self.setWindowTitle("Task Manager")
+        self.setGeometry(150, 150, 750, 450)
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.itemDoubleClicked.connect(self.show_tab)
+        self.summary = QLabel()
+        
+        reload_btn = QPushButton("Reload Tab")
+        reload_btn.clicked.connect(self.reload_selected)
+        kill_btn = QPushButton("End Process")
+        kill_btn.clicked.connect(self.kill_selected)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.summary)
+        buttons.addStretch()
+        buttons.addWidget(reload_btn)
+        buttons.addWidget(kill_btn)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setCentralWidget(container)
+        # Row -> (tab or None, pid or None, process name)
+        self.row_tasks = []
+    
+    def showEvent(self, event):
+        self.task_manager.start()
+        super().showEvent(event)
+    
+    def hideEvent(self, event):
+        self.task_manager.stop()
+        super().hideEvent(event)
+    
+    def tab_tasks(self):
+        """Return (label, tab, renderer pid) for every open tab"""
+        tasks = []
+        tabs = self.browser.tabs
+        for i in range(tabs.count()):
+            tab = tabs.widget(i)
+            if not isinstance(tab, BrowserTab):
+                continue
+            page = tab.browser.page()
+            label = f"{'Tor tab' if tab.is_tor else 'Tab'}: {tabs.tabText(i)}"
+            discarded = page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded
+            tasks.append((label, tab, None if discarded else page.renderProcessPid() or None))
+        return tasks
+    
+    def update_table(self, processes):
+        """Lay out tabs under their renderers, then the remaining helper processes"""
+        rows = []
+        browser_pid = os.getpid()
+        shown = set()
+        tab_tasks = self.tab_tasks()
+        sharing = collections.Counter(pid for _, _, pid in tab_tasks if pid)
+        for label, tab, pid in tab_tasks:
+            stats = processes.get(pid)
+            name = "Discarded" if pid is None else "Renderer"
+            if sharing[pid] > 1:
+                name = f"Renderer, shared by {sharing[pid]} tabs"
+            rows.append((label, tab, pid, name, stats))
+            shown.add(pid)
+        
+        if self.browser.download_manager is not None:
+            live = self.browser.download_manager.model.live.values()
+            active = sum(1 for item in live if not item.is_finished)
+            # Downloads run inside the browser process, so they get no numbers of their own
+            rows.append((f"Download manager: {active} active", None, browser_pid, "Browser", None))
+        
+        for pid, stats in sorted(processes.items(), key=lambda item: item[1]["rss"], reverse=True):
+            if pid not in shown:
+                rows.append((stats["name"], None, pid, stats["name"], stats))
+        
+        self.table.setRowCount(len(rows))
+        self.row_tasks = []
+        for row, (label, tab, pid, name, stats) in enumerate(rows):
+            values = [label, str(pid or ""), name, "", "", ""]
+            if stats is not None:
+                values[3] = DownloadItem.format_size(stats["rss"])
+                values[4] = DownloadItem.format_size(stats["pss"]) if stats["pss"] is not None else ""
+                values[5] = f"{stats['cpu_percent']:.1f}" if stats["cpu_percent"] is not None else ""
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if tab is not None:
+                    item.setToolTip(tab.browser.url().toString())
+                self.table.setItem(row, column, item)
+            self.row_tasks.append((tab, pid, name))
+        
+        total_rss = sum(stats["rss"] for stats in processes.values())
+        total_pss = sum(stats["pss"] or 0 for stats in processes.values())
+        total_cpu = sum(stats["cpu_percent"] or 0 for stats in processes.values())
+        self.summary.setText(f"{len(processes)} processes, {DownloadItem.format_size(total_rss)} resident, "
+                             f"{DownloadItem.format_size(total_pss)} proportional, {total_cpu:.0f}% CPU")
+    
+    def selected_tasks(self):
+        rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        return [self.row_tasks[row] for row in sorted(rows) if row < len(self.row_tasks)]
+    
+    def show_tab(self, item):
+        tab = self.row_tasks[item.row()][0] if item.row() < len(self.row_tasks) else None
+        if tab is not None and self.browser.tabs.indexOf(tab) >= 0:
+            self.browser.tabs.setCurrentWidget(tab)
+            self.browser.activateWindow()
+    
+    def reload_selected(self):
+        for tab, pid, name in self.selected_tasks():
+            if tab is None or self.browser.tabs.indexOf(tab) < 0:
+                continue
+            page = tab.browser.page()
+            if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+                page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            tab.browser.reload()
+    
+    def kill_selected(self):
+        """End the renderer behind the selected tabs, which also stops any tab sharing it"""
+        pids = {pid for tab, pid, name in self.selected_tasks() if pid and name.startswith("Renderer")}
+        if not pids:
+            QMessageBox.information(self, "End Process", "Select a tab with a running renderer to end its process.")
+            return
+        reply = QMessageBox.question(self, "End Process",
+                                     "End the selected renderer processes? Every tab they render will stop.")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                logging.info("Killed renderer process %s", pid)
+            except OSError as e:
+                logging.error("Failed to kill renderer process %s: %s", pid, e)
+        self.task_manager.request_sample()
+    
+    def closeEvent(self, event):
+        self.task_manager.stop()
+        super().closeEvent(event)
+
+class CookieJournal(QObject):
+    """Persists cookies incrementally in a SQLite WAL database keyed by (domain, path, name)"""
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.db = None
+        # Current cookie state, used to skip events that change nothing
+        self.records = {}
+        # Changes since the last flush, None marks a deletion
+        self.pending = {}
+        self.flush_count = 0
+        self.compact_every = 100
+
+        # All database access happens on this single writer thread
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.writer.submit(self.open_db).result()
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(get_settings().value("cookies/flush_interval_secs", 3, type=int) * 1000)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start()
+
+    def open_db(self):
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS cookies (
+                domain TEXT NOT NULL,
+                path TEXT NOT NULL,
+                name BLOB NOT NULL,
+                value BLOB NOT NULL,
+                expiry INTEGER,
+                secure INTEGER NOT NULL DEFAULT 0,
+                http_only INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (domain, path, name)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def cookie_key(cookie):
+        return (cookie.domain(), cookie.path(), bytes(cookie.name()))
+
+    @staticmethod
+    def cookie_record(cookie):
+        """Return (value, expiry, secure, http_only) for a QNetworkCookie"""
+        expiry = None
+        if not cookie.isSessionCookie():
+            expiry = cookie.expirationDate().toSecsSinceEpoch()
+        return (bytes(cookie.value()), expiry, int(cookie.isSecure()), int(cookie.isHttpOnly()))
+
+    @staticmethod
+    def make_cookie(key, record):
+        """Build a QNetworkCookie from a key and record"""
+        domain, path, name = key
+        value, expiry, secure, http_only = record
+        cookie = QNetworkCookie(QByteArray(name), QByteArray(value))
+        cookie.setDomain(domain)
+        cookie.setPath(path)
+        cookie.setSecure(bool(secure))
+        cookie.setHttpOnly(bool(http_only))
+        if expiry is not None:
+            cookie.setExpirationDate(QDateTime.fromSecsSinceEpoch(expiry))
+        return cookie
+
+    def record_added(self, cookie):
+        key = self.cookie_key(cookie)
+        record = self.cookie_record(cookie)
+        if self.records.get(key) == record:
+            return
+        self.records[key] = record
+        self.pending[key] = record
+
+    def record_removed(self, cookie):
+        key = self.cookie_key(cookie)
+        if self.records.pop(key, None) is None:
+            return
+        self.pending[key] = None
+
+    def read_rows(self):
+        """Read all unexpired cookies, returns a list of (key, record)"""
+        return self.select_rows("", ())
+
+    def read_domains(self, domains):
+        """Read unexpired cookies for the given domains using the primary key index"""
+        domains = list(domains)
+        if not domains:
+            return []
+        placeholders = ", ".join("?" * len(domains))
+        return self.select_rows(f"AND domain IN ({placeholders})", domains)
+
+    def select_rows(self, condition, params):
+        now = int(time.time())
+        cursor = self.db.execute(
+            "SELECT domain, path, name, value, expiry, secure, http_only FROM cookies "
+            f"WHERE (expiry IS NULL OR expiry > ?) {condition}", (now, *params)
+        )
+        return [((domain, path, bytes(name)), (bytes(value), expiry, secure, http_only))
+                for domain, path, name, value, expiry, secure, http_only in cursor]
+
+    def flush(self, wait=False):
+        """Hand pending changes to the writer thread"""
+        if not self.pending and not wait:
+            return
+        batch, self.pending = self.pending, {}
+        self.flush_count += 1
+        compact = self.flush_count % self.compact_every == 0
+        future = self.writer.submit(self.write_batch, batch, compact)
+        if wait:
+            future.result()
+
+    def write_batch(self, batch, compact=False):
+        try:
+            upserts = [key + record for key, record in batch.items() if record is not None]
+            deletes = [key for key, record in batch.items() if record is None]
+            with self.db:
+                if upserts:
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO cookies (domain, path, name, value, expiry, secure, http_only) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", upserts
+                    )
+                if deletes:
+                    self.db.executemany(
+                        "DELETE FROM cookies WHERE domain = ? AND path = ? AND name = ?", deletes
+                    )
+            if upserts or deletes:
+                logging.debug("Flushed cookie journal: %s updated, %s removed", len(upserts), len(deletes))
+            if compact:
+                self.compact()
+        except Exception as e:
+            logging.error("Failed to flush cookie journal: %s", e)
+
+    def compact(self):
+        """Drop expired cookies and fold the WAL back into the database"""
+        with self.db:
+            self.db.execute("DELETE FROM cookies WHERE expiry IS NOT NULL AND expiry <= ?", (int(time.time()),))
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logging.debug("Compacted cookie journal")
+
+    def cookie_header(self, qurl):
+        """Build a Cookie header value for a request to qurl"""
+        host = qurl.host().lower()
+        path = qurl.path() or "/"
+        secure = qurl.scheme() == "https"
+        now = int(time.time())
+        pairs = []
+        for (domain, cookie_path, name), (value, expiry, cookie_secure, _) in self.records.items():
+            bare = domain.lstrip(".").lower()
+            if host != bare and not host.endswith("." + bare):
+                continue
+            if not path.startswith(cookie_path) or (cookie_secure and not secure):
+                continue
+            if expiry is not None and expiry <= now:
+                continue
+            pairs.append(f"{name.decode('latin-1')}={value.decode('latin-1')}")
+        return "; ".join(pairs)
+
+    def clear(self):
+        self.records.clear()
+        self.pending.clear()
+        self.writer.submit(self.delete_all).result()
+
+    def delete_all(self):
+        with self.db:
+            self.db.execute("DELETE FROM cookies")
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """Flush, compact and close the database"""
+        self.flush_timer.stop()
+        self.flush(wait=True)
+        self.writer.submit(self.close_db).result()
+        self.writer.shutdown(wait=True)
+
+    def close_db(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logging.error("Failed to compact cookie journal: %s", e)
+        self.db.close()
+
+class CookieLoader(QObject):
+    """Restores journaled cookies in chunks, loading the domains of waiting navigations first"""
+    rows_loaded = pyqtSignal(object, object)
+
+    def __init__(self, journal, cookie_store, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.cookie_store = cookie_store
+        self.chunk_size = get_settings().value("cookies/load_chunk_size", 500, type=int)
+        self.loaded_domains = set()
+        self.requested_domains = set()
+        self.waiting = []
+        self.queue = []
+        self.finished = False
+        self.started_at = None
+
+        # Rows are read on the journal thread and applied on the GUI thread
+        self.rows_loaded.connect(self.on_rows_loaded)
+        self.chunk_timer = QTimer(self)
+        self.chunk_timer.setInterval(0)
+        self.chunk_timer.timeout.connect(self.apply_chunk)
+
+    @staticmethod
+    def candidate_domains(host):
+        """Return every cookie domain that can apply to a host"""
+        host = host.lower().strip(".")
+        if not host:
+            return set()
+        parts = host.split(".")
+        domains = set()
+        for i in range(max(len(parts) - 1, 1)):
+            domain = ".".join(parts[i:])
+            domains.add(domain)
+            domains.add("." + domain)
+        return domains
+
+    def when_ready(self, qurl, callback):
+        """Run callback once the cookies for the URL's host are in the cookie store"""
+        domains = self.candidate_domains(qurl.host())
+        if self.finished or not domains or domains <= self.loaded_domains:
+            callback()
+            return
+        self.waiting.append((domains, callback))
+        self.request_domains(domains)
+
+    def request_domains(self, domains):
+        missing = domains - self.requested_domains
+        if not missing:
+            return
+        self.requested_domains |= missing
+        future = self.journal.writer.submit(self.journal.read_domains, missing)
+        future.add_done_callback(lambda f, missing=missing: self.emit_rows(f, missing))
+
+    def start(self):
+        """Read the remaining cookies in the background"""
+        self.started_at = time.monotonic()
+        future = self.journal.writer.submit(self.journal.read_rows)
+        future.add_done_callback(lambda f: self.emit_rows(f, None))
+
+    def emit_rows(self, future, domains):
+        try:
+            rows = future.result()
+        except Exception as e:
+            logging.error("Failed to read cookies: %s", e)
+            rows = []
+        self.rows_loaded.emit(domains, rows)
+
+    def on_rows_loaded(self, domains, rows):
+        if domains is None:
+            # Bulk load, applied a chunk at a time
+            self.queue.extend(rows)
+            self.chunk_timer.start()
+            return
+        self.apply_rows(rows)
+        self.loaded_domains |= domains
+        self.release_waiting()
+
+    def apply_rows(self, rows):
+        records = self.journal.records
+        for key, record in rows:
+            # Never overwrite a cookie that was already restored or set live
+            if key in records:
+                continue
+            records[key] = record
+            try:
+                self.cookie_store.setCookie(CookieJournal.make_cookie(key, record))
+            except Exception as e:
+                logging.error("Failed to restore cookie for %s: %s", key[0], e)
+
+    def apply_chunk(self):
+        chunk, self.queue = self.queue[:self.chunk_size], self.queue[self.chunk_size:]
+        self.apply_rows(chunk)
+        if self.queue:
+            return
+        self.chunk_timer.stop()
+        self.finished = True
+        elapsed = time.monotonic() - self.started_at
+        logging.info("Loaded %s cookies in %.2fs", len(self.journal.records), elapsed)
+        self.release_waiting()
+
+    def release_waiting(self):
+        waiting, self.waiting = self.waiting, []
+        for domains, callback in waiting:
+            if not (self.finished or domains <= self.loaded_domains):
+                self.waiting.append((domains, callback))
+                continue
+            try:
+                callback()
+            except Exception as e:
+                logging.error("Deferred navigation failed: %s", e)
+
+class TorController(QObject):
+    """Probes Tor's SOCKS and control ports without blocking and monitors bootstrap and circuit health"""
+    socks_checked = pyqtSignal(bool, str)
+    status_changed = pyqtSignal()
+
+    def __init__(self, host=None, socks_port=None, control_port=None, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.host = host or settings.value("tor/host", "127.0.0.1")
+        self.socks_port = socks_port or settings.value("tor/socks_port", 9050, type=int)
+        self.control_port = control_port or settings.value("tor/control_port", 9051, type=int)
+        self.password = settings.value("tor/control_password", "")
+        self.latency_threshold = settings.value("tor/circuit_latency_threshold_ms", 5000, type=int) / 1000
+        self.newnym_cooldown = settings.value("tor/newnym_cooldown_secs", 60, type=int)
+
+        self.monitoring = False
+        self.socks_ok = False
+        self.control_ok = False
+        self.bootstrap = None
+        self.bootstrap_summary = ""
+        self.launched = {}
+        self.build_times = collections.deque(maxlen=20)
+        self.outcomes = collections.deque(maxlen=10)
+        self.last_newnym = 0.0
+
+        # SOCKS probe
+        self.probe_socket = None
+        self.probe_timer = QTimer(self)
+        self.probe_timer.setSingleShot(True)
+        self.probe_timer.timeout.connect(lambda: self.finish_probe(self.probe_socket, False, "Timed out"))
+
+        # Control port connection
+        self.control = QTcpSocket(self)
+        self.control.connected.connect(self.on_control_connected)
+        self.control.readyRead.connect(self.on_control_ready_read)
+        self.control.disconnected.connect(self.on_control_lost)
+        self.control.errorOccurred.connect(lambda _: self.on_control_lost())
+        self.buffer = b""
+        self.pending = []
+        self.reply_lines = []
+        self.in_data = False
+        self.client_nonce = b""
+
+        self.health_timer = QTimer(self)
+        self.health_timer.setInterval(30000)
+        self.health_timer.timeout.connect(self.check_health)
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.setInterval(10000)
+        self.reconnect_timer.timeout.connect(self.connect_control)
+
+    @property
+    def proxy_url(self):
+        return f"socks5://{self.host}:{self.socks_port}"
+
+    def start(self):
+        """Monitor bootstrap progress and circuit health until stop() is called"""
+        self.monitoring = True
+        self.health_timer.start()
+        self.connect_control()
+
+    def stop(self):
+        self.monitoring = False
+        self.health_timer.stop()
+        self.reconnect_timer.stop()
+        self.control.abort()
+        self.control_ok = False
+        self.bootstrap = None
+        self.launched.clear()
+        self.build_times.clear()
+        self.outcomes.clear()
+        self.status_changed.emit()
+
+    def probe_socks(self):
+        """Check that a SOCKS5 proxy answers on the SOCKS port, emits socks_checked"""
+        if self.probe_socket is not None:
+            return
+        sock = QTcpSocket(self)
+        self.probe_socket = sock
+        sock.connected.connect(lambda: sock.write(b"\x05\x01\x00"))
+        sock.readyRead.connect(lambda: self.on_probe_ready_read(sock))
+        sock.errorOccurred.connect(lambda _: self.finish_probe(sock, False, sock.errorString()))
+        self.probe_timer.start(3000)
+        sock.connectToHost(self.host, self.socks_port)
+
+    def on_probe_ready_read(self, sock):
+        if sock.bytesAvailable() < 2:
+            return
+        reply = bytes(sock.read(2))
+        if reply == b"\x05\x00":
+            self.finish_probe(sock, True, "")
+        else:
+            self.finish_probe(sock, False, f"Port {self.socks_port} is open but is not a SOCKS5 proxy")
+
+    def finish_probe(self, sock, ok, message):
+        if sock is None or sock is not self.probe_socket:
+            return
+        self.probe_timer.stop()
+        self.probe_socket = None
+        sock.abort()
+        sock.deleteLater()
+        self.socks_ok = ok
+        if not ok:
+            logging.warning("Tor SOCKS probe failed: %s", message)
+        self.socks_checked.emit(ok, message)
+        self.status_changed.emit()
+
+    def check_health(self):
+        self.probe_socks()
+        if self.monitoring and self.control.state() == QTcpSocket.SocketState.UnconnectedState:
+            self.connect_control()
+
+    def connect_control(self):
+        if not self.monitoring or self.control.state() != QTcpSocket.SocketState.UnconnectedState:
+            return
+        self.buffer = b""
+        self.pending = []
+        self.reply_lines = []
+        self.in_data = False
+        self.control.connectToHost(self.host, self.control_port)
+
+    def on_control_lost(self):
+        was_ok = self.control_ok
+        self.control_ok = False
+        if was_ok:
+            logging.warning("Lost connection to the Tor control port")
+            self.status_changed.emit()
+        if self.monitoring and not self.reconnect_timer.isActive():
+            self.reconnect_timer.start()
+
+    def send(self, command, callback=None):
+        self.pending.append(callback)
+        self.control.write(command.encode() + b"\r\n")
+
+    def on_control_ready_read(self):
+        self.buffer += bytes(self.control.readAll())
+        while b"\r\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\r\n", 1)
+            self.handle_line(line.decode(errors="replace"))
+
+    def handle_line(self, line):
+        """Collect reply lines and dispatch replies and asynchronous events"""
+        if self.in_data:
+            if line == ".":
+                self.in_data = False
+            else:
+                self.reply_lines.append(line)
+            return
+        code, separator, text = line[:3], line[3:4], line[4:]
+        if code == "650":
+            # Only single-line events are subscribed to
+            if separator == " ":
+                self.handle_event(text)
+            return
+        self.reply_lines.append(text)
+        if separator == "+":
+            self.in_data = True
+        elif separator == " ":
+            lines, self.reply_lines = self.reply_lines, []
+            callback = self.pending.pop(0) if self.pending else None
+            if callback:
+                try:
+                    callback(code, lines)
+                except Exception as e:
+                    logging.error("Error handling Tor control reply: %s", e)
+
+    def on_control_connected(self):
+        self.send("PROTOCOLINFO 1", self.on_protocol_info)
+
+    def on_protocol_info(self, code, lines):
+        methods = set()
+        cookie_file = None
+        for line in lines:
+            match = re.match(r'AUTH METHODS=(\S+)(?: COOKIEFILE="((?:[^"\\]|\\.)*)")?', line)
+            if match:
+                methods = set(match.group(1).split(","))
+                if match.group(2):
+                    cookie_file = re.sub(r"\\(.)", r"\1", match.group(2))
+        if code != "250":
+            logging.warning("Tor PROTOCOLINFO failed: %s", " ".join(lines))
+        elif "NULL" in methods:
+            self.send("AUTHENTICATE", self.on_authenticated)
+            return
+        elif "HASHEDPASSWORD" in methods and self.password:
+            escaped = self.password.replace("\\", "\\\\").replace('"', '\\"')
+            self.send(f'AUTHENTICATE "{escaped}"', self.on_authenticated)
+            return
+        elif cookie_file and methods & {"COOKIE", "SAFECOOKIE"}:
+            try:
+                with open(cookie_file, 'rb') as f:
+                    cookie = f.read()
+            except OSError as e:
+                logging.warning("Cannot read Tor control cookie %s: %s", cookie_file, e)
+            else:
+                if "COOKIE" in methods:
+                    self.send(f"AUTHENTICATE {cookie.hex()}", self.on_authenticated)
+                else:
+                    self.client_nonce = os.urandom(32)
+                    self.send(f"AUTHCHALLENGE SAFECOOKIE {self.client_nonce.hex()}",
+                              lambda code, lines: self.on_auth_challenge(code, lines, cookie))
+                return
+        else:
+            logging.warning("No usable Tor control authentication method in %s", sorted(methods))
+        self.control.abort()
+
+    def on_auth_challenge(self, code, lines, cookie):
+        match = re.search(r"SERVERHASH=([0-9A-Fa-f]+) SERVERNONCE=([0-9A-Fa-f]+)", " ".join(lines))
+        if code != "250" or not match:
+            logging.warning("Tor AUTHCHALLENGE failed: %s", " ".join(lines))
+            self.control.abort()
+            return
+        server_hash, server_nonce = match.group(1), bytes.fromhex(match.group(2))
+        message = cookie + self.client_nonce + server_nonce
+        expected = hmac.new(b"Tor safe cookie authentication server-to-controller hash", message, hashlib.sha256)
+        if not hmac.compare_digest(expected.hexdigest().upper(), server_hash.upper()):
+            logging.warning("Tor control port failed SAFECOOKIE server authentication")
+            self.control.abort()
+            return
+        client_hash = hmac.new(b"Tor safe cookie authentication controller-to-server hash", message, hashlib.sha256)
+        self.send(f"AUTHENTICATE {client_hash.hexdigest()}", self.on_authenticated)
+
+    def on_authenticated(self, code, lines):
+        if code != "250":
+            logging.warning("Tor control authentication failed: %s", " ".join(lines))
+            self.control.abort()
+            return
+        logging.info("Connected to the Tor control port")
+        self.control_ok = True
+        self.send("GETINFO status/bootstrap-phase", self.on_bootstrap_info)
+        self.send("SETEVENTS STATUS_CLIENT CIRC")
+        self.status_changed.emit()
+
+    def on_bootstrap_info(self, code, lines):
+        if code == "250":
+            self.parse_bootstrap(" ".join(lines))
+
+    def parse_bootstrap(self, text):
+        match = re.search(r"PROGRESS=(\d+)", text)
+        if not match:
+            return
+        self.bootstrap = int(match.group(1))
+        summary = re.search(r'SUMMARY="([^"]*)"', text)
+        self.bootstrap_summary = summary.group(1) if summary else ""
+        self.status_changed.emit()
+
+    def handle_event(self, text):
+        parts = text.split()
+        if not parts:
+            return
+        if parts[0] == "STATUS_CLIENT" and "BOOTSTRAP" in parts:
+            self.parse_bootstrap(text)
+        elif parts[0] == "CIRC" and len(parts) >= 3:
+            circuit_id, status = parts[1], parts[2]
+            now = time.monotonic()
+            if status == "LAUNCHED":
+                self.launched[circuit_id] = now
+            elif status == "BUILT":
+                started = self.launched.pop(circuit_id, None)
+                if started is not None:
+                    self.build_times.append(now - started)
+                    self.outcomes.append(True)
+                    self.evaluate_health()
+            elif status == "FAILED":
+                if self.launched.pop(circuit_id, None) is not None:
+                    self.outcomes.append(False)
+                    self.evaluate_health()
+            elif status == "CLOSED":
+                self.launched.pop(circuit_id, None)
+
+    def median_build_time(self):
+        if not self.build_times:
+            return None
+        ordered = sorted(self.build_times)
+        return ordered[len(ordered) // 2]
+
+    def is_degraded(self):
+        median = self.median_build_time()
+        slow = len(self.build_times) >= 3 and median > self.latency_threshold
+        failing = len(self.outcomes) >= 5 and self.outcomes.count(False) * 2 >= len(self.outcomes)
+        return slow or failing
+
+    def evaluate_health(self):
+        """Ask Tor for new circuits when build latency or failures degrade"""
+        now = time.monotonic()
+        if self.is_degraded() and self.control_ok and now - self.last_newnym >= self.newnym_cooldown:
+            logging.info("Tor circuits degraded (median build %.1fs), requesting new circuits",
+                         self.median_build_time() or 0)
+            self.last_newnym = now
+            self.send("SIGNAL NEWNYM")
+            self.build_times.clear()
+            self.outcomes.clear()
+        self.status_changed.emit()
+
+    def describe(self):
+        """Return (label text, tooltip, healthy) for the status bar indicator"""
+        lines = [f"SOCKS {self.host}:{self.socks_port}: {'ok' if self.socks_ok else 'not responding'}"]
+        text = "TOR"
+        if not self.control_ok:
+            lines.append(f"Control port {self.control_port}: not connected")
+        if self.bootstrap is not None:
+            lines.append(f"Bootstrap: {self.bootstrap}% {self.bootstrap_summary}".strip())
+            if self.bootstrap < 100:
+                text = f"TOR {self.bootstrap}%"
+        median = self.median_build_time()
+        if median is not None:
+            lines.append(f"Median circuit build: {median:.1f}s over {len(self.build_times)} circuits")
+            if self.bootstrap is None or self.bootstrap >= 100:
+                text = f"TOR {median:.1f}s"
+        if self.outcomes:
+            lines.append(f"Recent circuit failures: {self.outcomes.count(False)}/{len(self.outcomes)}")
+        healthy = self.socks_ok and not self.is_degraded()
+        return text, "\n".join(lines), healthy
+
+# Resource Timing summary of a page: a zero transferSize with a body means the
+# response came from the HTTP cache, a transfer smaller than the body is a 304
+CACHE_STATS_JS = """
+(() => {
+    const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+    let hits = 0, revalidated = 0, misses = 0, saved = 0;
+    for (const e of entries) {
+        if (!e.decodedBodySize) continue;
+        if (e.transferSize === 0) { hits++; saved += e.encodedBodySize; }
+        else if (e.transferSize < e.encodedBodySize) { revalidated++; saved += e.encodedBodySize - e.transferSize; }
+        else misses++;
+    }
+    return [hits, revalidated, misses, saved];
+})()
+"""
+
+# Content blocking
+
+FILTER_SNAPSHOT_MAGIC = b"QTCFLT01"
+FILTER_SNAPSHOT_HEADER = struct.Struct("<8s32sII")
+# Part of the snapshot fingerprint, bumped when parsing changes so older snapshots are recompiled
+FILTER_PARSER_VERSION = b"2"
+
+# Filter option flags
+FILTER_EXCEPTION = 1
+FILTER_THIRD_PARTY = 2
+FILTER_FIRST_PARTY = 4
+FILTER_IMPORTANT = 8
+# Only used while compiling, removes the filters it matches
+FILTER_BADFILTER = 16
+
+FILTER_RESOURCE_TYPES = {
+    "script": 1 << 0,
+    "image": 1 << 1,
+    "stylesheet": 1 << 2,
+    "xmlhttprequest": 1 << 3,
+    "subdocument": 1 << 4,
+    "font": 1 << 5,
+    "media": 1 << 6,
+    "object": 1 << 7,
+    "ping": 1 << 8,
+    "websocket": 1 << 9,
+    "other": 1 << 10,
+}
+FILTER_ALL_TYPES = (1 << 11) - 1
+# uBlock Origin short names for resource types
+FILTER_TYPE_ALIASES = {
+    "xhr": "xmlhttprequest",
+    "css": "stylesheet",
+    "frame": "subdocument",
+    "object-subrequest": "object",
+}
+
+FILTER_TOKEN_RE = re.compile(r"[a-z0-9%]{2,}")
+FILTER_REGEX_RE = re.compile(r"^/.+/(\$[^/]*)?$")
+
+class NetworkFilter:
+    """A single EasyList network filter, compiled to a regex on first use"""
+    __slots__ = ("pattern", "flags", "types", "domains", "excluded_domains", "regex")
+
+    def __init__(self, pattern, flags=0, types=0, domains=(), excluded_domains=()):
+        self.pattern = pattern
+        self.flags = flags
+        self.types = types
+        self.domains = tuple(domains)
+        self.excluded_domains = tuple(excluded_domains)
+        self.regex = None
+
+    @classmethod
+    def parse(cls, line):
+        """Parse one filter list line, returns None for comments, cosmetic and unsupported filters"""
+        line = line.strip()
+        if not line or line.startswith(("!", "[")) or "##" in line or "#@#" in line or "#?#" in line or "#$#" in line:
+            return None
+        flags = 0
+        if line.startswith("@@"):
+            flags |= FILTER_EXCEPTION
+            line = line[2:]
+        # Regex filters are rare in EasyList and too slow to evaluate per request
+        if FILTER_REGEX_RE.match(line):
+            return None
+        pattern, dollar, options = line.partition("$")
+        types = 0
+        excluded_types = 0
+        domains = []
+        excluded_domains = []
+        if dollar:
+            for option in options.lower().split(","):
+                negated = option.startswith("~")
+                name = option.lstrip("~")
+                name = FILTER_TYPE_ALIASES.get(name, name)
+                if name in FILTER_RESOURCE_TYPES:
+                    if negated:
+                        excluded_types |= FILTER_RESOURCE_TYPES[name]
+                    else:
+                        types |= FILTER_RESOURCE_TYPES[name]
+                elif name in ("third-party", "3p"):
+                    flags |= FILTER_FIRST_PARTY if negated else FILTER_THIRD_PARTY
+                elif name in ("first-party", "1p"):
+                    flags |= FILTER_THIRD_PARTY if negated else FILTER_FIRST_PARTY
+                elif name == "all" and not negated:
+                    types |= FILTER_ALL_TYPES
+                elif name == "important":
+                    flags |= FILTER_IMPORTANT
+                elif name == "badfilter":
+                    flags |= FILTER_BADFILTER
+                elif name.startswith("domain="):
+                    for domain in name[len("domain="):].split("|"):
+                        if domain.startswith("~"):
+                            excluded_domains.append(domain[1:])
+                        elif domain:
+                            domains.append(domain)
+                else:
+                    # Unknown options, and ones that rewrite requests or hide elements instead of
+                    # blocking, would leave a filter broader than intended
+                    return None
+        if excluded_types:
+            types = (types or FILTER_ALL_TYPES) & ~excluded_types
+        if not pattern.strip("*") and not domains:
+            return None
+        return cls(pattern.lower(), flags, types, domains, excluded_domains)
+
+    def tokens(self):
+        """Tokens that must appear whole in any URL this filter matches"""
+        pattern = self.pattern
+        start = 2 if pattern.startswith("||") else 1 if pattern.startswith("|") else 0
+        tokens = []
+        for match in FILTER_TOKEN_RE.finditer(pattern):
+            begin, end = match.span()
+            # A token touching a wildcard or an unanchored edge may only be part of a URL token
+            if begin == 0 and start == 0 or begin > 0 and pattern[begin - 1] == "*":
+                continue
+            if end == len(pattern) or pattern[end] == "*":
+                continue
+            tokens.append(match.group())
+        return tokens
+
+    def compile(self):
+        pattern = self.pattern
+        prefix = ""
+        if pattern.startswith("||"):
+            prefix = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+            pattern = pattern[2:]
+        elif pattern.startswith("|"):
+            prefix = "^"
+            pattern = pattern[1:]
+        suffix = ""
+        if pattern.endswith("|"):
+            suffix = "$"
+            pattern = pattern[:-1]
+        parts = []
+        for char in pattern:
+            if char == "*":
+                parts.append(".*")
+            elif char == "^":
+                parts.append(r"(?:[^\w\-.%]|$)")
+            else:
+                parts.append(re.escape(char))
+        return re.compile(prefix + "".join(parts) + suffix)
+
+    def matches(self, url, first_party_host, third_party, type_bit):
+        if self.types and not self.types & type_bit:
+            return False
+        if self.flags & FILTER_THIRD_PARTY and not third_party:
+            return False
+        if self.flags & FILTER_FIRST_PARTY and third_party:
+            return False
+        if self.domains and not any(host_matches(first_party_host, d) for d in self.domains):
+            return False
+        if self.excluded_domains and any(host_matches(first_party_host, d) for d in self.excluded_domains):
+            return False
+        if self.regex is None:
+            self.regex = self.compile()
+        return self.regex.search(url) is not None
+
+    def key(self):
+        """What a $badfilter filter has to share with the filter it disables"""
+        return (self.pattern, self.flags & ~FILTER_BADFILTER, self.types,
+                tuple(sorted(self.domains)), tuple(sorted(self.excluded_domains)))
+
+    def to_record(self):
+        return json.dumps([self.pattern, self.flags, self.types, self.domains, self.excluded_domains],
+                          separators=(",", ":")).encode()
+
+    @classmethod
+    def from_record(cls, data):
+        return cls(*json.loads(data))
+
+def host_matches(host, domain):
+    return host == domain or host.endswith(f".{domain}")
+
+def registrable_domain(host):
+    """The host's name one label below its public suffix, e.g. bbc.co.uk for news.bbc.co.uk"""
+    labels = host.split(".")
+    suffix = get_suffix_trie().suffix_length(labels)
+    if not suffix or suffix >= len(labels):
+        return host
+    return ".".join(labels[-suffix - 1:])
+
+def token_hash(token):
+    # Token 0 holds filters without a usable token
+    return zlib.crc32(token.encode()) or 1
+
+class FilterEngine:
+    """Token-hashed filter matcher reading a memory-mapped snapshot of compiled filter lists"""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.fingerprint, buckets, filters = FILTER_SNAPSHOT_HEADER.unpack_from(self.snapshot)
+        if magic != FILTER_SNAPSHOT_MAGIC:
+            raise ValueError("not a filter snapshot")
+        self.filter_count = filters
+        offset = FILTER_SNAPSHOT_HEADER.size
+        # The tables are copied out of the map once, filters are decoded only when a URL hits them
+        self.bucket_hashes, offset = self.read_array(offset, buckets)
+        self.bucket_starts, offset = self.read_array(offset, buckets + 1)
+        self.bucket_filters, offset = self.read_array(offset, self.bucket_starts[-1] if buckets else 0)
+        self.record_offsets, offset = self.read_array(offset, filters + 1)
+        self.records_start = offset
+        self.decoded = {}
+
+    def read_array(self, offset, count):
+        values = array("I")
+        values.frombytes(self.snapshot[offset:offset + count * 4])
+        return values, offset + count * 4
+
+    @staticmethod
+    def build(filters, fingerprint):
+        """Serialize filters into snapshot bytes, each filter is bucketed under its rarest token"""
+        disabled = {network_filter.key() for network_filter in filters if network_filter.flags & FILTER_BADFILTER}
+        filters = [network_filter for network_filter in filters
+                   if not network_filter.flags & FILTER_BADFILTER and network_filter.key() not in disabled]
+        counts = collections.Counter()
+        filter_tokens = []
+        for network_filter in filters:
+            tokens = network_filter.tokens()
+            filter_tokens.append(tokens)
+            counts.update(tokens)
+        buckets = collections.defaultdict(list)
+        for i, tokens in enumerate(filter_tokens):
+            if tokens:
+                best = min(tokens, key=lambda token: (counts[token], -len(token)))
+                buckets[token_hash(best)].append(i)
+            else:
+                buckets[0].append(i)
+        hashes = array("I", sorted(buckets))
+        starts = array("I", [0])
+        members = array("I")
+        for h in hashes:
+            members.extend(buckets[h])
+            starts.append(len(members))
+        records = [network_filter.to_record() for network_filter in filters]
+        offsets = array("I", [0])
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+        header = FILTER_SNAPSHOT_HEADER.pack(FILTER_SNAPSHOT_MAGIC, fingerprint, len(hashes), len(filters))
+        return b"".join([header, hashes.tobytes(), starts.tobytes(), members.tobytes(), offsets.tobytes(), *records])
+
+    def filter(self, i):
+        network_filter = self.decoded.get(i)
+        if network_filter is None:
+            start = self.records_start + self.record_offsets[i]
+            end = self.records_start + self.record_offsets[i + 1]
+            network_filter = self.decoded[i] = NetworkFilter.from_record(self.snapshot[start:end])
+        return network_filter
+
+    def bucket(self, h):
+        j = bisect.bisect_left(self.bucket_hashes, h)
+        if j < len(self.bucket_hashes) and self.bucket_hashes[j] == h:
+            return self.bucket_filters[self.bucket_starts[j]:self.bucket_starts[j + 1]]
+        return ()
+
+    def match(self, url, first_party_host, third_party, type_bit):
+        """Return the filter deciding the request: a blocking filter, an exception, or None"""
+        url = url.lower()
+        blocking = None
+        exception = None
+        hashes = {0}
+        hashes.update(token_hash(token) for token in FILTER_TOKEN_RE.findall(url))
+        for h in hashes:
+            for i in self.bucket(h):
+                network_filter = self.filter(i)
+                if network_filter.flags & FILTER_EXCEPTION:
+                    if exception is None and network_filter.matches(url, first_party_host, third_party, type_bit):
+                        exception = network_filter
+                elif (blocking is None or not blocking.flags & FILTER_IMPORTANT) and \
+                        network_filter.matches(url, first_party_host, third_party, type_bit):
+                    blocking = network_filter
+        if blocking is None:
+            return None
+        if exception is not None and not blocking.flags & FILTER_IMPORTANT:
+            return exception
+        return blocking
+
+    def close(self):
+        self.snapshot.close()
+
+class ContentBlocker(QObject):
+    """Loads the compiled filter lists and keeps blocking statistics"""
+    engine_ready = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.enabled = settings.value("blocker/enabled", True, type=bool)
+        self.filters_dir = os.path.join(get_data_dir(), "filters")
+        self.snapshot_path = os.path.join(self.filters_dir, "snapshot.bin")
+        self.engine = None
+        self.requests = 0
+        self.blocked = 0
+        self.match_times = collections.deque(maxlen=10000)
+        self.engine_ready.connect(self.on_engine_ready)
+        if self.enabled:
+            os.makedirs(self.filters_dir, exist_ok=True)
+            self.loader = ThreadPoolExecutor(max_workers=1)
+            self.loader.submit(self.load_engine)
+            self.loader.shutdown(wait=False)
+
+    def list_paths(self):
+        return sorted(os.path.join(self.filters_dir, name) for name in os.listdir(self.filters_dir) if name.endswith(".txt"))
+
+    def fingerprint(self, paths):
+        digest = hashlib.sha256(FILTER_SNAPSHOT_MAGIC + FILTER_PARSER_VERSION)
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+        return digest.digest()
+
+    def load_engine(self):
+        """Map the snapshot, compiling the filter lists first if they changed since it was written"""
+        try:
+            started = time.perf_counter()
+            paths = self.list_paths()
+            if not paths:
+                logging.info("No filter lists in %s, content blocking is off", self.filters_dir)
+                return
+            fingerprint = self.fingerprint(paths)
+            engine = None
+            if os.path.exists(self.snapshot_path):
+                engine = FilterEngine(self.snapshot_path)
+                if engine.fingerprint != fingerprint:
+                    engine.close()
+                    engine = None
+            if engine is None:
+                filters = []
+                for path in paths:
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        filters.extend(filter(None, map(NetworkFilter.parse, f)))
+                atomic_write(self.snapshot_path, FilterEngine.build(filters, fingerprint))
+                engine = FilterEngine(self.snapshot_path)
+                logging.info("Compiled %s filters from %s lists", engine.filter_count, len(paths))
+            logging.info("Loaded %s filters in %.0f ms", engine.filter_count, (time.perf_counter() - started) * 1000)
+            self.engine_ready.emit(engine)
+        except Exception as e:
+            logging.error("Failed to load filter lists: %s", e)
+
+    def on_engine_ready(self, engine):
+        self.engine = engine
+
+    def attach(self, page):
+        """Filter the requests of a page, returns the interceptor counting its blocked requests"""
+        interceptor = ContentBlockInterceptor(self, page)
+        page.setUrlRequestInterceptor(interceptor)
+        return interceptor
+
+    def check(self, url, first_party_host, third_party, type_bit):
+        """Return True if the request should be blocked"""
+        started = time.perf_counter()
+        decision = self.engine.match(url, first_party_host, third_party, type_bit)
+        self.match_times.append(time.perf_counter() - started)
+        self.requests += 1
+        if decision is not None and not decision.flags & FILTER_EXCEPTION:
+            self.blocked += 1
+            return True
+        return False
+
+    def describe(self):
+        """Return a human readable summary of blocking statistics"""
+        if self.engine is None:
+            return f"No filter lists loaded. Put EasyList-style .txt lists in {self.filters_dir}"
+        times = sorted(self.match_times)
+        mean = sum(times) / len(times) * 1e6 if times else 0
+        p99 = times[int(len(times) * 0.99)] * 1e6 if times else 0
+        return (f"Filters: {self.engine.filter_count}\n"
+                f"Requests checked: {self.requests}\n"
+                f"Blocked: {self.blocked}\n"
+                f"Match time: {mean:.1f} us mean, {p99:.1f} us p99")
+
+class ContentBlockInterceptor(QWebEngineUrlRequestInterceptor):
+    """Per-page request filter, a page interceptor only sees its own page's requests"""
+    TYPE_BITS = {
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeScript: FILTER_RESOURCE_TYPES["script"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeImage: FILTER_RESOURCE_TYPES["image"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeFavicon: FILTER_RESOURCE_TYPES["image"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeStylesheet: FILTER_RESOURCE_TYPES["stylesheet"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeXhr: FILTER_RESOURCE_TYPES["xmlhttprequest"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeSubFrame: FILTER_RESOURCE_TYPES["subdocument"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeFontResource: FILTER_RESOURCE_TYPES["font"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMedia: FILTER_RESOURCE_TYPES["media"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeObject: FILTER_RESOURCE_TYPES["object"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypePluginResource: FILTER_RESOURCE_TYPES["object"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypePing: FILTER_RESOURCE_TYPES["ping"],
+        QWebEngineUrlRequestInfo.ResourceType.ResourceTypeCspReport: FILTER_RESOURCE_TYPES["ping"],
+    }
+    blocked_changed = pyqtSignal(int)
+
+    def __init__(self, blocker, parent=None):
+        super().__init__(parent)
+        self.blocker = blocker
+        self.blocked = 0
+
+    def interceptRequest(self, info):
+        resource_type = info.resourceType()
+        if resource_type == QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame:
+            # Counts are per page load
+            if self.blocked:
+                self.blocked = 0
+                self.blocked_changed.emit(0)
+            return
+        if self.blocker.engine is None:
+            return
+        try:
+            url = info.requestUrl()
+            first_party_host = info.firstPartyUrl().host().lower()
+            host = url.host().lower()
+            third_party = bool(first_party_host) and registrable_domain(host) != registrable_domain(first_party_host)
+            type_bit = self.TYPE_BITS.get(resource_type, FILTER_RESOURCE_TYPES["other"])
+            if self.blocker.check(url.toString(), first_party_host, third_party, type_bit):
+                info.block(True)
+                self.blocked += 1
+                self.blocked_changed.emit(self.blocked)
+        except Exception as e:
+            logging.error("Content blocker failed on %s: %s", info.requestUrl().toString(), e,
+                          extra={"throttle": 10, "throttle_key": "content-blocker"})
+
+class Prerenderer(QObject):
+    """Loads the likely destination of typed input in a hidden page, so Enter can show it at once"""
+    def __init__(self, profiles, omnibox, content_blocker, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        self.profiles = profiles
+        self.omnibox = omnibox
+        self.content_blocker = content_blocker
+        self.enabled = settings.value("prerender/enabled", False, type=bool)
+        self.max_concurrent = settings.value("prerender/max_concurrent", 2, type=int)
+        self.min_score = settings.value("prerender/min_score", 300, type=int)
+        self.ttl = settings.value("prerender/ttl_secs", 30, type=int)
+        self.suspended = False
+        self.typed_text = ""
+        # Target URL -> entry, oldest first
+        self.entries = collections.OrderedDict()
+        
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(settings.value("prerender/settle_ms", 400, type=int))
+        self.settle_timer.timeout.connect(self.settle)
         
-        # Connect signals
-        self.back_btn.clicked.connect(self.browser.back)
-        self.forward_btn.clicked.connect(self.browser.forward)
-        self.reload_btn.clicked.connect(self.browser.reload)
-        self.home_btn.clicked.connect(self.navigate_home)
-        self.go_btn.clicked.connect(self.navigate_to_url)
-        self.search_btn.clicked.connect(self.search_in_address_bar)
-        self.zoom_in_btn.clicked.connect(lambda: self.browser.setZoomFactor(self.browser.zoomFactor() + 0.1))
-        self.zoom_out_btn.clicked.connect(lambda: self.browser.setZoomFactor(self.browser.zoomFactor() - 0.1))
-        self.url_bar.returnPressed.connect(self.search_in_address_bar)
-        self.browser.urlChanged.connect(self.update_url)
-        # Connect loadFinished signal to handle failures
-        self.browser.loadFinished.connect(self.handle_load_finished)
-        self.browser.loadStarted.connect(self.on_load_started)
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.setInterval(5000)
+        self.expiry_timer.timeout.connect(self.expire)
+
+    @staticmethod
+    def url_key(url):
+        return QUrl(url).adjusted(QUrl.UrlFormattingOption.StripTrailingSlash).toString()
+
+    def on_text_edited(self, text):
+        if not self.enabled or self.suspended:
+            return
+        self.typed_text = text
+        self.settle_timer.start()
+
+    def candidate(self, text):
+        """The URL the typed text most likely ends up at, or None if there is no confident guess"""
+        match = self.omnibox.index.top_prefix_match(text)
+        if match is not None and match[1] >= self.min_score:
+            return match[0]
+        if is_url(text):
+            return process_input(text)
+        return None
+
+    def settle(self):
+        text = omnibox_key(self.typed_text.strip())
+        # Prerenders the input has moved away from are stale
+        for key in list(self.entries):
+            if not omnibox_key(self.entries[key]["url"]).startswith(text):
+                self.cancel(key)
+        url = self.candidate(self.typed_text)
+        if url is None:
+            return
+        key = self.url_key(url)
+        if key in self.entries:
+            return
+        while len(self.entries) >= self.max_concurrent:
+            self.cancel(next(iter(self.entries)))
         
-        # Handle SSL errors
-        self.browser.page().certificateError.connect(self.handle_certificate_error)
+        page = self.profiles.new_page()
+        page.setAudioMuted(True)
+        entry = {"url": url, "page": page, "interceptor": None, "loaded": False, "started": time.monotonic()}
+        if self.content_blocker.enabled:
+            entry["interceptor"] = self.content_blocker.attach(page)
+        page.loadFinished.connect(lambda ok, entry=entry: entry.update(loaded=True))
+        page.setUrl(QUrl(url))
+        self.entries[key] = entry
+        self.expiry_timer.start()
+        logging.debug("Prerendering %s", url)
+
+    def take(self, url):
+        """Hand out the prerender for url, or None"""
+        self.settle_timer.stop()
+        entry = self.entries.pop(self.url_key(url.toString()), None)
+        if entry is not None:
+            logging.info("Using prerendered page for %s (%.0f ms ahead)", entry["url"],
+                         (time.monotonic() - entry["started"]) * 1000)
+        # Whatever else was prerendered for this input is not needed anymore
+        self.cancel_all()
+        return entry
+
+    def cancel(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            logging.debug("Cancelled prerender of %s", entry["url"])
+            entry["page"].deleteLater()
+        if not self.entries:
+            self.expiry_timer.stop()
+
+    def cancel_all(self):
+        for key in list(self.entries):
+            self.cancel(key)
+
+    def expire(self):
+        now = time.monotonic()
+        for key in list(self.entries):
+            if now - self.entries[key]["started"] > self.ttl:
+                self.cancel(key)
+
+    def set_suspended(self, suspended):
+        """Stop prerendering, e.g. while Tor is on"""
+        self.suspended = suspended
+        if suspended:
+            self.settle_timer.stop()
+            self.cancel_all()
+
+class ProfileManager(QObject):
+    """Builds the persistent browsing profile once, before any tab uses it"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = get_settings()
+        storage_path = os.path.join(get_data_dir(), "browser-profile")
+        cache_path = settings.value("profile/cache_dir", os.path.join(get_data_dir(), "cache"))
+        cache_size = settings.value("profile/cache_size_mb", 512, type=int) * 1024 * 1024
+        self.prewarm_origins = settings_list(settings.value("profile/prewarm_origins", ""))
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0}
+        self.prewarm_page = None
         
-        # Layout
-        layout = QVBoxLayout()
-        layout.addWidget(self.navbar)
-        layout.addWidget(self.browser)
-        self.setLayout(layout)
-    
-    def navigate_home(self):
-        self.browser.setUrl(QUrl("https://www.google.com"))
-    
-    def navigate_to_url(self):
-        input_text = self.url_bar.text().strip()
-        url = QUrl(process_input(input_text))
-        self.browser.setUrl(url)
-        self.retry_count = 0
-    
-    def search_in_address_bar(self):
-        input_text = self.url_bar.text().strip()
-        url = QUrl(process_input(input_text))
-        self.browser.setUrl(url)
-    
-    def update_url(self, q):
-        self.url_bar.setText(q.toString())
-    
-    def on_load_started(self):
-        self.loading_timer.start(self.load_timeout)
-    
-    def on_load_timeout(self):
-        logging.warning(f"Load timeout reached for {self.browser.url().toString()}")
-        self.browser.stop()
-        self.try_reload()
-    
-    def handle_load_finished(self, ok):
-        self.loading_timer.stop()
-        if not ok:
-            logging.error(f"Failed to load {self.browser.url().toString()}")
-            self.try_reload()
-            error_html = """
-            <html>
-                <head>
-                    <style>
-                        body { font-family: Arial, sans-serif; text-align: center; padding-top: 50px; background-color: #f2f2f2; }
-                        h1 { color: #d32f2f; }
-                        p { color: #555; }
-                    </style>
-                    <title>Page Not Available</title>
-                </head>
-                <body>
-                    <h1>Page Not Available</h1>
-                    <p>The webpage could not be loaded. Please check the URL or your connection.</p>
-                    <p>Tor connections can be slow or blocked. Please try again or use a different search engine.</p>
-                </body>
-            </html>
-            """
-            self.browser.setHtml(error_html)
-            
-    def handle_certificate_error(self, certificate, error):
-        logging.warning(f"SSL Certificate Error: {error}")
-        self.browser.page().certificateError.disconnect(self.handle_certificate_error)
-        self.browser.page().profile().setHttpsAcceptAnyCertificate(True)
-        self.browser.reload()
-    
-    def try_reload(self):
-        if self.retry_count < self.max_retries:
-            self.retry_count += 1
-            logging.info(f"Retrying to load page ({self.retry_count}/{self.max_retries})")
-            self.browser.reload()
-        else:
-            logging.error(f"Max retries reached for {self.browser.url().toString()}")
+        # Owned by the application so it outlives every page created on it
+        self.profile = QWebEngineProfile("default", QApplication.instance())
+        self.profile.setPersistentStoragePath(storage_path)
+        self.profile.setCachePath(cache_path)
+        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+        self.profile.setHttpCacheMaximumSize(cache_size)
+        self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.AllowPersistentCookies)
+        logging.info("Profile storage at %s, %s MB disk cache at %s", storage_path, cache_size // (1024 * 1024), cache_path)
+
+    def new_page(self):
+        """Return a page on the shared profile"""
+        return QWebEnginePage(self.profile)
+
+    def collect_cache_stats(self, page):
+        """Add the cache hits and misses of a finished load to the running totals"""
+        def on_result(result):
+            if not isinstance(result, list) or len(result) != 4:
+                return
+            hits, revalidated, misses, saved = (int(v) for v in result)
+            self.stats["hits"] += hits
+            self.stats["revalidated"] += revalidated
+            self.stats["misses"] += misses
+            self.stats["bytes_saved"] += saved
+            logging.debug("Cache stats for %s: %s hits, %s revalidated, %s misses",
+                          page.url().host(), hits, revalidated, misses)
+        try:
+            page.runJavaScript(CACHE_STATS_JS, on_result)
+        except Exception as e:
+            logging.error("Failed to collect cache stats: %s", e)
+
+    def hit_ratio(self):
+        total = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["revalidated"]) / total if total else 0.0
+
+    def describe(self):
+        """Return a human readable cache summary"""
+        return (f"Cache hits: {self.stats['hits']}\n"
+                f"Revalidated: {self.stats['revalidated']}\n"
+                f"Misses: {self.stats['misses']}\n"
+                f"Hit ratio: {self.hit_ratio():.0%}\n"
+                f"Saved: {DownloadItem.format_size(self.stats['bytes_saved'])}\n"
+                f"Cache size limit: {DownloadItem.format_size(self.profile.httpCacheMaximumSize())}")
+
+    def prewarm(self):
+        """Load the configured origins one at a time in a hidden page to fill the disk cache"""
+        if not self.prewarm_origins or self.prewarm_page is not None:
+            return
+        queue = [QUrl.fromUserInput(o) for o in self.prewarm_origins]
+        self.prewarm_page = self.new_page()
+        # Cache warming should not make noise
+        self.prewarm_page.setAudioMuted(True)
+
+        def load_next(ok=True):
+            if not queue:
+                logging.info("Finished cache prewarming (%s origins)", len(self.prewarm_origins))
+                self.prewarm_page.deleteLater()
+                self.prewarm_page = None
+                return
+            url = queue.pop(0)
+            logging.debug("Prewarming cache for %s", url.toString())
+            self.prewarm_page.setUrl(url)
+
+        self.prewarm_page.loadFinished.connect(load_next)
+        load_next()
+
+    def clear_cache(self):
+        self.profile.clearHttpCache()
+        self.stats = dict.fromkeys(self.stats, 0)
+        logging.info("Cleared HTTP cache")
+
+class TorProfile(QObject):
+    """Off-the-record profile for Tor tabs, built and warmed up before the first Tor tab opens"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.profile = None
+        self.spare_page = None
+
+    def ensure_profile(self):
+        if self.profile is None:
+            # No storage name makes the profile off-the-record: cookies and cache stay in memory
+            self.profile = QWebEngineProfile(QApplication.instance())
+            self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+            self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies)
+            logging.info("Created Tor profile")
+        return self.profile
+
+    def warm(self):
+        """Create the profile and a spare page with a live renderer for the next Tor tab"""
+        try:
+            self.ensure_profile()
+            if self.spare_page is None:
+                self.spare_page = QWebEnginePage(self.profile, self)
+                self.spare_page.setUrl(QUrl("about:blank"))
+                logging.debug("Warmed spare Tor page")
+        except Exception as e:
+            logging.error("Failed to warm Tor profile: %s", e)
+
+    def take_page(self):
+        """Return the warmed page, or a new one, and warm a replacement in the background"""
+        self.ensure_profile()
+        page, self.spare_page = self.spare_page, None
+        if page is None:
+            page = QWebEnginePage(self.profile)
+        QTimer.singleShot(0, self.warm)
+        return page
+
+    def reset(self):
+        """Drop every cookie, cache entry and visited link of the Tor session"""
+        if self.profile is None:
+            return
+        self.profile.cookieStore().deleteAllCookies()
+        self.profile.clearHttpCache()
+        self.profile.clearAllVisitedLinks()
+        if self.spare_page is not None:
+            self.spare_page.deleteLater()
+            self.spare_page = None
+        logging.info("Reset Tor profile")
 
 class Browser(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile_startup=False):
         super().__init__()
         logging.info("Initializing browser")
+        self.profile_startup = profile_startup
+        self.first_load_seen = False
         self.setWindowTitle("QtCelestial - Masturbini Mode")
         self.setWindowIcon(QIcon("/home/good-girl/Desktop/QtCelestial/masturbini.jpeg"))
         
         # Tor-related attributes
         self.tor_enabled = False
+        self.tor_profile = TorProfile(self)
+        self.pending_tor_tab = False
+        # Downloads started in Tor tabs, cancelled when Tor is turned off
+        self.tor_downloads = []
+        
+        # Storage, cache and cookie policy are fixed before the first page exists
+        self.profiles = ProfileManager(self)
+
+        # Filter lists are compiled and mapped in the background
+        self.content_blocker = ContentBlocker(self)
+        
+        # Load timeouts and retry delays learned from past loads
+        self.navigation = NavigationSupervisor(self)
+        
+        # Navigation timing of recent loads, shown in the performance panel
+        self.performance = PerformanceMonitor(self)
+        self.performance_panel = None
+        self.task_manager_window = None
+        self.closed_tabs = ClosedTabStack()
+        
+        # URL bar suggestions from visit history
+        self.omnibox = Omnibox(self)
+        self.prerenderer = Prerenderer(self.profiles, self.omnibox, self.content_blocker, self)
+        STARTUP.mark("profile and services")
+        
+        # Built after the first paint by finish_startup
+        self.page_index = None
+        self.page_search = None
+        self.download_scheduler = None
+        self.download_manager = None
+        self.download_progress = None
+        self.segmented_downloads = None
 
         # Cookie related initialization
         self.cookie_file = self.get_cookie_path()
-        self.cookies = set()  # Store cookies in memory
+        self.cookie_journal = CookieJournal(self.cookie_file, self)
+        self.cookie_store = self.profiles.profile.cookieStore()
+        self.cookie_store.cookieAdded.connect(self.on_cookie_added)
+        self.cookie_store.cookieRemoved.connect(self.on_cookie_removed)
+        self.migrate_legacy_cookies()
+        
+        # First navigations wait only for their own domain's cookies
+        self.cookie_loader = CookieLoader(self.cookie_journal, self.cookie_store, self)
+        STARTUP.mark("cookie journal")
         
         # Create tab widget
         self.tabs = QTabWidget()
         self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
         
-        # Add initial tab
-        self.add_new_tab(QUrl("https://www.google.com"), "Home")
-        
-        # Now setup cookie store after tab is created
-        current_tab = self.tabs.currentWidget()
-        if current_tab:
-            self.cookie_store = current_tab.browser.page().profile().cookieStore()
-            self.cookie_store.cookieAdded.connect(self.on_cookie_added)
-            self.cookie_store.cookieRemoved.connect(self.on_cookie_removed)
-            
-            # Enable persistent cookies
-            current_tab.browser.page().profile().setPersistentStoragePath(
-                os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation), "browser-profile")
-            )
+        # Suspend background tabs to keep renderer memory bounded
+        self.tab_lifecycle = TabLifecycleManager(self.tabs, self)
         
-        # Load cookies
-        self.load_cookies()
+        # Restore the previous session, tabs are only built when first activated
+        self.session = SessionManager(self.tabs, self)
+        self.tabs.currentChanged.connect(self.on_current_tab_changed)
+        entries, current = self.session.load()
+        if entries:
+            self.restore_session(entries, current)
+        else:
+            # Add initial tab
+            self.add_new_tab(QUrl("https://www.google.com"), "Home")
+        STARTUP.mark("first tab")
         
         # Navigation buttons for tabs
         self.new_tab_btn = QPushButton("+")
@@ -415,6 +4578,16 @@ class Browser(QMainWindow):
         new_tab_action.triggered.connect(lambda: self.add_new_tab())
         file_menu.addAction(new_tab_action)
         
+        new_tor_tab_action = QAction("New Tor Tab", self)
+        new_tor_tab_action.setShortcut("Ctrl+Shift+N")
+        new_tor_tab_action.triggered.connect(self.open_tor_tab)
+        file_menu.addAction(new_tor_tab_action)
+        
+        reopen_tab_action = QAction("Reopen Closed Tab", self)
+        reopen_tab_action.setShortcut("Ctrl+Shift+T")
+        reopen_tab_action.triggered.connect(self.reopen_closed_tab)
+        file_menu.addAction(reopen_tab_action)
+        
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -429,12 +4602,47 @@ class Browser(QMainWindow):
         toggle_tor_action.triggered.connect(self.toggle_tor)
         security_menu.addAction(toggle_tor_action)
         
+        blocker_stats_action = QAction("Content Blocker Statistics", self)
+        blocker_stats_action.triggered.connect(
+            lambda: QMessageBox.information(self, "Content Blocker", self.content_blocker.describe()))
+        security_menu.addAction(blocker_stats_action)
+        
+        cache_stats_action = QAction("Cache Statistics", self)
+        cache_stats_action.triggered.connect(self.show_cache_stats)
+        security_menu.addAction(cache_stats_action)
+        
+        clear_cache_action = QAction("Clear Cache", self)
+        clear_cache_action.triggered.connect(self.profiles.clear_cache)
+        security_menu.addAction(clear_cache_action)
+        
         # Downloads menu
         downloads_menu = menubar.addMenu("&Downloads")
         show_downloads_action = QAction("Show Downloads", self)
         show_downloads_action.triggered.connect(self.show_download_manager)
         downloads_menu.addAction(show_downloads_action)
         
+        # History menu
+        history_menu = menubar.addMenu("&History")
+        search_pages_action = QAction("Search Visited Pages", self)
+        search_pages_action.setShortcut("Ctrl+Shift+F")
+        search_pages_action.triggered.connect(self.show_page_search)
+        history_menu.addAction(search_pages_action)
+        
+        clear_page_index_action = QAction("Clear Page Index", self)
+        clear_page_index_action.triggered.connect(self.clear_page_index)
+        history_menu.addAction(clear_page_index_action)
+        
+        # Tools menu
+        tools_menu = menubar.addMenu("&Tools")
+        performance_action = QAction("Performance Panel", self)
+        performance_action.setShortcut("Ctrl+Shift+P")
+        performance_action.triggered.connect(self.show_performance_panel)
+        tools_menu.addAction(performance_action)
+        task_manager_action = QAction("Task Manager", self)
+        task_manager_action.setShortcut("Shift+Esc")
+        task_manager_action.triggered.connect(self.show_task_manager)
+        tools_menu.addAction(task_manager_action)
+        
         # Status bar
         self.status = QStatusBar()
         self.setStatusBar(self.status)
@@ -443,9 +4651,14 @@ class Browser(QMainWindow):
         self.tor_indicator.setStyleSheet("color: red; font-weight: bold;")
         self.tor_indicator.setVisible(False)
         self.status.addPermanentWidget(self.tor_indicator)
+        self.blocked_label = QLabel()
+        self.status.addPermanentWidget(self.blocked_label)
+        self.tabs.currentChanged.connect(lambda index: self.update_blocked_count(self.tabs.widget(index)))
         
-        # Download manager
-        self.download_manager = DownloadManager(self)
+        # Tor reachability and circuit health
+        self.tor_controller = TorController(parent=self)
+        self.tor_controller.socks_checked.connect(self.on_tor_socks_checked)
+        self.tor_controller.status_changed.connect(self.update_tor_indicator)
         
         # Set central widget
         self.setCentralWidget(self.tabs)
@@ -457,124 +4670,160 @@ class Browser(QMainWindow):
         
         # Connect download handler
         self.connect_download_handler()
+        
+        # Fill the disk cache for frequently visited origins once startup has settled
+        QTimer.singleShot(5000, self.prewarm_cache)
+        
+        # Build the Tor profile once the window is up so the first Tor tab opens instantly
+        if get_settings().value("tor/prewarm_profile", True, type=bool):
+            QTimer.singleShot(3000, self.warm_tor_profile)
+        
+        if self.session.crashed:
+            self.status.showMessage("Restored tabs from the previous session", 10000)
+        STARTUP.mark("menus and status bar")
+
+    def finish_startup(self):
+        """Start everything the first paint does not need, runs once the event loop is up"""
+        STARTUP.mark("event loop running")
+        # Remaining cookies are read after the first tab's own domains
+        self.load_cookies()
+        self.page_index = PageTextIndex(self)
+        self.ensure_downloads()
+        STARTUP.mark("deferred backends")
+        if self.profile_startup:
+            # Report even if the first page never finishes loading
+            QTimer.singleShot(60000, self.report_startup)
+
+    def ensure_downloads(self):
+        """Build the download manager and engines on first use"""
+        if self.download_manager is not None:
+            return
+        self.download_scheduler = DownloadScheduler(self)
+        self.download_scheduler.set_tor_enabled(self.tor_enabled)
+        self.download_manager = DownloadManager(self, self.download_scheduler)
+        self.download_progress = DownloadProgressEngine(self)
+        self.segmented_downloads = SegmentedDownloadEngine(self)
+        self.segmented_downloads.probe_finished.connect(self.on_range_probe_finished)
+
+    def on_first_load(self, tab):
+        """Record when the first page finished loading and when it first painted content"""
+        self.first_load_seen = True
+        STARTUP.mark("first page loaded")
+        fcp_js = """
+        (() => {
+            const entry = performance.getEntriesByName('first-contentful-paint')[0];
+            return entry ? performance.timeOrigin + entry.startTime : 0;
+        })()
+        """
+
+        def on_fcp(epoch_ms):
+            if epoch_ms:
+                # Page timestamps are wall clock, convert them to the startup clock
+                offset = time.time() - (time.perf_counter() - STARTUP_T0)
+                STARTUP.mark("first contentful paint", epoch_ms / 1000 - offset)
+            if self.profile_startup:
+                self.report_startup()
+        tab.browser.page().runJavaScript(fcp_js, on_fcp)
+
+    def report_startup(self):
+        if not self.profile_startup:
+            return
+        # Only the first report counts, later calls are the fallback timer
+        self.profile_startup = False
+        print(STARTUP.report(), flush=True)
+        self.close()
 
     def get_cookie_path(self):
         """Get path to store cookies"""
-        data_path = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
-        if not data_path:
-            data_path = QDir.currentPath()
-        
-        cookie_path = os.path.join(data_path, "browser-profile", "cookies")
+        cookie_path = os.path.join(get_data_dir(), "browser-profile", "cookies")
         os.makedirs(cookie_path, exist_ok=True)
-        return os.path.join(cookie_path, "cookies.dat")
-
-    def cookie_to_string(self, cookie):
-        """Convert a QNetworkCookie to a string representation."""
-        return f"{cookie.name().data().decode()};{cookie.value().data().decode()};{cookie.domain()};{cookie.path()}"
+        return os.path.join(cookie_path, "cookies.db")
 
     def on_cookie_added(self, cookie):
         """Handle new cookies"""
-        self.cookies.add(self.cookie_to_string(cookie))
+        self.cookie_journal.record_added(cookie)
 
     def on_cookie_removed(self, cookie):
         """Handle removed cookies"""
-        self.cookies.discard(self.cookie_to_string(cookie))
+        self.cookie_journal.record_removed(cookie)
 
-    def load_cookies(self):
-        """Load cookies from file"""
+    def migrate_legacy_cookies(self):
+        """Import cookies from the old pickled cookies.dat once"""
+        legacy_file = os.path.join(os.path.dirname(self.cookie_file), "cookies.dat")
+        if not os.path.exists(legacy_file):
+            return
         try:
-            logging.debug(f"Attempting to load cookies from: {self.cookie_file}")
-            
-            # Check if cookie file exists
-            if not os.path.exists(self.cookie_file):
-                logging.warning(f"Cookie file does not exist at: {self.cookie_file}")
-                return
-
-            # Check file size
-            file_size = os.path.getsize(self.cookie_file)
-            logging.debug(f"Cookie file size: {file_size} bytes")
-            
-            if file_size == 0:
-                logging.warning("Cookie file exists but is empty")
-                return
-
-            with open(self.cookie_file, 'rb') as f:
+            with open(legacy_file, 'rb') as f:
                 stored_cookies = pickle.load(f)
-                cookie_count = len(stored_cookies)
-                logging.debug(f"Found {cookie_count} cookies in file")
-                
-                if cookie_count == 0:
-                    logging.warning("No cookies found in file")
-                    return
-                    
-                for cookie_str in stored_cookies:
-                    try:
-                        name, value, domain, path = cookie_str.split(';', 3)
-                        cookie = QNetworkCookie(name.encode(), value.encode())
-                        cookie.setDomain(domain)
-                        cookie.setPath(path)
-                        self.cookie_store.setCookie(cookie)
-                        logging.debug(f"Loaded cookie: domain={domain}, path={path}")
-                    except Exception as ce:
-                        logging.error(f"Failed to parse cookie: {cookie_str}, error: {str(ce)}")
-                
-                logging.info(f"Successfully loaded {cookie_count} cookies")
-        except (FileNotFoundError, EOFError, pickle.PickleError) as e:
-            logging.error(f"Error loading cookies: {str(e)}")
-            # Try to recover old cookies from backup if it exists
-            backup_file = f"{self.cookie_file}.bak"
-            if os.path.exists(backup_file):
-                logging.info("Attempting to restore cookies from backup")
+            batch = {}
+            for cookie_str in stored_cookies:
                 try:
-                    with open(backup_file, 'rb') as f:
-                        self.cookies = set(pickle.load(f))
-                    logging.info("Restored cookies from backup")
-                except Exception as be:
-                    logging.error(f"Failed to restore from backup: {str(be)}")
+                    name, value, domain, path = cookie_str.split(';', 3)
+                    batch[(domain, path, name.encode())] = (value.encode(), None, 0, 0)
+                except Exception as ce:
+                    logging.error("Failed to parse legacy cookie: %s", ce)
+            self.cookie_journal.writer.submit(self.cookie_journal.write_batch, batch).result()
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+            logging.info("Migrated %s legacy cookies", len(stored_cookies))
         except Exception as e:
-            logging.error(f"Unexpected error loading cookies: {str(e)}")
+            logging.error("Failed to migrate legacy cookies: %s", e)
 
-    def save_cookies(self):
-        """Save cookies to file with backup"""
+    def load_cookies(self):
+        """Restore journaled cookies in chunks off the startup path"""
         try:
-            # Create backup of existing cookie file
-            if os.path.exists(self.cookie_file):
-                backup_file = f"{self.cookie_file}.bak"
-                try:
-                    os.replace(self.cookie_file, backup_file)
-                    logging.debug("Created backup of existing cookie file")
-                except Exception as e:
-                    logging.warning(f"Failed to create cookie backup: {str(e)}")
+            self.cookie_loader.start()
+        except Exception as e:
+            logging.error("Unexpected error loading cookies: %s", e)
 
-            # Save new cookies
-            with open(self.cookie_file, 'wb') as f:
-                cookie_list = list(self.cookies)
-                pickle.dump(cookie_list, f)
-                logging.info(f"Successfully saved {len(cookie_list)} cookies")
+    def save_cookies(self):
+        """Flush pending cookie changes to disk"""
+        try:
+            self.cookie_journal.flush(wait=True)
+            logging.info("Saved cookie journal (%s cookies)", len(self.cookie_journal.records))
         except Exception as e:
-            logging.error(f"Failed to save cookies: {str(e)}")
+            logging.error("Failed to save cookies: %s", e)
 
     def closeEvent(self, event):
         """Handle browser closing"""
         try:
+            self.session.shutdown()
+            self.omnibox.shutdown()
+            if self.page_index is not None:
+                self.page_index.shutdown()
+            self.navigation.shutdown()
+            if self.task_manager_window is not None:
+                self.task_manager_window.task_manager.shutdown()
+            if self.download_manager is not None:
+                self.segmented_downloads.shutdown()
+                self.download_manager.verifier.shutdown()
             self.save_cookies()
+            self.cookie_journal.close()
             self.stop_tor()
         except Exception as e:
-            logging.error(f"Error during close event: {e}")
+            logging.error("Error during close event: %s", e)
         super().closeEvent(event)
 
+    def prewarm_cache(self):
+        # Prewarming over Tor would only link the configured origins to this session
+        if not self.tor_enabled:
+            self.profiles.prewarm()
+
+    def show_cache_stats(self):
+        QMessageBox.information(self, "Cache Statistics", self.profiles.describe())
+
     def connect_download_handler(self):
         try:
-            profile = self.tabs.currentWidget().browser.page().profile()
+            profile = self.profiles.profile
         
             profile.downloadRequested.connect(self.on_download_requested)
             logging.debug("Download handler connected")
         except Exception as e:
-            logging.error(f"Failed to connect download handler: {str(e)}")
+            logging.error("Failed to connect download handler: %s", e)
 
-    def on_download_requested(self, download):
-        logging.info(f"Download requested: {download.suggestedFileName()}")
+    def on_download_requested(self, download, tor=False):
+        logging.info("Download requested: %s", download.suggestedFileName())
         try:
+            self.ensure_downloads()
             # Set download path
             suggested_filename = download.suggestedFileName()
             download_path = os.path.join(self.default_download_dir, suggested_filename)
@@ -592,49 +4841,286 @@ class Browser(QMainWindow):
             # Create download item and add to manager
             download_item = DownloadItem(download)
             self.download_manager.add_download(download_item)
+            self.download_progress.add(download_item)
+            
+            # Accept the download, the scheduler holds it if too many are running
+            self.download_scheduler.submit(download_item)
             
-            # Accept the download
-            download.accept()
+            # Tor downloads stay inside the Tor profile, the segmented engine would send clearnet cookies
+            if tor:
+                self.tor_downloads = [item for item in self.tor_downloads if not item.is_finished]
+                self.tor_downloads.append(download_item)
+            # Large files from servers with range support move to the segmented engine
+            elif self.segmented_downloads.enabled and download.url().scheme() in ("http", "https"):
+                self.segmented_downloads.probe(download_item, download.url().toString(),
+                                               self.download_headers(download.url()), self.download_proxy_url())
             
-            logging.debug(f"Download started: {download_path}")
+            logging.debug("Download queued: %s", download_path)
+        except Exception as e:
+            logging.error("Download failed to start: %s", e)
+
+    def download_headers(self, qurl):
+        """Request headers matching the profile, for downloads made outside the web engine"""
+        headers = {"User-Agent": self.profiles.profile.httpUserAgent()}
+        cookies = self.cookie_journal.cookie_header(qurl)
+        if cookies:
+            headers["Cookie"] = cookies
+        return headers
+
+    def download_proxy_url(self):
+        return self.tor_controller.proxy_url if self.tor_enabled else None
+
+    def on_range_probe_finished(self, item, result):
+        """Swap a built-in download for a segmented one once range support is confirmed"""
+        try:
+            if result is None or item.is_finished:
+                return
+            url, total = result
+            if total < self.segmented_downloads.min_size:
+                return
+            builtin = item.download
+            segmented = self.segmented_downloads.create(url, item.record["path"], total,
+                                                        self.download_headers(QUrl(url)), self.download_proxy_url())
+            item.download = segmented
+            builtin.cancel()
+            segmented.accept()
+            if item.record["state"] != "downloading":
+                segmented.pause()
+            logging.info("Using %s segments for %s", len(segmented.segments), item.record["filename"])
         except Exception as e:
-            logging.error(f"Download failed to start: {str(e)}")
+            logging.error("Failed to start segmented download: %s", e)
 
     def show_download_manager(self):
         logging.debug("Opening download manager")
+        self.ensure_downloads()
         self.download_manager.show()
         self.download_manager.raise_()
         self.download_manager.activateWindow()
 
-    def add_new_tab(self, qurl=None, label="New Tab"):
-        logging.debug(f"Adding new tab with URL: {qurl}")
+    def show_performance_panel(self):
+        if self.performance_panel is None:
+            self.performance_panel = PerformancePanel(self.performance, self)
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.performance_panel)
+        self.performance_panel.show()
+        self.performance_panel.raise_()
+        self.performance_panel.refresh()
+
+    def show_task_manager(self):
+        if self.task_manager_window is None:
+            self.task_manager_window = TaskManagerWindow(self, self)
+        self.task_manager_window.show()
+        self.task_manager_window.raise_()
+        self.task_manager_window.activateWindow()
+
+    def clear_page_index(self):
+        if self.page_index is not None:
+            self.page_index.clear()
+
+    def show_page_search(self):
+        if self.page_index is None or not self.page_index.enabled:
+            self.status.showMessage("Page text indexing is disabled", 5000)
+            return
+        if self.page_search is None:
+            self.page_search = PageSearchWindow(self.page_index, self.add_new_tab, self)
+        self.page_search.show()
+        self.page_search.raise_()
+        self.page_search.activateWindow()
+
+    def add_new_tab(self, qurl=None, label="New Tab", tor=False):
+        logging.debug("Adding new tab with URL: %s", qurl)
         if qurl is None:
             qurl = QUrl("https://www.google.com")
         
-        tab = BrowserTab(self)
-        tab.browser.setUrl(qurl)
+        tab = self.create_tab(tor)
+        if tor:
+            tab.browser.setUrl(qurl)
+            label = f"[Tor] {label}"
+        else:
+            self.cookie_loader.when_ready(qurl, lambda: tab.browser.setUrl(qurl))
         
         i = self.tabs.addTab(tab, label)
         self.tabs.setCurrentIndex(i)
-        
+    
+    def create_tab(self, tor=False):
+        if tor:
+            tab = BrowserTab(self, self.tor_profile.take_page(), is_tor=True)
+        else:
+            tab = BrowserTab(self, self.profiles.new_page())
+            tab.browser.loadFinished.connect(lambda ok, tab=tab: self.on_tab_load_finished(tab, ok))
+            if self.prerenderer.enabled:
+                tab.url_bar.textEdited.connect(self.prerenderer.on_text_edited)
+                tab.take_prerender = lambda url, tab=tab: self.use_prerender(tab, url)
+        tab.supervisor = self.navigation
+        tab.browser.loadFinished.connect(
+            lambda ok, tab=tab: ok and self.performance.collect(tab, self.navigation.mode(tab.is_tor)))
+        self.omnibox.attach(tab.url_bar, tab.search_in_address_bar)
+        if self.content_blocker.enabled:
+            tab.blocker = self.content_blocker.attach(tab.browser.page())
+            tab.blocker.blocked_changed.connect(lambda count, tab=tab: self.update_blocked_count(tab))
         tab.browser.titleChanged.connect(lambda title, tab=tab: self.update_tab_title(tab, title))
+        self.session.track(tab)
+        return tab
+    
+    def use_prerender(self, tab, url):
+        """Swap a prerendered page for url into the tab, returns False if there is none"""
+        if self.tor_enabled:
+            return False
+        entry = self.prerenderer.take(url)
+        if entry is None:
+            return False
+        tab.attach_page(entry["page"])
+        tab.adopt_load(entry["started"], entry["loaded"])
+        if entry["interceptor"] is not None:
+            tab.blocker = entry["interceptor"]
+            tab.blocker.blocked_changed.connect(lambda count, tab=tab: self.update_blocked_count(tab))
+        self.update_blocked_count(tab)
+        if entry["loaded"]:
+            # The view missed loadFinished, record the visit now
+            self.on_tab_load_finished(tab, True)
+        return True
+
+    def update_blocked_count(self, tab):
+        """Show how many requests were blocked on the current tab"""
+        if tab is not self.tabs.currentWidget():
+            return
+        blocker = getattr(tab, "blocker", None)
+        count = blocker.blocked if blocker is not None else 0
+        self.blocked_label.setText(f"Blocked: {count}" if count else "")
+
+    def on_tab_load_finished(self, tab, ok):
+        """Record a successful clearnet page load"""
+        if not ok:
+            return
+        if not self.first_load_seen:
+            self.on_first_load(tab)
+        self.profiles.collect_cache_stats(tab.browser.page())
+        self.omnibox.record_visit(tab.browser.url().toString(), tab.browser.title())
+        if self.page_index is not None and not (self.tor_enabled and self.page_index.disable_with_tor):
+            self.page_index.add_page(tab.browser.page())
+    
+    def warm_tor_profile(self):
+        """Build the Tor profile and connect its downloads without touching the network"""
+        first_time = self.tor_profile.profile is None
+        self.tor_profile.warm()
+        if first_time and self.tor_profile.profile is not None:
+            self.tor_profile.profile.downloadRequested.connect(
+                lambda download: self.on_download_requested(download, tor=True))
+    
+    def open_tor_tab(self):
+        """Open a tab on the isolated Tor profile, enabling Tor first if needed"""
+        self.warm_tor_profile()
+        if self.tor_enabled:
+            self.add_new_tab(tor=True)
+            return
+        self.pending_tor_tab = True
+        self.start_tor()
+    
+    def close_tor_tabs(self):
+        """Close every Tor tab and forget the Tor session state"""
+        tor_tabs = [self.tabs.widget(i) for i in range(self.tabs.count())
+                    if getattr(self.tabs.widget(i), "is_tor", False)]
+        if not tor_tabs:
+            return
+        if len(tor_tabs) == self.tabs.count():
+            self.add_new_tab()
+        for tab in tor_tabs:
+            self.tab_lifecycle.forget(tab)
+            self.session.forget(tab)
+            self.performance.forget(tab)
+            self.tabs.removeTab(self.tabs.indexOf(tab))
+            tab.teardown()
+        self.tor_profile.reset()
+    
+    def restore_session(self, entries, current):
+        """Add placeholder tabs for a saved session and build only the current one"""
+        self.tabs.blockSignals(True)
+        for entry in entries:
+            placeholder = TabPlaceholder(entry["url"], entry["title"], entry["history"])
+            title = entry["title"] or entry["url"]
+            i = self.tabs.addTab(placeholder, title[:15] + "...")
+            self.tabs.setTabToolTip(i, title)
+        self.tabs.setCurrentIndex(current)
+        self.tabs.blockSignals(False)
+        self.materialize_tab(current)
+    
+    def on_current_tab_changed(self, index):
+        if isinstance(self.tabs.widget(index), TabPlaceholder):
+            self.materialize_tab(index)
+    
+    def materialize_tab(self, index):
+        """Replace the placeholder at index with a real BrowserTab"""
+        placeholder = self.tabs.widget(index)
+        if not isinstance(placeholder, TabPlaceholder):
+            return
+        logging.debug("Materializing tab: %s", placeholder.url)
+        
+        tab = self.create_tab()
+        url = QUrl(placeholder.url)
+        history = placeholder.history
+        
+        def navigate():
+            if not restore_history(tab.browser.history(), history):
+                tab.browser.setUrl(url)
+        self.cookie_loader.when_ready(url, navigate)
+        
+        text = self.tabs.tabText(index)
+        tooltip = self.tabs.tabToolTip(index)
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, tab, text)
+        self.tabs.setTabToolTip(index, tooltip)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+        
+        self.tab_lifecycle.on_current_changed(index)
     
     def update_tab_title(self, tab, title):
+        # Discarded pages may report an empty title, keep the last known one
+        if not title:
+            return
         idx = self.tabs.indexOf(tab)
-        self.tabs.setTabText(idx, title[:15] + "...")
+        prefix = "[Tor] " if tab.is_tor else ""
+        self.tabs.setTabText(idx, prefix + title[:15] + "...")
+        self.tabs.setTabToolTip(idx, prefix + title)
     
     def close_tab(self, i):
         if self.tabs.count() < 2:
             return
             
+        tab = self.tabs.widget(i)
+        # Tor tabs leave nothing behind to reopen
+        if isinstance(tab, TabPlaceholder):
+            self.closed_tabs.push(tab.url, tab.title, tab.history, i)
+        elif isinstance(tab, BrowserTab) and not tab.is_tor:
+            self.closed_tabs.push(tab.browser.url().toString(), tab.browser.title(),
+                                  serialize_history(tab.browser.history()), i)
+        self.tab_lifecycle.forget(tab)
+        self.session.forget(tab)
+        self.performance.forget(tab)
         self.tabs.removeTab(i)
+        if isinstance(tab, BrowserTab):
+            tab.teardown()
+        else:
+            tab.deleteLater()
+
+    def reopen_closed_tab(self):
+        """Bring back the most recently closed tab with its back/forward history"""
+        entry = self.closed_tabs.pop()
+        if entry is None:
+            return
+        placeholder = TabPlaceholder(entry["url"], entry["title"], entry["history"])
+        title = entry["title"] or entry["url"]
+        index = self.tabs.insertTab(min(entry["index"], self.tabs.count()), placeholder, title[:15] + "...")
+        self.tabs.setTabToolTip(index, title)
+        self.tabs.setCurrentIndex(index)
+        self.materialize_tab(index)
 
     def clear_cookies(self):
         """Clear all cookies"""
         logging.info("Clearing all cookies")
         self.cookie_store.deleteAllCookies()
-        self.cookies.clear()
-        self.save_cookies()
+        self.cookie_journal.clear()
         self.status.showMessage("Cookies cleared!", 5000)
 
     def toggle_tor(self):
@@ -645,37 +5131,71 @@ class Browser(QMainWindow):
             self.start_tor()
 
     def start_tor(self):
-        """Connect to external Tor SOCKS5 proxy."""
+        """Check the external Tor SOCKS5 proxy, Tor is enabled once it answers."""
+        self.status.showMessage("Checking Tor SOCKS5 proxy...", 5000)
+        self.tor_controller.probe_socks()
+
+    def on_tor_socks_checked(self, ok, message):
+        """Enable Tor after a successful probe, or report a failing proxy."""
+        if self.tor_enabled:
+            if not ok:
+                self.status.showMessage(f"Tor SOCKS5 proxy is not responding: {message}", 5000)
+            return
+        if not ok:
+            self.pending_tor_tab = False
+            logging.error("Failed to connect to Tor: %s", message)
+            self.status.showMessage(
+                f"Failed to connect to Tor: SOCKS5 proxy not found on port {self.tor_controller.socks_port} "
+                f"({message}). Please start Tor first.", 5000)
+            return
         try:
-            # Test if Tor SOCKS5 proxy is available
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            result = sock.connect_ex(('127.0.0.1', 9050))
-            sock.close()
-            
-            if result != 0:
-                raise Exception("Tor SOCKS5 proxy not found on port 9050. Please start Tor first.")
-            
             logging.info("Connecting to external Tor SOCKS5 proxy")
             self.tor_enabled = True
+            if self.download_scheduler is not None:
+                self.download_scheduler.set_tor_enabled(True)
+            # Prerendering would reveal typed input to sites over Tor
+            self.prerenderer.set_suspended(True)
+            self.navigation.tor_enabled = True
             self.tor_indicator.setVisible(True)
             self.setWindowTitle("QtCelestial - EVENING [TOR]")
             self.set_tor_proxy()
+            self.tor_controller.start()
             self.status.showMessage("Tor enabled. Tor connections might be slower. Please be patient.", 10000)
+            if self.pending_tor_tab:
+                self.pending_tor_tab = False
+                self.add_new_tab(tor=True)
         except Exception as e:
-            logging.error(f"Failed to connect to Tor: {e}")
+            logging.error("Failed to connect to Tor: %s", e)
             self.status.showMessage(f"Failed to connect to Tor: {e}", 5000)
 
+    def update_tor_indicator(self):
+        text, tooltip, healthy = self.tor_controller.describe()
+        self.tor_indicator.setText(text)
+        self.tor_indicator.setToolTip(tooltip)
+        color = "red" if healthy else "orange"
+        self.tor_indicator.setStyleSheet(f"color: {color}; font-weight: bold;")
+
     def stop_tor(self):
         """Disconnect from Tor proxy."""
         try:
             logging.info("Disconnecting from Tor proxy")
             self.tor_enabled = False
+            if self.download_scheduler is not None:
+                self.download_scheduler.set_tor_enabled(False)
+            self.prerenderer.set_suspended(False)
+            self.navigation.tor_enabled = False
+            self.tor_controller.stop()
+            # Tor tabs and their downloads must not fall back to a direct connection
+            self.close_tor_tabs()
+            for item in self.tor_downloads:
+                item.cancel_download()
+            self.tor_downloads = []
             self.tor_indicator.setVisible(False)
             self.setWindowTitle("QtCelestial - EVENING")
             self.clear_tor_proxy()
             self.status.showMessage("Tor disabled", 5000)
         except Exception as e:
-            logging.error(f"Failed to disconnect from Tor: {e}")
+            logging.error("Failed to disconnect from Tor: %s", e)
             self.status.showMessage(f"Failed to disconnect from Tor: {e}", 5000)
 
     def set_tor_proxy(self):
@@ -683,12 +5203,12 @@ class Browser(QMainWindow):
         try:
             proxy = QNetworkProxy()
             proxy.setType(QNetworkProxy.ProxyType.Socks5Proxy)
-            proxy.setHostName("127.0.0.1")
-            proxy.setPort(9050)
+            proxy.setHostName(self.tor_controller.host)
+            proxy.setPort(self.tor_controller.socks_port)
             QNetworkProxy.setApplicationProxy(proxy)
             logging.info("Tor proxy set successfully")
         except Exception as e:
-            logging.error(f"Failed to set Tor proxy: {e}")
+            logging.error("Failed to set Tor proxy: %s", e)
 
     def clear_tor_proxy(self):
         """Clear Tor proxy settings."""
@@ -696,21 +5216,336 @@ class Browser(QMainWindow):
             QNetworkProxy.setApplicationProxy(QNetworkProxy())
             logging.info("Tor proxy cleared")
         except Exception as e:
-            logging.error(f"Failed to clear Tor proxy: {e}")
+            logging.error("Failed to clear Tor proxy: %s", e)
+
+class BatchRenderer(QObject):
+    """Loads URLs headlessly through a fixed pool of reused pages and writes one JSON line per URL"""
+    finished = pyqtSignal(int)
+    FORMATS = ("html", "pdf", "png")
+
+    def __init__(self, jobs, options, out=None, parent=None):
+        super().__init__(parent)
+        self.jobs = collections.deque(jobs)
+        self.total = len(self.jobs)
+        self.options = options
+        self.out = out or sys.stdout
+        self.failures = 0
+        self.slots = []
+        # Same timeouts, retries and backoff as tabs. A lone batch process adds its loads to the saved
+        # statistics, worker processes only read them so they do not overwrite each other's results
+        shard, shards = options.shard
+        self.supervisor = NavigationSupervisor(self, persist=shards == 1)
+        self.supervisor.tor_enabled = options.tor
+        self.mode = self.supervisor.mode()
+        os.makedirs(options.output_dir, exist_ok=True)
+        
+        # Batch loads never touch the cookies or cache of the interactive profile
+        self.profile = QWebEngineProfile(QApplication.instance())
+        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+        self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies)
+        self.tor_controller = None
+    
+    def start(self):
+        if not self.options.tor:
+            self.start_pool()
+            return
+        self.tor_controller = TorController(parent=self)
+        self.tor_controller.socks_checked.connect(self.on_tor_socks_checked)
+        self.tor_controller.probe_socks()
+    
+    def on_tor_socks_checked(self, ok, message):
+        if not ok:
+            logging.error("Batch over Tor aborted, SOCKS5 proxy not available: %s", message)
+            print(f"Tor SOCKS5 proxy not available on {self.tor_controller.host}:{self.tor_controller.socks_port}: "
+                  f"{message}", file=sys.stderr)
+            self.finished.emit(2)
+            return
+        proxy = QNetworkProxy()
+        proxy.setType(QNetworkProxy.ProxyType.Socks5Proxy)
+        proxy.setHostName(self.tor_controller.host)
+        proxy.setPort(self.tor_controller.socks_port)
+        QNetworkProxy.setApplicationProxy(proxy)
+        self.start_pool()
+    
+    def start_pool(self):
+        width, height = self.options.viewport
+        for _ in range(max(1, min(self.options.pool, self.total))):
+            view = QWebEngineView()
+            page = QWebEnginePage(self.profile, view)
+            page.setAudioMuted(True)
+            view.setPage(page)
+            # Rendered like a visible window so screenshots work, but never mapped on screen
+            view.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen)
+            view.resize(width, height)
+            view.show()
+            slot = {"view": view, "page": page, "job": None, "state": "idle", "attempt": 0,
+                    "started": None, "first_started": None, "result": None, "steps": []}
+            slot["timeout_timer"] = QTimer(self)
+            slot["timeout_timer"].setSingleShot(True)
+            slot["timeout_timer"].timeout.connect(lambda slot=slot: self.on_timeout(slot))
+            slot["retry_timer"] = QTimer(self)
+            slot["retry_timer"].setSingleShot(True)
+            slot["retry_timer"].timeout.connect(lambda slot=slot: self.start_attempt(slot))
+            page.loadFinished.connect(lambda ok, slot=slot: self.on_load_finished(slot, ok))
+            page.pdfPrintingFinished.connect(lambda path, ok, slot=slot: self.on_pdf_finished(slot, path, ok))
+            self.slots.append(slot)
+        logging.info("Batch rendering %s URLs with %s pages (%s)", self.total, len(self.slots), self.mode)
+        for slot in self.slots:
+            self.next_job(slot)
+    
+    def next_job(self, slot):
+        if not self.jobs:
+            slot.update(job=None, state="idle")
+            if all(s["state"] == "idle" for s in self.slots):
+                self.finish()
+            return
+        slot.update(job=self.jobs.popleft(), attempt=0, first_started=time.monotonic())
+        self.start_attempt(slot)
+    
+    def start_attempt(self, slot):
+        index, url = slot["job"]
+        slot["attempt"] += 1
+        slot.update(state="loading", started=time.monotonic())
+        slot["timeout_timer"].start(self.supervisor.timeout_for(QUrl(url).host(), self.mode))
+        slot["page"].setUrl(QUrl(url))
+    
+    def on_timeout(self, slot):
+        if slot["state"] != "loading":
+            return
+        # The failed load reported by stopping is this same failure
+        slot["state"] = "waiting"
+        slot["page"].triggerAction(QWebEnginePage.WebAction.Stop)
+        self.fail_attempt(slot, f"Timed out after {slot['timeout_timer'].interval()} ms")
+    
+    def on_load_finished(self, slot, ok):
+        if slot["state"] != "loading":
+            return
+        slot["timeout_timer"].stop()
+        if not ok:
+            slot["state"] = "waiting"
+            self.fail_attempt(slot, "Load failed")
+            return
+        load_ms = (time.monotonic() - slot["started"]) * 1000
+        url = slot["page"].requestedUrl()
+        if url.scheme() in ("http", "https"):
+            self.supervisor.record(url.host(), self.mode, load_ms)
+        index, requested = slot["job"]
+        slot["state"] = "capturing"
+        slot["result"] = {"index": index, "url": requested, "final_url": slot["page"].url().toString(),
+                          "title": slot["page"].title(), "ok": True, "attempts": slot["attempt"],
+                          "load_ms": round(load_ms), "outputs": {}}
+        slot["steps"] = ["timing"] + list(self.options.formats)
+        self.capture_next(slot)
+    
+    def fail_attempt(self, slot, error):
+        index, url = slot["job"]
+        if slot["attempt"] <= self.supervisor.max_retries:
+            delay = self.supervisor.backoff_delay(slot["attempt"], self.mode)
+            logging.warning("Batch load of %s failed (%s), retry %s in %s ms", url, error, slot["attempt"], delay)
+            slot["retry_timer"].start(delay)
+            return
+        logging.error("Batch load of %s failed after %s attempts: %s", url, slot["attempt"], error)
+        self.failures += 1
+        slot["result"] = {"index": index, "url": url, "ok": False, "attempts": slot["attempt"], "error": error}
+        self.emit_result(slot)
+    
+    def output_path(self, slot, ext):
+        index, url = slot["job"]
+        name = re.sub(r"[^A-Za-z0-9.-]", "_", QUrl(url).host()) or "page"
+        return os.path.join(self.options.output_dir, f"{index:06d}-{name}.{ext}")
+    
+    def capture_next(self, slot):
+        """Run the remaining capture steps of a loaded page one after another"""
+        if not slot["steps"]:
+            self.emit_result(slot)
+            return
+        step = slot["steps"].pop(0)
+        page = slot["page"]
+        try:
+            if step == "timing":
+                page.runJavaScript(NAVIGATION_TIMING_JS, lambda timing, slot=slot: self.on_timing(slot, timing))
+            elif step == "html":
+                page.toHtml(lambda text, slot=slot: self.on_html(slot, text))
+            elif step == "pdf":
+                page.printToPdf(self.output_path(slot, "pdf"))
+            elif step == "png":
+                path = self.output_path(slot, "png")
+                if not slot["view"].grab().save(path, "PNG"):
+                    raise OSError(f"Could not write {path}")
+                slot["result"]["outputs"]["png"] = path
+                self.capture_next(slot)
+        except Exception as e:
+            logging.error("Failed to capture %s of %s: %s", step, slot["job"][1], e)
+            slot["result"].setdefault("errors", {})[step] = str(e)
+            self.capture_next(slot)
+    
+    def on_timing(self, slot, timing):
+        if isinstance(timing, dict):
+            slot["result"]["timing"] = {key: round(value, 1) if isinstance(value, float) else value
+                                        for key, value in timing.items()}
+        self.capture_next(slot)
+    
+    def on_html(self, slot, text):
+        path = self.output_path(slot, "html")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            slot["result"]["outputs"]["html"] = path
+        except OSError as e:
+            logging.error("Failed to write %s: %s", path, e)
+            slot["result"].setdefault("errors", {})["html"] = str(e)
+        self.capture_next(slot)
+    
+    def on_pdf_finished(self, slot, path, ok):
+        if slot["state"] != "capturing":
+            return
+        if ok:
+            slot["result"]["outputs"]["pdf"] = path
+        else:
+            slot["result"].setdefault("errors", {})["pdf"] = "Printing failed"
+        self.capture_next(slot)
+    
+    def emit_result(self, slot):
+        result = slot["result"]
+        result["mode"] = self.mode
+        result["elapsed_ms"] = round((time.monotonic() - slot["first_started"]) * 1000)
+        self.out.write(json.dumps(result) + "\n")
+        self.out.flush()
+        slot["result"] = None
+        # Reused pages would otherwise collect every URL of the batch in their history
+        slot["page"].history().clear()
+        self.next_job(slot)
+    
+    def finish(self):
+        self.supervisor.shutdown()
+        logging.info("Batch finished: %s of %s URLs failed", self.failures, self.total)
+        # Pages have to go before the profile they belong to
+        for slot in self.slots:
+            slot["view"].deleteLater()
+        self.slots = []
+        QTimer.singleShot(0, lambda: self.finished.emit(1 if self.failures else 0))
+
+def parse_batch_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py", description="Load URLs headlessly and save them")
+    parser.add_argument("--batch", metavar="FILE", required=True, help="file with one URL per line, - for stdin")
+    parser.add_argument("--output-dir", default="batch-output", help="where rendered files are written")
+    parser.add_argument("--format", default="html",
+                        help=f"comma separated outputs: {', '.join(BatchRenderer.FORMATS)} (default html)")
+    parser.add_argument("--pool", type=int, default=4, help="pages loading in parallel per process")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own page pool")
+    parser.add_argument("--viewport", default="1280x800", help="page size for screenshots, WIDTHxHEIGHT")
+    parser.add_argument("--tor", action="store_true", help="load through the Tor SOCKS5 proxy")
+    parser.add_argument("--shard", default="0/1", help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+    options.formats = [f.strip() for f in options.format.split(",") if f.strip()]
+    unknown = set(options.formats) - set(BatchRenderer.FORMATS)
+    if unknown:
+        parser.error(f"unknown format: {', '.join(sorted(unknown))}")
+    try:
+        options.viewport = tuple(int(v) for v in options.viewport.lower().split("x", 1))
+    except ValueError:
+        parser.error("--viewport must look like 1280x800")
+    options.shard = tuple(int(v) for v in options.shard.split("/", 1))
+    return options
+
+def read_batch_urls(source):
+    """Return (index, url) for every non-empty, non-comment line"""
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        lines = [line.strip() for line in f]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return [(i, process_input(line)) for i, line in enumerate(lines) if line and not line.startswith("#")]
+
+def run_batch_workers(options, argv):
+    """Split the URLs over worker processes by line number and merge their JSON lines"""
+    source = sys.stdin.read() if options.batch == "-" else None
+    args = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--workers":
+            skip = True
+        elif not arg.startswith("--workers="):
+            args.append(arg)
+    workers = []
+    for i in range(options.workers):
+        shard_args = args + ["--shard", f"{i}/{options.workers}"]
+        workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)] + shard_args,
+                                        stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, text=True))
+    lock = threading.Lock()
+
+    def forward(worker):
+        for line in worker.stdout:
+            with lock:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+    threads = [threading.Thread(target=forward, args=(worker,), daemon=True) for worker in workers]
+    for thread in threads:
+        thread.start()
+    if source is not None:
+        for worker in workers:
+            try:
+                worker.stdin.write(source)
+                worker.stdin.close()
+            except OSError as e:
+                logging.error("Failed to send URLs to batch worker: %s", e)
+    for thread in threads:
+        thread.join()
+    return max(worker.wait() for worker in workers)
+
+def run_batch(argv):
+    """Headless --batch mode, JSON lines go to stdout and logs to a batch log file per process"""
+    options = parse_batch_args(argv)
+    if options.workers > 1:
+        return run_batch_workers(options, argv)
+    shard, shards = options.shard
+    jobs = [job for job in read_batch_urls(options.batch) if job[0] % shards == shard]
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])
+    app.setApplicationName("Evening")
+    listener = setup_logging("batch.log" if shards == 1 else f"batch_worker_{shard}.log")
+    try:
+        if not jobs:
+            return 0
+        renderer = BatchRenderer(jobs, options)
+        renderer.finished.connect(app.exit)
+        QTimer.singleShot(0, renderer.start)
+        return app.exec()
+    finally:
+        listener.stop()
 
 def main():
+    if "--batch" in sys.argv or any(arg.startswith("--batch=") for arg in sys.argv):
+        sys.exit(run_batch(sys.argv[1:]))
+    profile_startup = "--profile-startup" in sys.argv
+    listener = None
     try:
-        logging.info("Starting application")
+        STARTUP.mark("imports")
         app = QApplication(sys.argv)  # Ensure `app` is defined here
         app.setApplicationName("Evening")
+        STARTUP.mark("QApplication")
+        listener = setup_logging()
+        logging.info("Starting application")
+        STARTUP.mark("logging")
         
-        window = Browser()
+        window = Browser(profile_startup=profile_startup)
         window.showMaximized()
+        STARTUP.mark("window shown")
+        # Deferred work starts once the first frame has been queued
+        QTimer.singleShot(0, window.finish_startup)
         
-        sys.exit(app.exec())
+        exit_code = app.exec()
     except Exception as e:
-        logging.critical(f"Application failed to start: {str(e)}")
+        logging.critical("Application failed to start: %s", e)
         raise
+    finally:
+        if listener:
+            listener.stop()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["XDG_DATA_HOME"] = tempfile.mkdtemp(prefix="qtcelestial-test-")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def main():
+    # main imports QtWebEngine, which needs X11 and ALSA client libraries even when offscreen
+    return pytest.importorskip("main", exc_type=ImportError)
+
+
+@pytest.fixture(scope="session")
+def app(main):
+    app = main.QApplication.instance() or main.QApplication(sys.argv[:1])
+    app.setApplicationName("Evening")
+    return app
+
+
+@pytest.fixture
+def settings_ini(main, app):
+    """Write raw lines to settings.ini, the way a user would edit it"""
+    path = os.path.join(main.get_data_dir(), "settings.ini")
+
+    def write(text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    yield write
+    if os.path.exists(path):
+        os.remove(path)
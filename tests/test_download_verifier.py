@@ -0,0 +1,26 @@
+import hashlib
+
+
+def test_verifier_reads_multiple_algorithms(main, settings_ini, tmp_path):
+    settings_ini("[downloads]\nverify_algorithms=sha256, MD5,no-such-hash\n")
+    verifier = main.DownloadVerifier()
+    try:
+        assert verifier.algorithms == ["sha256", "md5"]
+
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"qtcelestial" * 1000)
+        result = verifier.run(str(path), None)
+        assert result["digests"]["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+        assert result["digests"]["md5"] == hashlib.md5(path.read_bytes()).hexdigest()
+        assert "error" not in result
+    finally:
+        verifier.shutdown()
+
+
+def test_verifier_single_algorithm(main, settings_ini):
+    settings_ini("[downloads]\nverify_algorithms=sha512\n")
+    verifier = main.DownloadVerifier()
+    try:
+        assert verifier.algorithms == ["sha512"]
+    finally:
+        verifier.shutdown()
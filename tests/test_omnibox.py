@@ -0,0 +1,46 @@
+import random
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def index(main):
+    rng = random.Random(1)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    rows = []
+    for n in range(100_000):
+        host = f"{rng.choice(words)}.{rng.choice(['com', 'org', 'net', 'io'])}"
+        url = f"https://{'www.' if n % 3 == 0 else ''}{host}/{rng.choice(words)}/{rng.choice(words)}?id={n}"
+        rows.append((url, f"{rng.choice(words)} {rng.choice(words)}", rng.randint(1, 1000)))
+    rows.append(("https://github.com/", "GitHub", 10**6))
+    index = main.OmniboxIndex()
+    index.load(rows)
+    return index
+
+
+def test_prefix_and_substring_matches(index):
+    assert index.query("gith")[0] == ("https://github.com/", "GitHub")
+    assert index.query("hub")
+    assert index.query("com")[0] == ("https://github.com/", "GitHub")
+    assert index.query("zzqxj") == []
+
+
+def test_substring_ranks_best_scores_first(index):
+    expected = sorted((score for score, haystack in zip(index.scores, index.haystacks) if ".org" in haystack), reverse=True)[:8]
+    assert [index.scores[index.ids[url]] for url, _ in index.query(".org")] == expected
+
+
+def test_added_entries_reach_common_trigrams(index):
+    index.add("https://zeta.example.com/", "Zeta", 10**7)
+    assert index.query(".com")[0] == ("https://zeta.example.com/", "Zeta")
+
+
+def test_query_time_at_100k_entries(index):
+    # Queries run on the GUI thread on every keystroke
+    for text in ["com", ".com/", "?id=", "id=1", "e.co", "org/a", "gith", "number 123"]:
+        start = time.perf_counter()
+        for _ in range(20):
+            index.query(text)
+        elapsed = (time.perf_counter() - start) / 20
+        assert elapsed < 0.005, f"{text!r} took {elapsed * 1000:.1f} ms"
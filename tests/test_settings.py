@@ -0,0 +1,16 @@
+def test_settings_list_accepts_str_and_list(main):
+    assert main.settings_list("a, b,,c ") == ["a", "b", "c"]
+    assert main.settings_list(["a ", " b", ""]) == ["a", "b"]
+    assert main.settings_list("") == []
+    assert main.settings_list(None) == []
+
+
+def test_profile_manager_reads_multiple_prewarm_origins(main, settings_ini):
+    settings_ini("[profile]\nprewarm_origins=https://news.ycombinator.com, https://en.wikipedia.org\n")
+    profiles = main.ProfileManager()
+    assert profiles.prewarm_origins == ["https://news.ycombinator.com", "https://en.wikipedia.org"]
+
+
+def test_profile_manager_reads_single_prewarm_origin(main, settings_ini):
+    settings_ini("[profile]\nprewarm_origins=https://example.com\n")
+    assert main.ProfileManager().prewarm_origins == ["https://example.com"]
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize("text, url", [
+    ("::1", "http://[::1]"),
+    ("fe80::1", "http://[fe80::1]"),
+    ("::1/status", "http://[::1]/status"),
+    ("[::1]:8080", "http://[::1]:8080"),
+    ("127.0.0.1:8000", "http://127.0.0.1:8000"),
+    ("localhost:3000/app", "http://localhost:3000/app"),
+    ("example.com", "https://example.com"),
+    ("https://example.com/a", "https://example.com/a"),
+])
+def test_process_input_urls(main, text, url):
+    assert main.process_input(text) == url
+
+
+@pytest.mark.parametrize("text", ["a:b:c", "fe80::1::2", "hello world", "name@example.com"])
+def test_process_input_searches(main, text):
+    assert main.process_input(text).startswith("https://www.google.com/search?q=")